@@ -1,8 +1,10 @@
 # your_app/admin.py
 
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from .models import *
+from . import search
 from django import forms
 from ckeditor.widgets import CKEditorWidget  # nếu đã cài ckeditor
 from slugify import slugify
@@ -14,10 +16,15 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name",)
 
+    def get_queryset(self, request):
+        # Đếm trong cùng truy vấn thay vì một COUNT cho mỗi dòng
+        return super().get_queryset(request).annotate(_product_count=Count("products"))
+
     def product_count(self, obj):
-        return obj.products.count()
+        return obj._product_count
 
     product_count.short_description = "Số sản phẩm"
+    product_count.admin_order_field = "_product_count"
 
 
 class ProductImageInline(admin.TabularInline):
@@ -64,7 +71,16 @@ class ProductForm(forms.ModelForm):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ("name", "price", "created_at", "category", "updated_at")
+    list_display = (
+        "name",
+        "price",
+        "created_at",
+        "category",
+        "review_count",
+        "rating_avg",
+        "updated_at",
+    )
+    list_select_related = ("category",)
     search_fields = ("name",)
     list_filter = ("category", "created_at")
     prepopulated_fields = {"slug": ("name",)}
@@ -89,6 +105,29 @@ class GoogleServiceAccountAdmin(admin.ModelAdmin):
     list_display = ["name", "spreadsheet_id"]
 
 
+@admin.register(GoogleSheetOutbox)
+class GoogleSheetOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "contact", "status", "attempts", "next_attempt_at", "sent_at")
+    list_select_related = ("contact",)
+    list_filter = ("status",)
+    readonly_fields = ("contact", "row", "attempts", "last_error", "created_at", "sent_at")
+
+
+@admin.register(ImageProcessingJob)
+class ImageProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "content_type", "object_id", "field_name", "status", "attempts", "updated_at")
+    list_select_related = ("content_type",)
+    list_filter = ("status", "content_type")
+    readonly_fields = ("source_name", "attempts", "last_error", "created_at", "updated_at")
+
+
+@admin.register(ProductDocumentJob)
+class ProductDocumentJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "product_id", "status", "updated_at")
+    list_filter = ("status",)
+    readonly_fields = ("product_id", "updated_at")
+
+
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
     list_display = ("name", "phone_number", "created_at")
@@ -102,9 +141,18 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
 @admin.register(BlogCategory)
 class BlogCategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug")
+    list_display = ("name", "slug", "post_count")
     prepopulated_fields = {"slug": ("name",)}
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_post_count=Count("posts"))
+
+    def post_count(self, obj):
+        return obj._post_count
+
+    post_count.short_description = "Số bài viết"
+    post_count.admin_order_field = "_post_count"
+
 
 class BlogCommentInline(admin.TabularInline):
     model = BlogComment
@@ -131,7 +179,7 @@ class BlogPostForm(forms.ModelForm):
 
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
-    list_display = ("title", "author_name", "status", "published_at")
+    list_display = ("title", "author_name", "status", "comment_count", "published_at")
     list_filter = ("status", "published_at")
     search_fields = ("title", "content", "author_name")
     prepopulated_fields = {"slug": ("title",)}
@@ -152,6 +200,31 @@ class BlogPostAdmin(admin.ModelAdmin):
         "published_at",
     )
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match and match.url_name and match.url_name.endswith("_changelist"):
+            # Danh sách không hiển thị nội dung bài viết
+            queryset = queryset.defer("content").annotate(
+                _comment_count=Count("comments")
+            )
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        # Dùng chỉ mục tìm kiếm (bỏ dấu, có content) thay cho LIKE '%...%' trên content
+        if not search.tokenize(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        # Không giới hạn như API: changelist tự phân trang trên toàn bộ kết quả
+        results = search.search(BlogPost, search_term)
+        ids = [object_id for object_id, _score in results]
+        return queryset.filter(pk__in=ids), False
+
+    def comment_count(self, obj):
+        return obj._comment_count
+
+    comment_count.short_description = "Bình luận"
+    comment_count.admin_order_field = "_comment_count"
+
     def thumbnail_preview(self, obj):
         if obj.thumbnail:
             return format_html(
@@ -8,3 +8,8 @@ class DecorConfig(AppConfig):
     def ready(self):
         # Khi app khởi động, import signals để đăng ký
         import decor.signals
+
+        # Thread ghi log request JSON (handler "requests" trong settings.LOGGING)
+        from decor import log
+
+        log.start_listener()
@@ -0,0 +1,309 @@
+# your_app/cache.py
+
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import classonlymethod
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import exceptions
+from rest_framework.permissions import AllowAny
+from rest_framework.settings import api_settings
+
+from .metrics import RESPONSE_CACHE
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _version_key(model):
+    return f"decor:version:{model._meta.label_lower}"
+
+
+def _changed_key(model):
+    return f"decor:changed:{model._meta.label_lower}"
+
+
+def _version_timeout():
+    # LocMemCache là cache riêng của từng tiến trình: signals chỉ tăng phiên bản ở
+    # worker đã ghi, nên các worker khác cần tự làm mới sau một thời gian ngắn
+    if isinstance(get_cache(), LocMemCache):
+        return getattr(settings, "RESPONSE_CACHE_LOCAL_VERSION_TIMEOUT", 60)
+    return None
+
+
+def model_version(model):
+    """Phiên bản dữ liệu của model, tăng mỗi khi có bản ghi được lưu/xóa."""
+    # Giá trị đầu theo thời gian: khóa hết hạn rồi tạo lại không quay về phiên
+    # bản cũ, nên response/ETag đã lưu với phiên bản trước không còn dùng được
+    return get_cache().get_or_set(
+        _version_key(model), lambda: time.time_ns() // 1000, timeout=_version_timeout()
+    )
+
+
+def _response_key(request, renderer_format, model, version):
+    digest = hashlib.md5(
+        f"{request.build_absolute_uri()}|{renderer_format}".encode()
+    ).hexdigest()
+    return f"decor:response:{model._meta.label_lower}:{version}:{digest}"
+
+
+def _lookup(request, renderer_format, model):
+    return get_cache().get(
+        _response_key(request, renderer_format, model, model_version(model))
+    )
+
+
+def _hit_response(request, cached):
+    # Trả lời từ bản ghi cache, kể cả 304 theo ETag/Last-Modified lưu kèm
+    content, content_type, etag, last_modified = cached
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+        response["X-Cache"] = "HIT"
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def model_changed_at(model):
+    """Thời điểm (timestamp) thay đổi gần nhất mà tiến trình/cache này biết."""
+    return get_cache().get(_changed_key(model))
+
+
+def bump_version(model):
+    cache = get_cache()
+    timeout = _version_timeout()
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), time.time_ns() // 1000, timeout=timeout)
+    cache.set(_changed_key(model), time.time(), timeout=timeout)
+
+
+def record(model, event):
+    with _stats_lock:
+        _stats[(model._meta.label_lower, event)] += 1
+    RESPONSE_CACHE.labels(model._meta.label_lower, event).inc()
+
+
+def stats():
+    """{model: {"hit": n, "miss": n}} của tiến trình hiện tại."""
+    with _stats_lock:
+        result = {}
+        for (label, event), count in _stats.items():
+            result.setdefault(label, {"hit": 0, "miss": 0})[event] = count
+        return result
+
+
+class CachedResponseMixin:
+    # Cache nội dung đã render của list/retrieve cho viewset chỉ đọc.
+    # Khóa gồm phiên bản của model nên signals chỉ cần gọi bump_version().
+    # Đặt trước ConditionalGetMixin: trúng cache (kể cả 304) không truy vấn DB,
+    # chỉ khi trượt mới tính validator.
+    # Dưới ASGI (settings.ASYNC_READ_PATH) view là async: GET trúng cache, kể cả
+    # 304 theo ETag lưu kèm, được trả lời trên event loop mà không chạy DRF.
+    cache_timeout = None
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not getattr(settings, "ASYNC_READ_PATH", False):
+            return view
+        # Trượt cache: cả view DRF chạy trong đúng một lần chuyển sang thread
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            response = None
+            if request.method in ("GET", "HEAD"):
+                response = await cls._acached(view, request, args, kwargs)
+            if response is None:
+                response = await sync_view(request, *args, **kwargs)
+            return response
+
+        return update_wrapper(async_view, view)
+
+    @classmethod
+    async def _acached(cls, view, request, args, kwargs):
+        self = cls(**view.initkwargs)
+        self.action_map = view.actions
+        # Như view của ViewSetMixin.as_view, để header Allow giống view sync
+        for method, action in view.actions.items():
+            setattr(self, method, getattr(self, action))
+        if hasattr(self, "get") and not hasattr(self, "head"):
+            self.head = self.get
+        self.args, self.kwargs = args, kwargs
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        self.request = drf_request
+        # Chỉ đi đường tắt khi chắc chắn giống view sync: không xác thực/throttle
+        if (
+            self.action not in ("list", "retrieve")
+            or self.get_throttles()
+            or not all(isinstance(p, AllowAny) for p in self.get_permissions())
+        ):
+            return None
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        try:
+            renderer, _media_type = self.perform_content_negotiation(drf_request)
+        except exceptions.NotAcceptable:
+            return None
+
+        model = self.get_queryset().model
+        if isinstance(get_cache(), LocMemCache):
+            # Cache trong tiến trình không chặn event loop: đọc thẳng
+            cached = _lookup(request, renderer.format, model)
+        else:
+            # Redis/Memcached: hai lần đọc trong một lần chuyển thread
+            cached = await sync_to_async(_lookup)(request, renderer.format, model)
+        # Bản ghi cũ chỉ có (content, content_type): để view sync trả lời
+        if cached is None or len(cached) < 4:
+            return None
+        record(model, "hit")
+        response = _hit_response(request, cached)
+        for key, value in self.default_response_headers.items():
+            response[key] = value
+        return response
+
+    def _response_cache_key(self, request, model):
+        return _response_key(
+            request, request.accepted_renderer.format, model, model_version(model)
+        )
+
+    def _cached(self, handler, request, *args, **kwargs):
+        model = self.get_queryset().model
+        key = self._response_cache_key(request, model)
+        cached = get_cache().get(key)
+        # Bản ghi cũ chỉ có (content, content_type) không có validator: coi như trượt
+        if cached is not None and len(cached) == 4:
+            record(model, "hit")
+            return _hit_response(request, cached)
+
+        record(model, "miss")
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            request._response_cache_key = key
+        response["X-Cache"] = "MISS"
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(request, "_response_cache_key", None)
+        if key and hasattr(response, "add_post_render_callback"):
+            timeout = self.cache_timeout or getattr(
+                settings, "RESPONSE_CACHE_TIMEOUT", 60 * 60
+            )
+
+            def store(rendered):
+                # ETag/Last-Modified (ConditionalGetMixin) lưu kèm cho view async
+                last_modified = parse_http_date_safe(rendered.get("Last-Modified"))
+                get_cache().set(
+                    key,
+                    (
+                        rendered.content,
+                        rendered["Content-Type"],
+                        rendered.get("ETag"),
+                        last_modified,
+                    ),
+                    timeout,
+                )
+
+            response.add_post_render_callback(store)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    # ETag/Last-Modified cho list/retrieve; trả 304 trước khi serialize.
+    # Validator = COUNT/MAX(pk)/MAX(updated_at) của queryset đã lọc + phiên bản
+    # của model và các model phụ thuộc (ảnh, đánh giá...) do signals tăng.
+    conditional_dependencies = ()
+
+    def _validators(self, request, queryset):
+        model = queryset.model
+        aggregates = {"count": Count("pk"), "max_pk": Max("pk")}
+        has_updated_at = any(
+            field.name == "updated_at" for field in model._meta.concrete_fields
+        )
+        if has_updated_at:
+            aggregates["updated_at"] = Max("updated_at")
+        row = queryset.order_by().aggregate(**aggregates)
+
+        models = (model, *self.conditional_dependencies)
+        versions = [model_version(dependency) for dependency in models]
+        etag = hashlib.md5(
+            repr(
+                (
+                    request.build_absolute_uri(),
+                    request.accepted_renderer.format,
+                    sorted(row.items()),
+                    versions,
+                )
+            ).encode()
+        ).hexdigest()
+
+        timestamps = [
+            changed_at
+            for changed_at in (model_changed_at(dependency) for dependency in models)
+            if changed_at
+        ]
+        if row.get("updated_at"):
+            timestamps.append(row["updated_at"].timestamp())
+        # HTTP date chỉ tới giây: làm tròn lên để không báo "chưa đổi" quá sớm
+        last_modified = math.ceil(max(timestamps)) if timestamps else None
+        return f'W/"{etag}"', last_modified
+
+    def _conditional(self, handler, validators_queryset, request, *args, **kwargs):
+        # Kết quả tìm kiếm phụ thuộc chỉ mục, không tính validator cho chúng
+        if request.query_params.get(api_settings.SEARCH_PARAM):
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self._validators(request, validators_queryset)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.queryset.all())
+        return self._conditional(super().list, queryset, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.queryset.all()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Giá trị sai kiểu (vd. /faqs/abc/): get_object() của DRF trả 404
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional(super().retrieve, queryset, request, *args, **kwargs)
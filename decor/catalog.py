@@ -0,0 +1,385 @@
+# your_app/catalog.py
+# Nhập catalog hàng loạt (CSV / JSON Lines) bằng bulk_create/bulk_update.
+#
+# Mỗi dòng là một sản phẩm, khóa upsert là slug (tự sinh từ tên nếu bỏ trống;
+# hai dòng cùng slug mà một trong hai là slug tự sinh bị báo lỗi thay vì gộp):
+#   {"category": "Đèn", "name": "Đèn bàn gỗ", "slug": "", "description": "...",
+#    "price": "450000", "variants": [{"name": "Trắng", "extra_price": 0,
+#    "stock": 10}], "images": ["den-ban/1.jpg", "den-ban/2.jpg"]}
+# CSV dùng cùng tên cột; variants dạng "Trắng:0:10|Đen:50000:5", images "a.jpg|b.jpg".
+
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import cache, documents, search
+from .media import content_addressed_name, save_content_addressed
+from .models import (
+    Category,
+    ImageProcessingJob,
+    Product,
+    ProductImage,
+    ProductVariant,
+)
+from .renditions import DEFAULT_METADATA, metadata_fields
+
+CHUNK_SIZE = 1000
+PRODUCT_FIELDS = ["name", "category", "description", "price", "updated_at"]
+MAX_LENGTHS = {"name": 255, "slug": 255, "category": 100}
+# DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal("1e8")
+
+
+class RowError(ValueError):
+    pass
+
+
+def _split(value, separator="|"):
+    return [part.strip() for part in (value or "").split(separator) if part.strip()]
+
+
+def _csv_row(row):
+    variants = []
+    for item in _split(row.get("variants")):
+        name, _, rest = item.partition(":")
+        extra_price, _, stock = rest.partition(":")
+        variants.append(
+            {"name": name, "extra_price": extra_price or 0, "stock": stock or 0}
+        )
+    return {**row, "variants": variants, "images": _split(row.get("images"))}
+
+
+def read_rows(path, fmt=None):
+    """Đọc lần lượt từng dòng (không nạp cả file), trả về (số dòng, dict)."""
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, _csv_row(row)
+        else:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except ValueError:
+                    # clean_row báo lỗi cho dòng này, các dòng khác vẫn nhập
+                    yield line, None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def clean_row(row):
+    if not isinstance(row, dict):
+        raise RowError("dòng không phải JSON object hợp lệ")
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise RowError("thiếu name")
+    try:
+        price = Decimal(str(row.get("price", "")).strip())
+        variants = [
+            {
+                "variant_name": str(v["name"]).strip(),
+                "extra_price": Decimal(str(v.get("extra_price") or 0)),
+                "stock": int(v.get("stock") or 0),
+            }
+            for v in row.get("variants") or []
+        ]
+    except (InvalidOperation, KeyError, TypeError, ValueError) as e:
+        raise RowError(f"giá trị không hợp lệ: {e!r}")
+    slug = (row.get("slug") or "").strip()
+    row = {
+        "slug": slug or slugify(name, allow_unicode=True),
+        "slug_from_name": not slug,
+        "name": name,
+        "category": (row.get("category") or "").strip(),
+        "description": row.get("description") or "",
+        "price": price,
+        "variants": [v for v in variants if v["variant_name"]],
+        "images": list(row.get("images") or []),
+    }
+    if not row["slug"]:
+        raise RowError("không tạo được slug từ name")
+    # Kiểm tra trước: một dòng lỗi ở DB sẽ làm hỏng cả lô trong transaction
+    for field, limit in MAX_LENGTHS.items():
+        if len(row[field]) > limit:
+            raise RowError(f"{field} dài quá {limit} ký tự")
+    if any(len(v["variant_name"]) > 100 for v in row["variants"]):
+        raise RowError("tên biến thể dài quá 100 ký tự")
+    if not 0 <= price < MAX_PRICE:
+        raise RowError(f"price ngoài khoảng cho phép: {price}")
+    return row
+
+
+def check_duplicate(seen, line, row):
+    """Báo lỗi nếu slug đã có ở dòng trước của file và một trong hai là slug tự
+    sinh (hai tên khác nhau slugify ra cùng slug, hoặc tên trùng nhau).
+
+    ``seen`` là {slug: (dòng, tự sinh?)} dùng chung cho cả file; hai dòng cùng
+    slug ghi rõ vẫn là upsert, dòng sau ghi đè dòng trước.
+    """
+    previous = seen.get(row["slug"])
+    if previous is not None and (row["slug_from_name"] or previous[1]):
+        raise RowError(
+            f"slug {row['slug']} trùng với dòng {previous[0]} "
+            f"(slug tự sinh từ name): cần cột slug riêng"
+        )
+    seen[row["slug"]] = (line, row["slug_from_name"])
+
+
+def _reload_by(model, field, objects):
+    # MySQL không trả về id sau bulk_create
+    if objects and objects[0].pk is None:
+        values = [getattr(obj, field) for obj in objects]
+        found = model.objects.in_bulk(values, field_name=field)
+        objects = [found[value] for value in values]
+    return objects
+
+
+def unique_slugs(model, names):
+    """{tên: slug chưa dùng} cho các bản ghi mới, kiểm tra trùng theo lô."""
+    bases = {name: slugify(name, allow_unicode=True) or "danh-muc" for name in names}
+    taken = set(
+        model.objects.filter(slug__in=set(bases.values())).values_list(
+            "slug", flat=True
+        )
+    )
+    result = {}
+    for name, base in bases.items():
+        slug, n = base, 1
+        while slug in taken:
+            n += 1
+            slug = f"{base}-{n}"
+            if model.objects.filter(slug=slug).exists():
+                taken.add(slug)
+        taken.add(slug)
+        result[name] = slug
+    return result
+
+
+def _categories(names):
+    names = {name for name in names if name}
+    found = Category.objects.in_bulk(names, field_name="name")
+    missing = sorted(names - found.keys())
+    if missing:
+        slugs = unique_slugs(Category, missing)
+        created = Category.objects.bulk_create(
+            [Category(name=name, slug=slugs[name]) for name in missing]
+        )
+        for category in _reload_by(Category, "name", created):
+            found[category.name] = category
+    return found
+
+
+def _store_image(storage, image_root, path):
+    full_path = os.path.join(image_root, path)
+    with open(full_path, "rb") as f:
+        data = f.read()
+    base, ext = os.path.splitext(os.path.basename(path))
+    name = content_addressed_name(
+        f"products/{slugify(base) or 'anh'}", data, ext.lstrip(".").lower() or "jpg"
+    )
+    # Cùng nội dung thì cùng tên: nhập lại không ghi file lần nữa
+    return save_content_addressed(storage, name, ContentFile(data))
+
+
+def store_images(rows, image_root, executor=None):
+    """Chép ảnh gốc vào storage (đặt tên theo hash), song song nếu có ``executor``.
+
+    Trả về ``({(slug, thứ tự): tên file}, [lỗi])``; ảnh không đọc được bị bỏ qua.
+    """
+    storage = ProductImage._meta.get_field("image").storage
+    tasks = [
+        (slug, order, path)
+        for slug, row in rows.items()
+        for order, path in enumerate(row["images"])
+    ]
+
+    def store(task):
+        slug, order, path = task
+        try:
+            return (slug, order), _store_image(storage, image_root, path), None
+        except OSError as e:
+            return (slug, order), None, f"{path}: {e.strerror or e}"
+
+    stored, errors = {}, []
+    for key, name, error in (executor.map if executor else map)(store, tasks):
+        if error:
+            errors.append(error)
+        else:
+            stored[key] = name
+    return stored, errors
+
+
+def _sync_images(products, rows, stored):
+    content_type = ContentType.objects.get_for_model(ProductImage)
+    product_ids = [product.pk for product in products.values()]
+    existing = {
+        (image.product_id, image.sort_order): image
+        for image in ProductImage.objects.filter(product_id__in=product_ids)
+    }
+    jobs = {
+        job.object_id: job
+        for job in ImageProcessingJob.objects.filter(
+            content_type=content_type,
+            field_name="image",
+            object_id__in=[image.pk for image in existing.values()],
+        )
+    }
+    cleared = metadata_fields("image", DEFAULT_METADATA)
+    new_images, changed_images = [], []
+    for slug, row in rows.items():
+        product = products[slug]
+        for order in range(len(row["images"])):
+            name = stored.get((slug, order))
+            if name is None:
+                continue
+            image = existing.get((product.pk, order))
+            if image is None:
+                new_images.append(
+                    ProductImage(
+                        product=product,
+                        image=name,
+                        alt_text=product.name,
+                        sort_order=order,
+                    )
+                )
+                continue
+            job = jobs.get(image.pk)
+            # Ảnh chính đã bị worker thay bằng bản WebP: so với ảnh gốc trong job
+            if name in (image.image.name, job and job.source_name):
+                continue
+            image.image = name
+            for field, value in cleared.items():
+                setattr(image, field, value)
+            changed_images.append(image)
+
+    new_images = ProductImage.objects.bulk_create(new_images)
+    if new_images and new_images[0].pk is None:
+        keys = {(image.product_id, image.sort_order) for image in new_images}
+        new_images = [
+            image
+            for image in ProductImage.objects.filter(product_id__in=product_ids)
+            if (image.product_id, image.sort_order) in keys
+        ]
+    ProductImage.objects.bulk_update(changed_images, ["image", *cleared])
+
+    # Xếp job như signal enqueue_image_processing (bulk_create không gửi signal)
+    new_jobs, reset_jobs = [], []
+    for image in [*new_images, *changed_images]:
+        job = jobs.get(image.pk)
+        if job is None:
+            new_jobs.append(
+                ImageProcessingJob(
+                    content_type=content_type,
+                    object_id=image.pk,
+                    field_name="image",
+                    source_name=image.image.name,
+                )
+            )
+            continue
+        job.source_name = image.image.name
+        job.status, job.attempts, job.last_error = "pending", 0, ""
+        reset_jobs.append(job)
+    ImageProcessingJob.objects.bulk_create(new_jobs)
+    ImageProcessingJob.objects.bulk_update(
+        reset_jobs, ["source_name", "status", "attempts", "last_error"]
+    )
+    return len(new_images) + len(changed_images)
+
+
+def import_chunk(rows, image_root=".", executor=None):
+    """Upsert một lô dòng đã qua :func:`clean_row` trong một transaction.
+
+    ``executor`` (ThreadPoolExecutor) để chép ảnh song song. Trả về
+    {"created", "updated", "variants", "images", "errors"}.
+    """
+    # Slug trùng trong cùng lô: dòng sau ghi đè dòng trước
+    rows = {row["slug"]: row for row in rows}
+    now = timezone.now()
+    # Chép file trước, ngoài transaction; file theo hash thừa lại khi rollback
+    # vẫn vô hại và được dùng lại ở lần nhập sau
+    stored, errors = store_images(rows, image_root, executor)
+    with transaction.atomic():
+        categories = _categories(row["category"] for row in rows.values())
+        products = Product.objects.in_bulk(rows.keys(), field_name="slug")
+
+        new_products, changed_products = [], []
+        for slug, row in rows.items():
+            values = {
+                "name": row["name"],
+                "category": categories.get(row["category"]),
+                "description": row["description"],
+                "price": row["price"],
+            }
+            product = products.get(slug)
+            if product is None:
+                new_products.append(Product(slug=slug, **values))
+                continue
+            if any(getattr(product, k) != v for k, v in values.items()):
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                changed_products.append(product)
+        created = _reload_by(
+            Product, "slug", Product.objects.bulk_create(new_products)
+        )
+        for product in created:
+            products[product.slug] = product
+        Product.objects.bulk_update(changed_products, PRODUCT_FIELDS)
+
+        variants = {
+            (variant.product_id, variant.variant_name): variant
+            for variant in ProductVariant.objects.filter(
+                product_id__in=[product.pk for product in products.values()]
+            )
+        }
+        new_variants, changed_variants = [], []
+        for slug, row in rows.items():
+            product = products[slug]
+            for values in row["variants"]:
+                variant = variants.get((product.pk, values["variant_name"]))
+                if variant is None:
+                    new_variants.append(ProductVariant(product=product, **values))
+                elif (variant.extra_price, variant.stock) != (
+                    values["extra_price"],
+                    values["stock"],
+                ):
+                    variant.extra_price = values["extra_price"]
+                    variant.stock = values["stock"]
+                    changed_variants.append(variant)
+        ProductVariant.objects.bulk_create(new_variants)
+        ProductVariant.objects.bulk_update(changed_variants, ["extra_price", "stock"])
+
+        images = _sync_images(products, rows, stored)
+
+        # Chỉ mục tìm kiếm gồm tên sản phẩm và tên danh mục
+        search.index_objects(
+            Product.objects.filter(
+                pk__in=[product.pk for product in [*created, *changed_products]]
+            ).select_related("category")
+        )
+
+    # bulk_* không gửi post_save: tự vô hiệu hóa response cache / ETag
+    for model in (Category, Product, ProductVariant, ProductImage):
+        cache.bump_version(model)
+    documents.schedule(product.pk for product in products.values())
+    return {
+        "created": len(created),
+        "updated": len(changed_products),
+        "variants": len(new_variants) + len(changed_variants),
+        "images": images,
+        "errors": errors,
+    }
@@ -0,0 +1,216 @@
+# your_app/documents.py
+# JSON chi tiết sản phẩm dựng sẵn (ProductDocument): GET /products/{slug}/ trả
+# thẳng bytes đã lưu sau một truy vấn theo slug, không chạy ProductSerializer.
+#
+# URL ảnh trong JSON là tuyệt đối theo PRODUCT_DOCUMENT_BASE_URL; request tới từ
+# origin khác, có query (trừ ?format=json) hoặc cần renderer khác thì view
+# serialize như thường. Signals (và các thao tác bulk_*) gọi schedule(): chỉ ghi
+# ProductDocumentJob trong cùng transaction, worker process_product_documents dựng
+# lại ngoài request. Trong lúc sản phẩm còn job, view cũng serialize như thường.
+# rebuild_product_documents dựng lại tất cả.
+
+import hashlib
+import logging
+import math
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import iri_to_uri
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from . import cache
+from .models import Product, ProductDocument, ProductDocumentJob, ProductReview
+from .serializers import ProductSerializer
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200
+BATCH_SIZE = CHUNK_SIZE
+# Job "processing" lâu hơn mức này coi như worker đã chết, cho nhận lại
+STALE_AFTER = timedelta(minutes=10)
+
+
+def base_url():
+    base = getattr(settings, "PRODUCT_DOCUMENT_BASE_URL", "")
+    return base.rstrip("/") + "/" if base else ""
+
+
+def detail_queryset():
+    """Queryset của chi tiết sản phẩm, dùng chung cho view và bản dựng sẵn."""
+    review_limit = getattr(settings, "PRODUCT_DETAIL_REVIEW_LIMIT", 5)
+    return Product.objects.select_related("category").prefetch_related(
+        "images__renditions",
+        "variants",
+        Prefetch(
+            "reviews",
+            queryset=ProductReview.objects.order_by("-created_at", "-id")[
+                :review_limit
+            ],
+            to_attr="recent_reviews",
+        ),
+    )
+
+
+class _BaseURL:
+    # Đứng thay request khi render ngoài request: serializer chỉ cần
+    # build_absolute_uri() cho URL ảnh và srcset
+    def __init__(self, base):
+        self.base = base
+
+    def build_absolute_uri(self, location):
+        return iri_to_uri(urljoin(self.base, location))
+
+
+def render(product, base):
+    # Cùng bytes với JSONRenderer của view (Accept: application/json)
+    data = ProductSerializer(product, context={"request": _BaseURL(base)}).data
+    return JSONRenderer().render(data)
+
+
+def rebuild(product_ids=None, chunk_size=CHUNK_SIZE):
+    """Dựng lại JSON của các sản phẩm (tất cả nếu ``product_ids`` là None).
+
+    Trả về số bản đã ghi; 0 nếu chưa đặt PRODUCT_DOCUMENT_BASE_URL.
+    """
+    base = base_url()
+    if not base:
+        return 0
+    queryset = Product.objects.order_by("pk")
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=list(product_ids))
+    ids = list(queryset.values_list("pk", flat=True))
+    count = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        now = timezone.now()
+        documents = []
+        for product in detail_queryset().filter(pk__in=chunk):
+            content = render(product, base)
+            documents.append(
+                ProductDocument(
+                    product=product,
+                    slug=product.slug,
+                    content=content,
+                    etag=hashlib.md5(content).hexdigest(),
+                    updated_at=now,
+                )
+            )
+        slugs = [document.slug for document in documents]
+        # Xóa rồi ghi lại cả lô: slug có thể vừa chuyển giữa các sản phẩm
+        with transaction.atomic():
+            ProductDocument.objects.filter(
+                Q(product_id__in=chunk) | Q(slug__in=slugs)
+            ).delete()
+            ProductDocument.objects.bulk_create(documents)
+        count += len(documents)
+    if count:
+        # Router đọc bản mới từ primary trong lúc replica còn trễ
+        cache.bump_version(ProductDocument)
+    return count
+
+
+def schedule(product_ids):
+    """Đưa các sản phẩm vào hàng đợi dựng lại (một câu upsert, trong transaction
+    hiện tại nên job chỉ có khi thay đổi được commit). Không làm gì nếu chưa đặt
+    PRODUCT_DOCUMENT_BASE_URL.
+    """
+    if not base_url():
+        return
+    now = timezone.now()
+    features = connections[router.db_for_write(ProductDocumentJob)].features
+    # Job đang "processing" được đặt lại "pending": worker sẽ dựng lại lần nữa.
+    # MySQL không nhận unique_fields (ON DUPLICATE KEY theo mọi khóa unique)
+    ProductDocumentJob.objects.bulk_create(
+        [
+            ProductDocumentJob(product_id=product_id, updated_at=now)
+            for product_id in sorted(set(product_ids))
+        ],
+        update_conflicts=True,
+        unique_fields=(
+            ["product_id"] if features.supports_update_conflicts_with_target else None
+        ),
+        update_fields=["status", "updated_at"],
+    )
+
+
+def claim_jobs(batch_size=BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ProductDocumentJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="pending")
+                | Q(status="processing", updated_at__lt=now - STALE_AFTER)
+            )
+            .order_by("id")[:batch_size]
+        )
+        for job in jobs:
+            job.status = "processing"
+            job.updated_at = now
+        ProductDocumentJob.objects.bulk_update(jobs, ["status", "updated_at"])
+    return jobs
+
+
+def process_jobs(batch_size=BATCH_SIZE):
+    """Dựng lại một lô sản phẩm trong hàng đợi. Trả về số job đã nhận."""
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return 0
+    try:
+        rebuild([job.product_id for job in jobs], chunk_size=batch_size)
+    except Exception:
+        # Giữ "processing": nhận lại sau STALE_AFTER
+        logger.exception("Không dựng lại được JSON sản phẩm")
+        return len(jobs)
+    # Job được schedule() lại trong lúc dựng (status/updated_at đã đổi) thì giữ
+    ProductDocumentJob.objects.filter(
+        pk__in=[job.pk for job in jobs],
+        status="processing",
+        updated_at=jobs[0].updated_at,
+    ).delete()
+    return len(jobs)
+
+
+def serve(request, slug):
+    """Response từ ProductDocument, hoặc None để view serialize như thường."""
+    base = base_url()
+    if (
+        not base
+        or request.build_absolute_uri("/") != base
+        or set(request.query_params) - {"format"}
+        or request.accepted_renderer.format != "json"
+        or "indent" in request.accepted_media_type
+    ):
+        return None
+    row = (
+        ProductDocument.objects.filter(slug=slug)
+        # Sản phẩm còn job chưa dựng lại: bản lưu đã cũ
+        .exclude(
+            Exists(
+                ProductDocumentJob.objects.filter(product_id=OuterRef("product_id"))
+            )
+        )
+        .values_list("content", "etag", "updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    content, etag, updated_at = row
+    etag = f'"{etag}"'
+    # HTTP date chỉ tới giây: làm tròn lên như ConditionalGetMixin
+    last_modified = math.ceil(updated_at.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = HttpResponse(bytes(content), content_type="application/json")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,157 @@
+# your_app/export.py
+# Xuất toàn bộ catalog trong một request (JSON Lines / CSV) cho feed quảng cáo
+# và sàn TMĐT, stream từng lô nên bộ nhớ không tăng theo số sản phẩm.
+# Dưới ASGI nội dung là async iterator (mỗi lô một lần chuyển sang thread):
+# Django gom iterator sync vào list trước khi gửi byte đầu tiên.
+
+import csv
+import io
+import json
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import ProductImage, ProductVariant
+
+CHUNK_SIZE = 500
+CONTENT_TYPES = {
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+CSV_FIELDS = [
+    "id",
+    "slug",
+    "name",
+    "category",
+    "category_slug",
+    "description",
+    "price",
+    "min_price",
+    "max_price",
+    "stock",
+    "image",
+    # Cùng định dạng cột variants của import_catalog: "Tên:giá thêm:tồn kho|..."
+    "variants",
+    "rating_avg",
+    "review_count",
+    "updated_at",
+]
+
+
+def _chunks(queryset, chunk_size):
+    # Phân trang theo pk thay vì giữ một cursor mở suốt lúc client tải về;
+    # mysqlclient không có server-side cursor nên .iterator() vẫn nạp hết kết quả
+    first_image = (
+        ProductImage.objects.filter(product=OuterRef("pk"))
+        .order_by("sort_order", "pk")
+        .values("image")[:1]
+    )
+    queryset = (
+        queryset.select_related("category")
+        .annotate(first_image=Subquery(first_image))
+        .order_by("pk")
+    )
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def product_rows(queryset, request, chunk_size=CHUNK_SIZE):
+    """Dict của từng sản phẩm; mỗi lô ``chunk_size`` sản phẩm tốn 2 truy vấn."""
+    storage = ProductImage._meta.get_field("image").storage
+    for chunk in _chunks(queryset, chunk_size):
+        variants = defaultdict(list)
+        for product_id, name, extra_price, stock in (
+            ProductVariant.objects.using(queryset.db)
+            .filter(product_id__in=[p.pk for p in chunk])
+            .order_by("product_id", "pk")
+            .values_list("product_id", "variant_name", "extra_price", "stock")
+        ):
+            variants[product_id].append((name, extra_price, stock))
+
+        for product in chunk:
+            options = variants.get(product.pk, [])
+            extra_prices = [extra for _name, extra, _stock in options] or [0]
+            category = product.category
+            yield {
+                "id": product.pk,
+                "slug": product.slug,
+                "name": product.name,
+                "category": category.name if category else "",
+                "category_slug": category.slug if category else "",
+                "description": product.description,
+                "price": str(product.price),
+                "min_price": str(product.price + min(extra_prices)),
+                "max_price": str(product.price + max(extra_prices)),
+                "stock": sum(stock for _name, _extra, stock in options),
+                "image": (
+                    request.build_absolute_uri(storage.url(product.first_image))
+                    if product.first_image
+                    else ""
+                ),
+                "variants": [
+                    {"name": name, "extra_price": str(extra), "stock": stock}
+                    for name, extra, stock in options
+                ],
+                "rating_avg": str(product.rating_avg),
+                "review_count": product.review_count,
+                "updated_at": product.updated_at.isoformat(),
+            }
+
+
+def _jsonl(rows, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _csv(rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        row["variants"] = "|".join(
+            f"{v['name']}:{v['extra_price']}:{v['stock']}" for v in row["variants"]
+        )
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def _aiterate(content):
+    # Mỗi lần next() đọc một lô từ DB, chạy trên thread sync như view
+    step = sync_to_async(next)
+    done = object()
+    while (chunk := await step(content, done)) is not done:
+        yield chunk
+
+
+def stream_products(queryset, output, request, chunk_size=None):
+    # Chốt database (replica) ngay trong view: generator chạy sau khi middleware
+    # đã trả response, lúc đó decor.routers không còn thấy request này
+    queryset = queryset.using(queryset.db)
+    chunk_size = chunk_size or CHUNK_SIZE
+    rows = product_rows(queryset, request, chunk_size)
+    content = _csv(rows, chunk_size) if output == "csv" else _jsonl(rows, chunk_size)
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content = _aiterate(content)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[output])
+    filename = f"products-{timezone.localdate():%Y%m%d}.{output}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -1,11 +1,48 @@
 # filters.py
 from django_filters import rest_framework as filters
-from .models import BlogPost
+from rest_framework.filters import SearchFilter
+from . import search
+from .models import BlogPost, Product
 
 
 class BlogPostFilter(filters.FilterSet):
-    categories = filters.BaseInFilter(field_name="categories__slug", lookup_expr="in")
+    categories = filters.BaseInFilter(method="filter_categories")
 
     class Meta:
         model = BlogPost
         fields = ["categories"]
+
+    def filter_categories(self, queryset, name, value):
+        # Subquery trên bảng trung gian thay vì JOIN + DISTINCT trên cả bài viết
+        post_ids = BlogPost.categories.through.objects.filter(
+            blogcategory__slug__in=value
+        ).values("blogpost_id")
+        return queryset.filter(pk__in=post_ids)
+
+
+class ProductFilter(filters.FilterSet):
+    min_rating = filters.NumberFilter(field_name="rating_avg", lookup_expr="gte")
+
+    class Meta:
+        model = Product
+        fields = ["min_rating"]
+
+
+class FullTextSearchFilter(SearchFilter):
+    # Thay cho SearchFilter: dùng chỉ mục bỏ dấu + xếp hạng BM25 trong search.py,
+    # quay về LIKE của SearchFilter với model chưa được đánh chỉ mục
+    def filter_queryset(self, request, queryset, view):
+        if not search.is_indexed(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, "")
+        if not query.strip():
+            return queryset
+        queryset, total = search.rank_queryset(queryset, query)
+        limit = search.max_results()
+        if limit is not None and total > limit:
+            # Chỉ limit kết quả đầu được phân trang: báo cho client tổng số thật
+            headers = getattr(view, "headers", None)
+            if headers is not None:
+                headers["X-Search-Total"] = str(total)
+                headers["X-Search-Limit"] = str(limit)
+        return queryset
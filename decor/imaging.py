@@ -0,0 +1,150 @@
+# your_app/imaging.py
+# Xử lý ảnh thuần Pillow, không dùng Django: chạy được trong tiến trình con
+# của ProcessPoolExecutor (kể cả kiểu "spawn").
+
+import base64
+import io
+import time
+from collections import Counter
+
+from PIL import Image
+
+try:
+    RESAMPLE = Image.Resampling.LANCZOS
+except AttributeError:
+    RESAMPLE = Image.LANCZOS
+
+# Ảnh lớn hơn mức này bị từ chối trước khi decode (48 MP từ điện thoại vẫn qua)
+MAX_IMAGE_PIXELS = 64_000_000
+# Ảnh placeholder (LQIP) WebP rất nhỏ, nhúng thẳng vào JSON dạng data URI
+PLACEHOLDER_SIZE = (16, 16)
+PLACEHOLDER_QUALITY = 30
+# Các mode Pillow resample trực tiếp được; mode khác (P, 1, I;16...) đổi trước
+RESAMPLE_MODES = ("RGB", "RGBA", "L", "LA", "CMYK")
+
+FORMAT_OPTIONS = {
+    "avif": ("AVIF", "avif", {"quality": 60}),
+    "webp": ("WEBP", "webp", {"quality": 80}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def encode(img, pil_format, **options):
+    buffer = io.BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def render(img, widths, formats):
+    """Sinh các bản resize từ ảnh đã decode: [(format, width, height, bytes, ext)]."""
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+    results = []
+    # Không phóng to: bậc lớn hơn ảnh gốc được thay bằng đúng kích thước gốc
+    targets = sorted({min(width, img.width) for width in widths})
+    for width in targets:
+        height = max(1, round(img.height * width / img.width))
+        resized = img if width == img.width else img.resize((width, height), RESAMPLE)
+        for fmt in formats:
+            pil_format, ext, options = FORMAT_OPTIONS[fmt]
+            frame = resized
+            if pil_format == "JPEG" and frame.mode != "RGB":
+                frame = frame.convert("RGB")
+            results.append((fmt, width, height, encode(frame, pil_format, **options), ext))
+    return results
+
+
+def image_metadata(img, size=None):
+    """Kích thước, màu chủ đạo (#rrggbb) và placeholder WebP base64 của ảnh.
+
+    ``size`` là kích thước thật khi ``img`` đã được decode thu nhỏ (draft).
+    """
+    width, height = size or img.size
+    sample = img.convert("RGB")
+    sample.thumbnail((64, 64), RESAMPLE, reducing_gap=2.0)
+
+    # Màu của cụm lớn nhất sau khi gom còn 5 màu
+    quantized = sample.quantize(colors=5)
+    index, _ = Counter(quantized.getdata()).most_common(1)[0]
+    r, g, b = quantized.getpalette()[index * 3 : index * 3 + 3]
+
+    tiny = sample.copy()
+    tiny.thumbnail(PLACEHOLDER_SIZE, RESAMPLE)
+    encoded = base64.b64encode(encode(tiny, "WEBP", quality=PLACEHOLDER_QUALITY))
+    return {
+        "width": width,
+        "height": height,
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "placeholder": f"data:image/webp;base64,{encoded.decode('ascii')}",
+    }
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def open_bounded(data, max_pixels=MAX_IMAGE_PIXELS):
+    """Mở ảnh (chỉ đọc header) và từ chối ảnh quá nhiều điểm ảnh trước khi decode."""
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from e
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(
+            f"Ảnh {width}x{height} ({width * height / 1e6:.1f} MP) vượt giới hạn "
+            f"{max_pixels / 1e6:.0f} MP"
+        )
+    return img
+
+
+def decode_fit(img, size):
+    """Decode ảnh đã thu nhỏ vừa ``size`` mà không giữ bản full-size trong RAM.
+
+    JPEG dùng ``draft()`` để libjpeg decode thẳng ở tỉ lệ 1/2, 1/4, 1/8; định dạng
+    khác dùng ``reduce()`` (qua ``reducing_gap``) trước bước LANCZOS cuối.
+    """
+    if img.format == "JPEG":
+        img.draft("RGB", size)
+    if img.mode not in RESAMPLE_MODES:
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    img.thumbnail(size, RESAMPLE, reducing_gap=2.0)
+    return img
+
+
+def resize_to_fit(data, size, quality, max_pixels=MAX_IMAGE_PIXELS):
+    """WebP vừa khung ``size`` (không phóng to), cùng cách resize ảnh chính."""
+    img = decode_fit(open_bounded(data, max_pixels), size)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return encode(img, "WEBP", quality=quality)
+
+
+def process_source(
+    data, name, size, quality, widths, formats, max_pixels=MAX_IMAGE_PIXELS
+):
+    """Xử lý một ảnh gốc đã upload.
+
+    Trả về ``(main, renditions, metadata)``: ``main`` là bytes WebP đã thu nhỏ về
+    ``size`` (None nếu ảnh gốc đã là .webp thì giữ nguyên như trước),
+    ``renditions`` là kết quả của :func:`render` tính từ ảnh chính, ``metadata``
+    của :func:`image_metadata`.
+    """
+    img = open_bounded(data, max_pixels)
+
+    main = None
+    if name.endswith(".webp"):
+        img.load()
+    else:
+        # convert("RGB") chỉ làm trên ảnh đã thu nhỏ
+        img = decode_fit(img, size).convert("RGB")
+        main = encode(img, "WEBP", quality=quality)
+    return main, render(img, widths, formats), image_metadata(img)
+
+
+def timed_process_source(*args):
+    """:func:`process_source` kèm thời gian xử lý (giây), đo trong tiến trình con."""
+    start = time.perf_counter()
+    result = process_source(*args)
+    return time.perf_counter() - start, result
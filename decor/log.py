@@ -0,0 +1,95 @@
+# your_app/log.py
+# Log request dạng JSON qua hàng đợi của stdlib: handler ``requests`` trong
+# settings.LOGGING là một QueueHandler, QueueListener ở thread nền ghi các bản ghi
+# ra handler ``requests_file`` (JSONFormatter).
+#
+# QueueHandler.prepare() (định dạng message, copy bản ghi) vẫn chạy trên thread
+# request: bench_middleware đo thêm khoảng 20-30 µs mỗi request có log INFO.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+
+# QueueHandler ``requests`` dùng hàng đợi này (LOGGING: "ext://decor.log.request_queue")
+request_queue = queue.Queue()
+listener = None
+# Handler đích của listener. logging chỉ giữ weakref tới handler không gắn với
+# logger nào, nên giữ tham chiếu ở đây
+listener_handlers = []
+
+
+class JSONFormatter(logging.Formatter):
+    """Mỗi bản ghi một dòng JSON; các trường trong ``extra={"fields": {...}}``.
+
+    ``fields`` có thể là hàm không tham số: nó được gọi lúc định dạng, tức là ở
+    thread của QueueListener, không phải trên thread xử lý request.
+    """
+
+    def format(self, record):
+        data = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if callable(fields):
+            fields = fields()
+        data.update(fields or {})
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def listener_file_handler(filename, **kwargs):
+    """Factory (``"()"`` trong LOGGING) cho FileHandler mà QueueListener ghi ra."""
+    handler = logging.FileHandler(filename, **kwargs)
+    listener_handlers.append(handler)
+    return handler
+
+
+def _queue_handler():
+    # logging.getHandlerByName chỉ có từ Python 3.12
+    return logging._handlers.get("requests")
+
+
+def start_listener():
+    """Khởi động QueueListener ghi hàng đợi của handler ``requests`` ra các
+    handler ``listener_file_handler`` (gọi trong AppConfig.ready)."""
+    global listener
+    queue_handler = _queue_handler()
+    if queue_handler is None or not listener_handlers or _running():
+        return
+    listener = QueueListener(
+        queue_handler.queue, *listener_handlers, respect_handler_level=True
+    )
+    listener.start()
+
+
+def _after_fork():
+    # Thread listener của tiến trình cha không sang tiến trình con (gunicorn
+    # --preload): khởi động lại với hàng đợi mới, khóa của hàng đợi cũ có thể
+    # đang bị giữ lúc fork
+    if _running():
+        listener._thread = None
+        _queue_handler().queue = queue.Queue()
+        start_listener()
+
+
+def _running():
+    return listener is not None and listener._thread is not None
+
+
+def stop_listener():
+    # Ghi nốt các bản ghi còn trong hàng đợi khi tiến trình thoát
+    if _running():
+        listener.stop()
+
+
+atexit.register(stop_listener)
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from decor import cache, documents, renditions
+from decor.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Điền kích thước, màu chủ đạo và placeholder cho các ảnh đã có "
+        "(ProductImage, BlogPost, Slide, WebsiteInfomation)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="*",
+            help="Chỉ xử lý các model này, ví dụ: decor.productimage",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Tính lại cả ảnh đã có metadata"
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        labels = options["model"]
+        for model, field_name in renditions.image_fields():
+            label = model._meta.label_lower
+            if labels and label not in labels:
+                continue
+            updated, failed = renditions.backfill_metadata(
+                model, field_name, options["force"], options["batch_size"]
+            )
+            if updated:
+                # bulk_update không phát signal: tự làm mới cache/ETag
+                cache.bump_version(model)
+            if updated and model is ProductImage:
+                # Metadata ảnh nằm trong JSON chi tiết sản phẩm dựng sẵn
+                documents.rebuild(
+                    ProductImage.objects.filter(pk__in=updated)
+                    .values_list("product_id", flat=True)
+                    .distinct()
+                )
+            message = f"{label}.{field_name}: {len(updated)} ảnh"
+            if failed:
+                message += f", {failed} lỗi"
+            self.stdout.write(self.style.SUCCESS(message))
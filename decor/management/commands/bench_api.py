@@ -0,0 +1,203 @@
+import json
+import platform
+import random
+import sqlite3
+import statistics
+from time import perf_counter_ns
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from decor.cache import get_cache
+from decor.seed import DEFAULT_SIZES, seed_catalog
+from decor.url import router
+
+# Truy vấn thêm cho route danh sách (tìm kiếm, sắp xếp, lọc, trang sau)
+LIST_VARIANTS = {
+    "product-list": [
+        {"page": 5},
+        {"search": "đèn trang trí"},
+        {"ordering": "-rating_avg"},
+        {"category__slug": "danh-muc-1"},
+    ],
+    "blogpost-list": [{"page": 3}, {"search": "gỗ sồi"}],
+    "page-list": [{"search": "chính sách"}],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark mọi route GET trong decor/url.py trên bộ dữ liệu sinh theo seed: "
+        "p50/p95/p99, số truy vấn và kích thước response; so sánh với file baseline "
+        "JSON. Chạy trên database test tạo mới (SQLite: "
+        "--settings=decor_be.settings_bench), không đụng tới dữ liệu thật"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=int, default=default
+            )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Giữ cache response giữa các lần gọi (mặc định xóa trước mỗi request)",
+        )
+        parser.add_argument("--output", help="Ghi kết quả ra file JSON (baseline)")
+        parser.add_argument("--compare", help="So sánh với file baseline JSON")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Mức chậm hơn p50 cho phép so với baseline (0.25 = 25%%)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            counts = seed_catalog(random.Random(options["seed"]), **sizes)
+            self.stdout.write(
+                "Dữ liệu: " + ", ".join(f"{k}={v}" for k, v in counts.items())
+            )
+            results = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "meta": {
+                "seed": options["seed"],
+                "sizes": sizes,
+                "repeat": options["repeat"],
+                "warm_cache": options["warm_cache"],
+                "database": connection.vendor,
+                "sqlite": sqlite3.sqlite_version,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+                f.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi {options['output']}"))
+        if options["compare"]:
+            self._compare(report, options["compare"], options["tolerance"])
+
+    def _cases(self):
+        """[(tên, url)] cho list, detail và các action GET của mỗi viewset."""
+        cases = []
+        for prefix, viewset, basename in router.registry:
+            list_name = f"{basename}-list"
+            cases.append((list_name, reverse(list_name)))
+            for params in LIST_VARIANTS.get(list_name, []):
+                query = "&".join(f"{k}={v}" for k, v in params.items())
+                cases.append((f"{list_name}?{query}", f"{reverse(list_name)}?{query}"))
+
+            lookup = getattr(viewset, "lookup_field", "pk")
+            # Chọn bản ghi ở giữa bảng cho ổn định giữa các lần chạy
+            values = list(
+                viewset.queryset.order_by("pk").values_list(lookup, flat=True)
+            )
+            if not values:
+                continue
+            kwargs = {lookup: values[len(values) // 2]}
+            detail_name = f"{basename}-detail"
+            cases.append((detail_name, reverse(detail_name, kwargs=kwargs)))
+            for action in viewset.get_extra_actions():
+                if action.detail and "get" in action.mapping:
+                    name = f"{basename}-{action.url_name}"
+                    cases.append((name, reverse(name, kwargs=kwargs)))
+        return cases
+
+    def _run(self, options):
+        client = Client()
+        cache = get_cache()
+        results = {}
+        self.stdout.write(
+            f"{'route':<44}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'bytes':>9}"
+        )
+        for name, url in self._cases():
+            for _ in range(options["warmup"]):
+                client.get(url)
+
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            # Đọc ngay: request_started của các lần gọi sau xóa queries_log
+            query_count = len(queries)
+            timings = []
+            for _ in range(options["repeat"]):
+                if not options["warm_cache"]:
+                    cache.clear()
+                start = perf_counter_ns()
+                client.get(url)
+                timings.append((perf_counter_ns() - start) / 1e6)
+
+            quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+            results[name] = {
+                "url": url,
+                "status": response.status_code,
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(quantiles[94], 3),
+                "p99_ms": round(quantiles[98], 3),
+                "queries": query_count,
+                "bytes": len(response.content),
+            }
+            row = results[name]
+            self.stdout.write(
+                f"{name:<44}{row['status']:>7}{row['p50_ms']:>9.2f}"
+                f"{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['queries']:>9}"
+                f"{row['bytes']:>9}"
+            )
+        return results
+
+    def _compare(self, report, path, tolerance):
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["sizes"] != report["meta"]["sizes"] or (
+            baseline["meta"]["seed"] != report["meta"]["seed"]
+        ):
+            raise CommandError("Baseline được đo với seed/kích thước dữ liệu khác")
+
+        problems = []
+        for name, old in baseline["results"].items():
+            new = report["results"].get(name)
+            if new is None:
+                problems.append(f"{name}: route không còn trong kết quả")
+                continue
+            if new["status"] != old["status"]:
+                problems.append(f"{name}: status {old['status']} -> {new['status']}")
+            # Số truy vấn và kích thước không phụ thuộc máy chạy: so chính xác
+            if new["queries"] > old["queries"]:
+                problems.append(f"{name}: queries {old['queries']} -> {new['queries']}")
+            # p95/p99 với vài chục mẫu dao động nhiều, chỉ chặn theo p50
+            if new["p50_ms"] > old["p50_ms"] * (1 + tolerance):
+                problems.append(
+                    f"{name}: p50 {old['p50_ms']:.2f} -> {new['p50_ms']:.2f} ms"
+                )
+            if new["bytes"] != old["bytes"]:
+                self.stdout.write(f"{name}: bytes {old['bytes']} -> {new['bytes']}")
+
+        if problems:
+            raise CommandError(
+                "Chậm hơn baseline:\n" + "\n".join(f"  {line}" for line in problems)
+            )
+        self.stdout.write(self.style.SUCCESS(f"Không chậm hơn baseline {path}"))
@@ -0,0 +1,247 @@
+import asyncio
+import importlib.util
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from decor.models import Product
+from decor.seed import DEFAULT_SIZES, seed_catalog
+
+# Mỗi lần mở trang: header/footer (có cache response) + danh sách/chi tiết
+ROUTES = [
+    "faq-list",
+    "slide-list",
+    "contactinfo-list",
+    "trackingcode-list",
+    "websiteInformation-list",
+    "product-list",
+    "blogpost-list",
+]
+SERVERS = {
+    # Thread chỉ được trả lại khi đã đọc xong request và gửi xong response
+    "wsgi": lambda o: [
+        "gunicorn",
+        "decor_be.wsgi:application",
+        f"--bind=127.0.0.1:{o['port']}",
+        f"--workers={o['workers']}",
+        "--worker-class=gthread",
+        f"--threads={o['threads']}",
+        f"--backlog={max(2048, o['concurrency'])}",
+        "--log-level=warning",
+    ],
+    # Kết nối do event loop giữ; thread chỉ dùng khi view sync/ORM chạy
+    "asgi": lambda o: [
+        "uvicorn",
+        "decor_be.asgi:application",
+        "--host=127.0.0.1",
+        f"--port={o['port']}",
+        f"--workers={o['workers']}",
+        f"--backlog={max(2048, o['concurrency'])}",
+        "--log-level=warning",
+        "--no-access-log",
+    ],
+}
+
+
+async def _get(port, path, delay):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\n".encode())
+        await writer.drain()
+        if delay:
+            # Client mạng chậm: phần còn lại của request tới sau
+            await asyncio.sleep(delay)
+        writer.write(
+            f"Host: 127.0.0.1:{port}\r\nAccept: application/json\r\n"
+            "Connection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    return int(data[9:12]) if data.startswith(b"HTTP/1.") else 0
+
+
+async def _load(port, paths, options, duration, seed):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies, statuses, errors = [], {}, 0
+
+    async def client(rng):
+        nonlocal errors
+        while loop.time() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    _get(port, rng.choice(paths), options["client_delay"]),
+                    options["timeout"],
+                )
+            except (OSError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    await asyncio.gather(
+        *(client(random.Random(seed + i)) for i in range(options["concurrency"]))
+    )
+    return latencies, statuses, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark tải: cùng bộ dữ liệu seed, so sánh throughput/độ trễ của "
+        "gunicorn (WSGI, gthread) và uvicorn (ASGI) với nhiều client chậm đồng "
+        "thời. Chạy với --settings=decor_be.settings_bench; cần cài gunicorn và "
+        "uvicorn. Client tải chạy cùng máy nên số tuyệt đối chỉ để so sánh"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=int, default=default
+            )
+        parser.add_argument("--server", choices=["both", *SERVERS], default="both")
+        parser.add_argument(
+            "--route",
+            action="append",
+            help="Route cần gọi (lặp lại được); mặc định ROUTES + chi tiết sản phẩm",
+        )
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--warmup", type=float, default=2)
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.05,
+            help="Số giây giữa dòng đầu và phần còn lại của request (0 = client nhanh)",
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Số thread mỗi worker gunicorn"
+        )
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        servers = list(SERVERS) if options["server"] == "both" else [options["server"]]
+        for name in servers:
+            module = SERVERS[name](options)[0]
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"Chưa cài {module}: pip install {module}")
+        if connection.vendor != "sqlite":
+            raise CommandError("Chạy với --settings=decor_be.settings_bench (SQLite)")
+
+        directory = tempfile.mkdtemp(prefix="bench_asgi_")
+        database = os.path.join(directory, "bench.sqlite3")
+        # Các server con đọc cùng file database đã seed (BENCH_DATABASE)
+        connection.settings_dict["TEST"]["NAME"] = database
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            counts = seed_catalog(
+                random.Random(options["seed"]),
+                **{name: options[name] for name in DEFAULT_SIZES},
+            )
+            self.stdout.write(
+                "Dữ liệu: " + ", ".join(f"{k}={v}" for k, v in counts.items())
+            )
+            paths = [reverse(name) for name in options["route"] or ROUTES]
+            slugs = list(Product.objects.order_by("pk").values_list("slug", flat=True))
+            if slugs and not options["route"]:
+                paths.append(reverse("product-detail", args=[slugs[len(slugs) // 2]]))
+            connection.close()
+
+            self.stdout.write(
+                f"{options['concurrency']} client, trễ {options['client_delay']}s, "
+                f"{options['workers']} worker, {options['duration']}s mỗi server"
+            )
+            self.stdout.write(
+                f"{'server':<8}{'requests':>10}{'req/s':>9}{'p50 ms':>9}"
+                f"{'p99 ms':>9}{'lỗi':>7}{'non-200':>9}"
+            )
+            for name in servers:
+                self._bench(name, paths, options, directory, database)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _bench(self, name, paths, options, directory, database):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "decor_be.settings_bench",
+            "BENCH_DATABASE": database,
+            "ASYNC_READ_PATH": str(name == "asgi"),
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [str(settings.BASE_DIR), os.environ.get("PYTHONPATH")])
+            ),
+        }
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        # cwd là thư mục tạm: requests.log/django.log của server ghi vào đó
+        stderr_path = os.path.join(directory, f"{name}.stderr")
+        with open(stderr_path, "wb") as stderr:
+            server = subprocess.Popen(
+                [sys.executable, "-m", *SERVERS[name](options)],
+                cwd=directory,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+            )
+        try:
+            self._wait_ready(server, name, options["port"], paths[0], stderr_path)
+            warmup = dict(options, client_delay=0)
+            asyncio.run(_load(options["port"], paths, warmup, options["warmup"], 0))
+            latencies, statuses, errors = asyncio.run(
+                _load(
+                    options["port"],
+                    paths,
+                    options,
+                    options["duration"],
+                    options["seed"],
+                )
+            )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+        count = len(latencies)
+        quantiles = (
+            statistics.quantiles(latencies, n=100, method="inclusive")
+            if count > 1
+            else [latencies[0] if latencies else 0] * 99
+        )
+        self.stdout.write(
+            f"{name:<8}{count:>10}{count / options['duration']:>9.0f}"
+            f"{statistics.median(latencies or [0]) * 1000:>9.1f}"
+            f"{quantiles[98] * 1000:>9.1f}{errors:>7}"
+            f"{count - statuses.get(200, 0):>9}"
+        )
+
+    def _wait_ready(self, server, name, port, path, stderr_path):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                with open(stderr_path, encoding="utf-8", errors="replace") as f:
+                    raise CommandError(f"{name} dừng khi khởi động:\n{f.read()}")
+            try:
+                if asyncio.run(_get(port, path, 0)) == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"{name} không sẵn sàng sau 30 giây")
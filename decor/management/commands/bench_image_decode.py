@@ -0,0 +1,135 @@
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+import warnings
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from decor import imaging
+
+# (tên file, kích thước, định dạng): ảnh mẫu sinh tại chỗ
+SAMPLES = [
+    ("photo_12mp.jpg", (4000, 3000), "JPEG"),
+    ("photo_48mp.jpg", (8000, 6000), "JPEG"),
+    ("scan_24mp.png", (6000, 4000), "PNG"),
+    ("bomb_96mp.png", (12000, 8000), "PNG"),
+]
+TARGET = (800, 800)
+QUALITY = 85
+
+
+def legacy_resize(data):
+    # Cách cũ của resize_image: decode + convert full-size rồi mới thumbnail
+    img = Image.open(io.BytesIO(data))
+    img = img.convert("RGB")
+    img.thumbnail(TARGET, imaging.RESAMPLE)
+    return imaging.encode(img, "WEBP", quality=QUALITY)
+
+
+def bounded_resize(data):
+    img = imaging.decode_fit(imaging.open_bounded(data), TARGET).convert("RGB")
+    return imaging.encode(img, "WEBP", quality=QUALITY)
+
+
+def _peak_rss_kb():
+    # VmHWM là của riêng tiến trình này; ru_maxrss trên Linux giữ cả giá trị của
+    # tiến trình cha trước exec nên chỉ dùng khi không có /proc
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_case(path, mode, queue):
+    # Chạy trong tiến trình riêng để đo peak RSS của đúng một lần xử lý
+    warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+    with open(path, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    error = ""
+    try:
+        if mode == "legacy":
+            legacy_resize(data)
+        elif mode == "bounded":
+            bounded_resize(data)
+    except Exception as e:
+        error = type(e).__name__
+    elapsed = time.perf_counter() - start
+    peak_kb = _peak_rss_kb()
+    queue.put((elapsed, peak_kb, error))
+
+
+def _sample(path, size, fmt):
+    if fmt == "PNG" and size[0] * size[1] > imaging.MAX_IMAGE_PIXELS:
+        # Ảnh 1-bit nén rất nhỏ nhưng decode ra RGB hàng trăm MB
+        Image.new("1", size).save(path, fmt)
+        return
+    noise = Image.effect_noise(size, 48)
+    gradient = Image.linear_gradient("L").resize(size)
+    Image.merge("RGB", (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT))).save(
+        path, fmt, **({"quality": 90} if fmt == "JPEG" else {"compress_level": 1})
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh peak RSS và thời gian resize ảnh lớn: cách cũ (convert full-size) "
+        "với decode giới hạn bộ nhớ (draft/reduce), mỗi lần đo trong một tiến trình con"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--dir", help="Thư mục chứa ảnh mẫu (mặc định: thư mục tạm, xóa sau khi chạy)"
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or tempfile.mkdtemp(prefix="bench_image_")
+        os.makedirs(directory, exist_ok=True)
+        context = multiprocessing.get_context("spawn")
+        try:
+            baseline = self._measure(context, __file__, "noop", 1)[1]
+            self.stdout.write(f"Baseline RSS (python + Pillow): {baseline / 1024:.0f} MB")
+            self.stdout.write(
+                f"{'image':<16}{'file MB':>8}{'legacy s':>10}{'legacy MB':>11}"
+                f"{'bounded s':>11}{'bounded MB':>12}"
+            )
+            for name, size, fmt in SAMPLES:
+                path = os.path.join(directory, name)
+                if not os.path.exists(path):
+                    _sample(path, size, fmt)
+                row = f"{name:<16}{os.path.getsize(path) / 2**20:>8.1f}"
+                for mode in ("legacy", "bounded"):
+                    elapsed, peak_kb, error = self._measure(
+                        context, path, mode, options["repeat"]
+                    )
+                    width = 10 if mode == "legacy" else 11
+                    # Ảnh bị từ chối (ImageTooLarge...) hiện "rejected" thay cho thời gian
+                    row += f"{'rejected':>{width}}" if error else f"{elapsed:>{width}.3f}"
+                    row += f"{peak_kb / 1024:>{width + 1}.0f}"
+                self.stdout.write(row)
+        finally:
+            if not options["dir"]:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _measure(self, context, path, mode, repeat):
+        times, peaks, error = [], [], ""
+        for _ in range(repeat):
+            queue = context.Queue()
+            process = context.Process(target=_run_case, args=(path, mode, queue))
+            process.start()
+            elapsed, peak_kb, error = queue.get()
+            process.join()
+            times.append(elapsed)
+            peaks.append(peak_kb)
+        return statistics.median(times), max(peaks), error
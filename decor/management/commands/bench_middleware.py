@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+from logging.handlers import QueueHandler, QueueListener
+from time import perf_counter_ns
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from decor.log import JSONFormatter
+from decor.middleware import RequestTimingMiddleware, logger
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo chi phí thêm mỗi request của RequestTimingMiddleware (sync và async), "
+        "có và không ghi log JSON; chi phí của thread QueueListener đo riêng"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        request = RequestFactory().get("/api/products/?page=2")
+        response = HttpResponse(b"{}", content_type="application/json")
+
+        def view(request):
+            return response
+
+        async def async_view(request):
+            return response
+
+        handlers, level = logger.handlers[:], logger.level
+        directory = tempfile.mkdtemp(prefix="bench_middleware_")
+        handler = logging.FileHandler(os.path.join(directory, "requests.log"))
+        handler.setFormatter(JSONFormatter())
+        # Chưa có listener: bản ghi nằm lại trong hàng đợi, chỉ đo phần request
+        records = queue.Queue()
+        logger.handlers = [QueueHandler(records)]
+        try:
+            for label, log_level in (
+                ("không log", logging.WARNING),
+                ("log JSON", logging.INFO),
+            ):
+                logger.setLevel(log_level)
+                sync_ns = self._measure_sync(view, request, count)
+                async_ns = asyncio.run(self._measure_async(async_view, request, count))
+                self.stdout.write(
+                    f"{label:<10} sync: {sync_ns / 1000:.2f} µs/request, "
+                    f"async: {async_ns / 1000:.2f} µs/request"
+                )
+            total = records.qsize()
+            listener = QueueListener(records, handler)
+            start = perf_counter_ns()
+            listener.start()
+            listener.stop()
+            elapsed = perf_counter_ns() - start
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Thread QueueListener: {elapsed / total / 1000:.2f} µs/bản ghi "
+                    f"({total} bản ghi)"
+                )
+            )
+        finally:
+            logger.handlers, logger.level = handlers, level
+            handler.close()
+            for name in os.listdir(directory):
+                os.unlink(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def _measure_sync(self, view, request, count):
+        middleware = RequestTimingMiddleware(view)
+        bare = self._loop(view, request, count)
+        timed = self._loop(middleware, request, count)
+        return (timed - bare) / count
+
+    def _loop(self, handler, request, count):
+        start = perf_counter_ns()
+        for _ in range(count):
+            handler(request)
+        return perf_counter_ns() - start
+
+    async def _measure_async(self, view, request, count):
+        middleware = RequestTimingMiddleware(view)
+        bare = await self._async_loop(view, request, count)
+        timed = await self._async_loop(middleware, request, count)
+        return (timed - bare) / count
+
+    async def _async_loop(self, handler, request, count):
+        start = perf_counter_ns()
+        for _ in range(count):
+            await handler(request)
+        return perf_counter_ns() - start
@@ -0,0 +1,146 @@
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from decor import search
+from decor.filters import FullTextSearchFilter
+from decor.models import Category, Product
+
+WORDS = [
+    "đèn", "trang", "trí", "bàn", "ghế", "gỗ", "sồi", "tủ", "kệ", "sách",
+    "gương", "thảm", "rèm", "cửa", "phòng", "khách", "ngủ", "bếp", "tranh",
+    "treo", "tường", "bình", "hoa", "gốm", "sứ", "nến", "thơm", "gối", "tựa",
+    "chăn", "mây", "tre", "đá", "cẩm", "thạch", "đồng", "hồ", "chùm", "pha",
+    "lê", "vintage", "bắc", "âu", "hiện", "đại", "tối", "giản", "cao", "cấp",
+]
+
+ONSETS = ["b", "c", "ch", "d", "đ", "g", "h", "kh", "l", "m", "n", "ng", "nh", "ph",
+          "s", "t", "th", "tr", "v", "x"]
+RHYMES = ["a", "ai", "an", "ang", "anh", "ao", "at", "e", "em", "en", "i", "inh",
+          "o", "oi", "on", "ong", "u", "ung", "uy", "ương"]
+TONES = {"a": "aàáảãạ", "e": "eèéẻẽẹ", "i": "iìíỉĩị", "o": "oòóỏõọ", "u": "uùúủũụ",
+         "ơ": "ơờớởỡợ"}
+
+QUERIES = [
+    "đèn trang trí",
+    "den trang tri",
+    "ban go soi",
+    "guong treo tuong",
+    "binh hoa gom su",
+    "đèn chùm pha lê",
+    "tham phong khach",
+    "ke sach",
+    "tu bep go",
+    "nen thom",
+]
+
+
+class _View:
+    search_fields = ["name", "description"]
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh tìm kiếm LIKE (SearchFilter) với chỉ mục bỏ dấu (FullTextSearchFilter) "
+        "trên bộ dữ liệu sinh ngẫu nhiên; dữ liệu được rollback sau khi chạy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self._seed(rng, options["rows"])
+            factory = APIRequestFactory()
+            view = _View()
+            like_filter, fts_filter = SearchFilter(), FullTextSearchFilter()
+            self.stdout.write(
+                f"{'query':<22}{'LIKE hits':>10}{'LIKE p50':>10}{'LIKE p95':>10}"
+                f"{'FTS hits':>10}{'FTS p50':>10}{'FTS p95':>10}"
+            )
+            for query in QUERIES:
+                request = Request(factory.get("/", {"search": query}))
+                like = self._measure(like_filter, request, view, options["repeat"])
+                fts = self._measure(fts_filter, request, view, options["repeat"])
+                self.stdout.write(f"{query:<22}{self._row(like)}{self._row(fts)}")
+            self.stdout.write(
+                f"FTS hits are capped at SEARCH_MAX_RESULTS ({search.max_results()})"
+            )
+            transaction.set_rollback(True)
+        for model in search.SEARCH_FIELDS:
+            cache.delete(search._stats_key(search.model_label(model)))
+
+    def _vocabulary(self, rng):
+        # Âm tiết sinh ngẫu nhiên, phân bố Zipf; các từ trong WORDS được rải đều
+        # theo thứ hạng để truy vấn không chỉ rơi vào các term phổ biến nhất
+        syllables = set()
+        for onset in ONSETS:
+            for rhyme in RHYMES:
+                vowel = next((ch for ch in reversed(rhyme) if ch in TONES), None)
+                for tone in TONES.get(vowel, vowel or ""):
+                    syllables.add(onset + rhyme.replace(vowel, tone, 1))
+        syllables = sorted(syllables - set(WORDS))
+        rng.shuffle(syllables)
+        vocabulary = []
+        for rank, word in enumerate(WORDS):
+            vocabulary.extend(syllables[rank * 20 : rank * 20 + 19])
+            vocabulary.append(word)
+        vocabulary.extend(syllables[len(WORDS) * 20 :])
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        return vocabulary, weights
+
+    def _seed(self, rng, rows):
+        started = time.perf_counter()
+        vocabulary, weights = self._vocabulary(rng)
+
+        def words(k):
+            return " ".join(rng.choices(vocabulary, weights=weights, k=k))
+
+        categories = Category.objects.bulk_create(
+            [Category(name=f"bench-{i}", slug=f"bench-{i}") for i in range(20)]
+        )
+        products = []
+        for i in range(rows):
+            products.append(
+                Product(
+                    name=f"{rng.choice(WORDS)} {words(3)}",
+                    slug=f"bench-{i}",
+                    category=rng.choice(categories),
+                    description="".join(f"<p>{words(20)}</p>" for _ in range(3)),
+                    price=rng.randint(100, 10_000),
+                )
+            )
+        products = Product.objects.bulk_create(products, batch_size=2000)
+        seeded = time.perf_counter()
+        for start in range(0, len(products), 2000):
+            search.index_objects(products[start : start + 2000])
+        self.stdout.write(
+            f"Seeded {rows} products in {seeded - started:.1f}s, "
+            f"indexed in {time.perf_counter() - seeded:.1f}s"
+        )
+
+    def _measure(self, backend, request, view, repeat):
+        timings, hits = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.filter_queryset(request, Product.objects.all(), view)
+            # Giống một trang của PageNumberPagination: COUNT + 10 dòng đầu
+            hits = queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - started) * 1000)
+        return hits, timings
+
+    def _row(self, result):
+        hits, timings = result
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        return f"{hits:>10}{statistics.median(timings):>8.1f}ms{p95:>8.1f}ms"
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from decor import sheets
+
+
+class Command(BaseCommand):
+    help = "Gửi các tin nhắn liên hệ trong outbox lên Google Sheet theo lô (append_rows)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=sheets.BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục như một worker"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Số giây nghỉ khi outbox trống"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = self.drain(options["batch_size"])
+            if sent:
+                self.stdout.write(f"Đã gửi {sent} dòng")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def drain(self, batch_size):
+        total = 0
+        while True:
+            sent = sheets.drain_outbox(batch_size=batch_size)
+            total += sent
+            if sent < batch_size:
+                return total
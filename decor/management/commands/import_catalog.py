@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from decor import catalog, renditions
+
+# Chỉ in vài lỗi đầu tiên, phần còn lại chỉ đếm
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Nhập catalog sản phẩm từ CSV hoặc JSON Lines (upsert theo slug): danh mục, "
+        "sản phẩm, biến thể và ảnh, ghi theo lô bằng bulk_create/bulk_update; "
+        "ảnh được resize song song bằng process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File .csv hoặc .jsonl")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=catalog.CHUNK_SIZE)
+        parser.add_argument(
+            "--image-root",
+            help="Thư mục chứa ảnh trong cột images (mặc định: thư mục của file nhập)",
+        )
+        parser.add_argument(
+            "--io-threads", type=int, default=8, help="Số thread chép ảnh vào storage"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Số tiến trình resize ảnh",
+        )
+        parser.add_argument(
+            "--skip-images",
+            action="store_true",
+            help="Chỉ xếp job, để worker process_images resize sau",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"Không tìm thấy file {path}")
+        image_root = options["image_root"] or os.path.dirname(os.path.abspath(path))
+
+        totals = {"rows": 0, "created": 0, "updated": 0, "variants": 0, "images": 0}
+        errors = []
+        # Slug đã gặp trong file, để phát hiện slug tự sinh trùng giữa các lô
+        seen = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["io_threads"]) as io_pool:
+            rows = catalog.read_rows(path, options["format"])
+            for chunk in catalog.chunked(rows, options["chunk_size"]):
+                cleaned = []
+                for line, row in chunk:
+                    try:
+                        row = catalog.clean_row(row)
+                        catalog.check_duplicate(seen, line, row)
+                        cleaned.append(row)
+                    except catalog.RowError as e:
+                        errors.append(f"dòng {line}: {e}")
+                result = catalog.import_chunk(cleaned, image_root, io_pool)
+                errors.extend(result.pop("errors"))
+                totals["rows"] += len(chunk)
+                for key, value in result.items():
+                    totals[key] += value
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{totals['rows']} dòng, {totals['rows'] / elapsed:.0f} dòng/s"
+                )
+        elapsed = time.perf_counter() - start
+
+        for error in errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(error)
+        if len(errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f"... và {len(errors) - MAX_REPORTED_ERRORS} lỗi khác")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Đã nhập {totals['rows']} dòng trong {elapsed:.1f}s "
+                f"({totals['rows'] / max(elapsed, 1e-9):.0f} dòng/s): "
+                f"{totals['created']} sản phẩm mới, {totals['updated']} cập nhật, "
+                f"{totals['variants']} biến thể, {totals['images']} ảnh, "
+                f"{len(errors)} lỗi"
+            )
+        )
+        if totals["images"] and not options["skip_images"]:
+            self._process_images(options["workers"])
+
+    def _process_images(self, workers):
+        # Như process_images: "spawn" để tiến trình con không dùng chung kết nối DB
+        start = time.perf_counter()
+        total = 0
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            batch_size = max(renditions.BATCH_SIZE, workers * 4)
+            while True:
+                claimed = renditions.process_jobs(batch_size, executor=executor)
+                total += claimed
+                if claimed < batch_size:
+                    break
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Đã resize {total} ảnh trong {elapsed:.1f}s "
+                f"({total / max(elapsed, 1e-9):.1f} ảnh/s, {workers} tiến trình)"
+            )
+        )
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from decor import renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Resize ảnh mới upload và tạo các bản srcset trong hàng đợi, "
+        "song song trên nhiều nhân CPU"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="Số tiến trình xử lý"
+        )
+        parser.add_argument("--batch-size", type=int, default=renditions.BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục như một worker"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Số giây nghỉ khi hàng đợi trống"
+        )
+
+    def handle(self, *args, **options):
+        # "spawn": tiến trình con không thừa hưởng kết nối DB của tiến trình cha
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            while True:
+                total = 0
+                while True:
+                    claimed = renditions.process_jobs(
+                        batch_size=options["batch_size"], executor=executor
+                    )
+                    total += claimed
+                    if claimed < options["batch_size"]:
+                        break
+                if total:
+                    self.stdout.write(f"Đã xử lý {total} ảnh")
+                if not options["loop"]:
+                    return
+                time.sleep(options["interval"])
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from decor import documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Dựng lại JSON chi tiết sản phẩm (ProductDocument) cho các sản phẩm trong "
+        "hàng đợi, ngoài request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=documents.BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Chạy liên tục như một worker"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Số giây nghỉ khi hàng đợi trống"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                claimed = documents.process_jobs(batch_size=options["batch_size"])
+                total += claimed
+                if claimed < options["batch_size"]:
+                    break
+            if total:
+                self.stdout.write(f"Đã dựng lại JSON cho {total} sản phẩm")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from decor import documents
+from decor.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Dựng lại JSON chi tiết sản phẩm (ProductDocument), ví dụ sau khi đổi "
+        "PRODUCT_DOCUMENT_BASE_URL hoặc serializer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--slug", nargs="*", help="Chỉ dựng lại cho các sản phẩm có slug này"
+        )
+        parser.add_argument("--chunk-size", type=int, default=documents.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not documents.base_url():
+            raise CommandError("Chưa đặt PRODUCT_DOCUMENT_BASE_URL")
+        product_ids = None
+        if options["slug"]:
+            product_ids = Product.objects.filter(slug__in=options["slug"]).values_list(
+                "pk", flat=True
+            )
+        count = documents.rebuild(product_ids, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Đã dựng lại JSON cho {count} sản phẩm"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from decor import documents
+from decor.models import Product
+from decor.ratings import rebuild_product_ratings
+
+
+class Command(BaseCommand):
+    help = "Tính lại review_count, rating_sum, rating_avg và histogram sao của sản phẩm"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--slug", nargs="*", help="Chỉ tính lại cho các sản phẩm có slug này"
+        )
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options["slug"]:
+            queryset = queryset.filter(slug__in=options["slug"])
+        count = rebuild_product_ratings(queryset)
+        # update() không gửi signal: JSON dựng sẵn chứa rating_avg/histogram
+        documents.rebuild(queryset.values_list("pk", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Đã tính lại đánh giá cho {count} sản phẩm"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from decor import search
+
+
+class Command(BaseCommand):
+    help = "Đánh chỉ mục lại toàn bộ dữ liệu tìm kiếm (Product, BlogPost, Page)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            nargs="*",
+            help="Chỉ đánh chỉ mục các model này, ví dụ: decor.product",
+        )
+
+    def handle(self, *args, **options):
+        labels = options["model"]
+        for model in search.SEARCH_FIELDS:
+            label = search.model_label(model)
+            if labels and label not in labels:
+                continue
+            count = search.rebuild(model)
+            self.stdout.write(self.style.SUCCESS(f"{label}: {count} bản ghi"))
@@ -0,0 +1,50 @@
+# your_app/media.py
+
+import hashlib
+import re
+
+from django.views.static import serve as static_serve
+
+# Tên file chứa 16 ký tự hex đầu của sha256 nội dung: "anh-1a2b3c4d5e6f7a8b.webp"
+HASH_LENGTH = 16
+CONTENT_ADDRESSED_RE = re.compile(rf"-[0-9a-f]{{{HASH_LENGTH}}}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def content_addressed_name(base, content, ext):
+    return f"{base}-{content_digest(content)[:HASH_LENGTH]}.{ext}"
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_RE.search(name))
+
+
+def save_content_addressed(storage, name, content):
+    """Lưu ``content`` dưới ``name`` đã chứa hash; file đã có thì dùng lại.
+
+    Tên gắn với nội dung nên file trùng tên chắc chắn giống hệt, không ghi lại.
+    """
+    if not storage.exists(name):
+        saved = storage.save(name, content)
+        if saved != name:
+            # Hai worker cùng ghi một lúc: bản kia đã thắng, bỏ bản thừa
+            storage.delete(saved)
+    return name
+
+
+def serve(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve + Cache-Control lâu dài cho file theo hash.
+
+    Khi chạy sau nginx, cấu hình tương đương:
+    ``location ~ -[0-9a-f]{16}\\.[a-z0-9]+$ { add_header Cache-Control
+    "public, max-age=31536000, immutable"; }``
+    """
+    response = static_serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and is_content_addressed(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,136 @@
+# your_app/metrics.py
+# Chỉ số Prometheus: thời gian request theo route, truy vấn DB, cache, xử lý ảnh.
+#
+# Nhiều worker (gunicorn) hoặc tiến trình process_images: đặt biến môi trường
+# PROMETHEUS_MULTIPROC_DIR trỏ tới một thư mục rỗng (xóa sạch mỗi lần deploy)
+# cho mọi tiến trình. Mỗi tiến trình ghi số liệu vào file mmap riêng, /metrics
+# cộng gộp tất cả nên worker nào trả lời cũng ra cùng một kết quả.
+#
+# /metrics chỉ trả lời địa chỉ trong settings.METRICS_ALLOWED_IPS (mặc định rỗng:
+# tắt, trả 404). Sau reverse proxy cùng máy REMOTE_ADDR là địa chỉ của proxy, nên
+# Prometheus cần scrape thẳng cổng của app thay vì đi qua proxy.
+
+import ipaddress
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_safe
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+IMAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "decor_request_duration_seconds",
+    "Thời gian xử lý request theo route",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "decor_requests_total",
+    "Số request theo route và nhóm mã trạng thái",
+    ["route", "method", "status"],
+)
+# Counter thay vì histogram cho DB (observe histogram tốn vài µs mỗi lần);
+# trung bình mỗi request = rate(decor_db_queries_total) / rate(decor_requests_total)
+DB_QUERIES = Counter(
+    "decor_db_queries",
+    "Số truy vấn DB theo route",
+    ["route"],
+)
+DB_TIME = Counter(
+    "decor_db_seconds",
+    "Thời gian truy vấn DB theo route",
+    ["route"],
+)
+RESPONSE_CACHE = Counter(
+    "decor_response_cache_total",
+    "Tra cache response của API (result: hit/miss)",
+    ["model", "result"],
+)
+RESIZE_CACHE = Counter(
+    "decor_resize_cache_total",
+    "Tra cache ảnh resize /media/r/ (result: hit/miss)",
+    ["result"],
+)
+IMAGE_PROCESSING = Histogram(
+    "decor_image_processing_seconds",
+    "Thời gian decode/resize/encode một ảnh gốc",
+    ["field"],
+    buckets=IMAGE_BUCKETS,
+)
+IMAGE_JOBS = Counter(
+    "decor_image_jobs_total",
+    "Job xử lý ảnh theo kết quả (processed/reused/failed)",
+    ["field", "result"],
+)
+
+
+def route_name(request):
+    # Tên route của DefaultRouter ("product-list", "blogpost-detail"...), không dùng
+    # path thật để số nhãn không tăng theo id/slug
+    match = request.resolver_match
+    return match.view_name if match is not None else "unmatched"
+
+
+# labels() của prometheus_client khá chậm (khóa, kiểm tra nhãn): giữ sẵn các
+# metric con theo (route, method, status) vì số tổ hợp này có hạn
+_request_children = {}
+
+
+def _request_metrics(route, method, status):
+    key = (route, method, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children[key] = (
+            REQUEST_LATENCY.labels(route, method),
+            REQUESTS.labels(route, method, f"{status // 100}xx"),
+            DB_QUERIES.labels(route),
+            DB_TIME.labels(route),
+        )
+    return children
+
+
+def observe_request(request, status, request_timing):
+    latency, requests, db_queries, db_time = _request_metrics(
+        route_name(request), request.method, status
+    )
+    latency.observe(request_timing.total_ns / 1e9)
+    requests.inc()
+    db_queries.inc(request_timing.db_queries)
+    db_time.inc(request_timing.db_ns / 1e9)
+
+
+def registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+def allowed(request):
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, "METRICS_ALLOWED_IPS", [])
+    )
+
+
+@require_safe
+def metrics(request):
+    if not allowed(request):
+        raise Http404
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -1,55 +1,206 @@
 import logging
-import time
-from datetime import datetime
-from django.utils.deprecation import MiddlewareMixin
+import random
+import traceback
+from functools import partial
+from types import MethodType
 
-logger = logging.getLogger(__name__)
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
+from . import metrics, routers, timing
 
-class CustomLoggerMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        request.start_time = time.time()
-        request.start_datetime = datetime.now()
+logger = logging.getLogger("decor.requests")
 
-    def process_response(self, request, response):
-        # Calculate the duration of the request
-        duration = time.time() - request.start_time
 
-        # Get method, URL, and request start time
-        method = request.method
-        url = request.get_full_path()
-        request_time = request.start_datetime.strftime("%Y-%m-%d %H:%M:%S")
+def request_fields(method, path, query, status, request_timing, message):
+    # JSONFormatter gọi ở thread QueueListener: đổi ns sang ms và ghép URL ở đây,
+    # không trong request
+    return {
+        "method": method,
+        "path": f"{path}?{query}" if query else path,
+        "status": status,
+        "total_ms": request_timing.total_ns / 1e6,
+        "db_ms": request_timing.db_ns / 1e6,
+        "db_queries": request_timing.db_queries,
+        "serialize_ms": request_timing.render_ns / 1e6,
+        "response_message": message,
+    }
 
-        # Check if `response` has `data` attribute and safely access message
-        message_text = ""
-        if hasattr(response, "data") and response.data is not None:
-            message_text = response.data.get("message", "")
 
-        # Create log message
-        message = (
-            f"[{request_time}] {method} {url} - Status: {response.status_code} - "
-            f"Duration: {duration:.2f}s - Message: {message_text}"
-        )
+def error_fields(exception, *args):
+    # QueueHandler bỏ exc_info khỏi bản ghi: traceback đi theo các trường
+    fields = request_fields(*args)
+    fields["exc_info"] = "".join(traceback.format_exception(exception)).rstrip()
+    return fields
+
+
+class RequestTimingMiddleware:
+    """Đo thời gian request (sync và async): header Server-Timing, log JSON và
+    histogram Prometheus theo route (xem metrics.py).
+
+    Các pha: ``db`` (mọi truy vấn, kể cả trong thread của sync_to_async),
+    ``serialize`` (render response của DRF/template) và ``total``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            inline_hooks(self, "process_template_response")
 
-        # Log the detailed information
-        logger.info(message)
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request_timing = timing.RequestTiming()
+        token = timing.current.set(request_timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(request, response, request_timing)
 
+    async def __acall__(self, request):
+        request_timing = timing.RequestTiming()
+        token = timing.current.set(request_timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.current.reset(token)
+        return self._finish(request, response, request_timing)
+
+    def process_template_response(self, request, response):
+        # Gọi ngay trước khi response (DRF Response, TemplateResponse) được render
+        request_timing = timing.current.get()
+        if request_timing is not None:
+            timing.render_started(request_timing)
+            response.add_post_render_callback(
+                lambda rendered: timing.render_finished(request_timing)
+            )
         return response
 
     def process_exception(self, request, exception):
-        # Calculate the duration of the request
-        duration = time.time() - request.start_time
-
-        # Get method, URL, and request start time
-        method = request.method
-        url = request.get_full_path()
-        request_time = request.start_datetime.strftime("%Y-%m-%d %H:%M:%S")
-
-        # Create log message for the exception
-        message = (
-            f"[{request_time}] {method} {url} - Exception: {exception} - "
-            f"Duration: {duration:.2f}s"
+        request_timing = timing.current.get()
+        if request_timing is None or not logger.isEnabledFor(logging.ERROR):
+            return
+        request_timing.finish()
+        logger.error(
+            "request failed: %r",
+            exception,
+            extra={
+                "fields": partial(
+                    error_fields,
+                    exception,
+                    request.method,
+                    request.path,
+                    request.META.get("QUERY_STRING"),
+                    500,
+                    request_timing,
+                    "",
+                )
+            },
         )
 
-        # Log the exception details
-        logger.error(message, exc_info=True)
+    def _finish(self, request, response, request_timing):
+        request_timing.finish()
+        response["Server-Timing"] = request_timing.server_timing()
+        metrics.observe_request(request, response.status_code, request_timing)
+        if logger.isEnabledFor(logging.INFO):
+            data = getattr(response, "data", None)
+            logger.info(
+                "request",
+                extra={
+                    "fields": partial(
+                        request_fields,
+                        request.method,
+                        request.path,
+                        request.META.get("QUERY_STRING"),
+                        response.status_code,
+                        request_timing,
+                        # response.data có thể là list (danh sách không phân trang)
+                        data.get("message", "") if isinstance(data, dict) else "",
+                    )
+                },
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Cho request GET/HEAD/OPTIONS ngoài admin đọc từ một replica (xem
+    decor/routers.py). Request có ghi DB thì đặt cookie để các request tiếp theo
+    của client đó đọc từ primary trong ``REPLICA_LAG_SECONDS`` giây.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            inline_hooks(self, "process_view")
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = routers.RoutingState()
+        token = routers.current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state = routers.RoutingState()
+        token = routers.current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        return self._finish(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Sau khi resolve URL (để nhận ra admin), trước khi view đọc DB
+        state = routers.current.get()
+        aliases = routers.replicas()
+        if (
+            state is not None
+            and aliases
+            and not state.wrote
+            and request.method in ("GET", "HEAD", "OPTIONS")
+            and routers.REPLICA_COOKIE not in request.COOKIES
+            and request.resolver_match.app_name != "admin"
+        ):
+            state.alias = random.choice(aliases)
+
+    def _finish(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                routers.REPLICA_COOKIE,
+                "1",
+                max_age=routers.lag_seconds(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def _inline(method):
+    async def inline(self, *args):
+        return method(*args)
+
+    return inline
+
+
+def inline_hooks(middleware, *names):
+    # Dưới ASGI Django bọc mỗi hook sync (process_view...) bằng sync_to_async:
+    # hook chỉ tính toán, không I/O thì chạy thẳng trên event loop
+    for name in names:
+        method = getattr(middleware, name, None)
+        if method is not None:
+            # Vẫn là bound method: Django đọc __self__ khi báo lỗi
+            setattr(middleware, name, MethodType(_inline(method), middleware))
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:24
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('decor', 'Product')
+    ProductReview = apps.get_model('decor', 'ProductReview')
+    rows = (
+        ProductReview.objects.order_by()
+        .values('product')
+        .annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{star}_count': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+        )
+    )
+    for row in rows:
+        product_id = row.pop('product')
+        row['rating_avg'] = round(row['rating_sum'] / row['review_count'], 2)
+        Product.objects.filter(pk=product_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0024_websiteinfomation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
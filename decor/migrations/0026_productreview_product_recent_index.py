@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0025_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='decor_review_product_recent'),
+        ),
+    ]
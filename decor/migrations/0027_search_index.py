@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0026_productreview_product_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='decor_searchdocument_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField(default=0)),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'term', 'object_id', 'frequency', 'length'], name='decor_posting_term'), models.Index(fields=['model', 'object_id'], name='decor_posting_object')],
+            },
+        ),
+    ]
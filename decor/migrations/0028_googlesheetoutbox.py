@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0027_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleSheetOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sheet_exports', to='decor.contactmessage')),
+            ],
+            options={
+                'verbose_name': 'Hàng đợi Google Sheet',
+                'verbose_name_plural': 'Hàng đợi Google Sheet',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='decor_outbox_due')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('decor', '0028_googlesheetoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field_name', models.CharField(max_length=50)),
+                ('source_name', models.CharField(max_length=255)),
+                ('format', models.CharField(choices=[('avif', 'AVIF'), ('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file', models.ImageField(upload_to='renditions/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Ảnh resize',
+                'verbose_name_plural': 'Ảnh resize',
+                'ordering': ['format', 'width'],
+                'indexes': [models.Index(fields=['content_type', 'object_id', 'field_name'], name='decor_rendition_object')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('decor', '0029_imagerendition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageProcessingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field_name', models.CharField(max_length=50)),
+                ('source_name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Hàng đợi xử lý ảnh',
+                'verbose_name_plural': 'Hàng đợi xử lý ảnh',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='decor_image_job_due')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id', 'field_name'), name='decor_image_job_unique')],
+            },
+        ),
+    ]
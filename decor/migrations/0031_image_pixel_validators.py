@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:08
+
+import decor.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0030_imageprocessingjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blogpost',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Size: 450 x 450px', null=True, upload_to='blog/', validators=[decor.models.validate_image_pixels]),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(help_text='Size: 800 x 800px', upload_to='products/', validators=[decor.models.validate_image_pixels]),
+        ),
+        migrations.AlterField(
+            model_name='slide',
+            name='image',
+            field=models.ImageField(help_text='Size: 1920 x 742 px', upload_to='slides/', validators=[decor.models.validate_image_pixels]),
+        ),
+        migrations.AlterField(
+            model_name='websiteinfomation',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Size: 1200 x 630 px', null=True, upload_to='thumbnail/', validators=[decor.models.validate_image_pixels]),
+        ),
+    ]
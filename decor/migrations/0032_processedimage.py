@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0031_image_pixel_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64)),
+                ('spec', models.CharField(max_length=64)),
+                ('main_name', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Ảnh đã xử lý',
+                'verbose_name_plural': 'Ảnh đã xử lý',
+                'constraints': [models.UniqueConstraint(fields=('digest', 'spec'), name='decor_processed_image_unique')],
+            },
+        ),
+    ]
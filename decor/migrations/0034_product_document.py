@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0033_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='decor.product')),
+                ('slug', models.CharField(max_length=255, unique=True)),
+                ('content', models.BinaryField()),
+                ('etag', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'JSON sản phẩm',
+                'verbose_name_plural': 'JSON sản phẩm',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0034_product_document'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='googlesheetoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
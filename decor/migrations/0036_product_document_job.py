@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decor', '0035_googlesheetoutbox_sending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDocumentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveBigIntegerField(unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing')], default='pending', max_length=10)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Hàng đợi JSON sản phẩm',
+                'verbose_name_plural': 'Hàng đợi JSON sản phẩm',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='decor_document_job_due')],
+            },
+        ),
+    ]
@@ -1,31 +1,23 @@
 # your_app/models.py
 
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.images import get_image_dimensions
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
-from PIL import Image
-from django.core.files.base import ContentFile
-import io
 
-
-def resize_image(image_field, size=(800, 600), quality=75):
-    from PIL import Image
-
-    img = Image.open(image_field)
-    img = img.convert("RGB")
-
-    try:
-        resample = Image.Resampling.LANCZOS
-    except AttributeError:
-        resample = Image.LANCZOS
-
-    img.thumbnail(size, resample)
-
-    buffer = io.BytesIO()
-    name = image_field.name.rsplit("/", 1)[-1].split(".")[0]
-    img.save(buffer, format="WEBP", quality=quality)
-
-    return ContentFile(buffer.getvalue(), name=f"{name}.webp")
+def validate_image_pixels(image):
+    # Chỉ đọc header: chặn ảnh quá lớn (decompression bomb) ngay khi upload
+    limit = getattr(settings, "IMAGE_MAX_PIXELS", 64_000_000)
+    width, height = get_image_dimensions(image)
+    if width and height and width * height > limit:
+        raise ValidationError(
+            f"Ảnh {width}x{height} px quá lớn, tối đa {limit / 1e6:.0f} megapixel."
+        )
 
 
 class Category(models.Model):
@@ -61,6 +53,17 @@ class Product(models.Model):
     )
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Tổng hợp đánh giá, được cập nhật bởi signals của ProductReview
+    review_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(
+        max_digits=3, decimal_places=2, default=0, db_index=True, editable=False
+    )
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -82,21 +85,26 @@ class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
-    image = models.ImageField(upload_to="products/", help_text="Size: 800 x 800px")
+    image = models.ImageField(
+        upload_to="products/",
+        help_text="Size: 800 x 800px",
+        validators=[validate_image_pixels],
+    )
+    # Điền bởi worker xử lý ảnh (hoặc backfill_image_metadata)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     alt_text = models.CharField(max_length=255, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
+    renditions = GenericRelation("ImageRendition")
+    image_jobs = GenericRelation("ImageProcessingJob")
 
     class Meta:
         ordering = ["sort_order"]
         verbose_name = "Hình ảnh sản phẩm (Size: 800 x 800px)"
         verbose_name_plural = "Hình ảnh sản phẩm (Size: 800 x 800px)"
 
-    def save(self, *args, **kwargs):
-        # Resize nếu ảnh mới và chưa phải .webp
-        if self.image and not self.image.name.endswith(".webp"):
-            self.image = resize_image(self.image, size=(800, 800), quality=85)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return f"{self.product.name} – Image #{self.sort_order}"
 
@@ -128,6 +136,12 @@ class ProductReview(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="decor_review_product_recent",
+            ),
+        ]
         verbose_name = "Đánh giá sản phẩm"
         verbose_name_plural = "Đánh giá sản phẩm"
 
@@ -159,6 +173,44 @@ class GoogleServiceAccount(models.Model):
         return self.name
 
 
+class GoogleSheetOutbox(models.Model):
+    # Hàng đợi các dòng cần ghi vào Google Sheet, xử lý bởi drain_sheet_outbox
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    contact = models.ForeignKey(
+        "ContactMessage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="sheet_exports",
+    )
+    row = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="decor_outbox_due"
+            ),
+        ]
+        verbose_name = "Hàng đợi Google Sheet"
+        verbose_name_plural = "Hàng đợi Google Sheet"
+
+    def __str__(self):
+        return f"#{self.pk} ({self.status})"
+
+
 class TrackingCode(models.Model):
     name = models.CharField(max_length=100)
     code = models.TextField()
@@ -204,8 +256,17 @@ class BlogPost(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     thumbnail = models.ImageField(
-        upload_to="blog/", blank=True, null=True, help_text="Size: 450 x 450px"
+        upload_to="blog/",
+        blank=True,
+        null=True,
+        help_text="Size: 450 x 450px",
+        validators=[validate_image_pixels],
     )
+    # Điền bởi worker xử lý ảnh (hoặc backfill_image_metadata)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_color = models.CharField(max_length=7, blank=True, editable=False)
+    thumbnail_placeholder = models.TextField(blank=True, editable=False)
     slug = models.SlugField(
         max_length=255,
         unique=True,
@@ -219,6 +280,8 @@ class BlogPost(models.Model):
     categories = models.ManyToManyField(BlogCategory, related_name="posts", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    renditions = GenericRelation("ImageRendition")
+    image_jobs = GenericRelation("ImageProcessingJob")
 
     class Meta:
         ordering = ["-published_at"]
@@ -228,8 +291,6 @@ class BlogPost(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True)
-        if self.thumbnail and not self.thumbnail.name.endswith(".webp"):
-            self.thumbnail = resize_image(self.thumbnail, size=(450, 450), quality=80)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -294,21 +355,26 @@ class ContactInfo(models.Model):
 
 class Slide(models.Model):
     title = models.CharField(max_length=255)
-    image = models.ImageField(upload_to="slides/", help_text="Size: 1920 x 742 px")
+    image = models.ImageField(
+        upload_to="slides/",
+        help_text="Size: 1920 x 742 px",
+        validators=[validate_image_pixels],
+    )
+    # Điền bởi worker xử lý ảnh (hoặc backfill_image_metadata)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     link = models.URLField(blank=True, null=True)
     sort_order = models.PositiveIntegerField(default=0)
+    renditions = GenericRelation("ImageRendition")
+    image_jobs = GenericRelation("ImageProcessingJob")
 
     class Meta:
         ordering = ["-id"]
         verbose_name = "Slide"
         verbose_name_plural = "Slides"
 
-    def save(self, *args, **kwargs):
-        # Resize ảnh trước khi lưu
-        if self.image and not self.image.name.endswith(".webp"):
-            self.image = resize_image(self.image, size=(1920, 742), quality=85)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.title
 
@@ -317,19 +383,202 @@ class WebsiteInfomation(models.Model):
     title = models.CharField(max_length=255, default="default")
     description = models.CharField(max_length=255, blank=True)
     thumbnail = models.ImageField(
-        upload_to="thumbnail/", blank=True, null=True, help_text="Size: 1200 x 630 px"
+        upload_to="thumbnail/",
+        blank=True,
+        null=True,
+        help_text="Size: 1200 x 630 px",
+        validators=[validate_image_pixels],
     )
+    # Điền bởi worker xử lý ảnh (hoặc backfill_image_metadata)
+    thumbnail_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    thumbnail_color = models.CharField(max_length=7, blank=True, editable=False)
+    thumbnail_placeholder = models.TextField(blank=True, editable=False)
     url = models.CharField(max_length=255, blank=True)
     siteName = models.CharField(max_length=255, blank=True)
+    renditions = GenericRelation("ImageRendition")
+    image_jobs = GenericRelation("ImageProcessingJob")
 
     class Meta:
         verbose_name = "Thông tin website"
         verbose_name_plural = "Thông tin website"
 
-    def save(self, *args, **kwargs):
-        if self.thumbnail and not self.thumbnail.name.endswith(".webp"):
-            self.thumbnail = resize_image(self.thumbnail, size=(1200, 630), quality=85)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.title
+
+
+class ImageRendition(models.Model):
+    # Một bản resize (kích thước + định dạng) của một trường ảnh, dùng cho srcset
+    FORMAT_CHOICES = [
+        ("avif", "AVIF"),
+        ("webp", "WebP"),
+        ("jpeg", "JPEG"),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    field_name = models.CharField(max_length=50)
+    source_name = models.CharField(max_length=255)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.ImageField(upload_to="renditions/")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["format", "width"]
+        indexes = [
+            models.Index(
+                fields=["content_type", "object_id", "field_name"],
+                name="decor_rendition_object",
+            ),
+        ]
+        verbose_name = "Ảnh resize"
+        verbose_name_plural = "Ảnh resize"
+
+    def __str__(self):
+        return f"{self.file.name} ({self.width}x{self.height})"
+
+
+class ProductDocument(models.Model):
+    # JSON chi tiết sản phẩm đã render sẵn (decor/documents.py), GET
+    # /products/{slug}/ trả thẳng nội dung này thay vì serialize lại
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="document"
+    )
+    slug = models.CharField(max_length=255, unique=True)
+    content = models.BinaryField()
+    etag = models.CharField(max_length=32)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "JSON sản phẩm"
+        verbose_name_plural = "JSON sản phẩm"
+
+    def __str__(self):
+        return self.slug
+
+
+class ProductDocumentJob(models.Model):
+    # Sản phẩm chờ dựng lại ProductDocument, xử lý bởi process_product_documents
+    # (ngoài request). Không dùng FK: job của sản phẩm vừa xóa chỉ bị bỏ qua
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+    ]
+
+    product_id = models.PositiveBigIntegerField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["status", "updated_at"], name="decor_document_job_due"
+            ),
+        ]
+        verbose_name = "Hàng đợi JSON sản phẩm"
+        verbose_name_plural = "Hàng đợi JSON sản phẩm"
+
+    def __str__(self):
+        return f"{self.product_id} ({self.status})"
+
+
+class SearchDocument(models.Model):
+    # Một bản ghi cho mỗi đối tượng đã được đánh chỉ mục tìm kiếm
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "object_id"], name="decor_searchdocument_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id}"
+
+
+class SearchPosting(models.Model):
+    # Chỉ mục ngược: term đã bỏ dấu -> đối tượng chứa term đó
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField(default=0)
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Index phủ: chấm điểm BM25 không cần đọc lại bảng
+            models.Index(
+                fields=["model", "term", "object_id", "frequency", "length"],
+                name="decor_posting_term",
+            ),
+            models.Index(fields=["model", "object_id"], name="decor_posting_object"),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.model}#{self.object_id}"
+
+
+class ImageProcessingJob(models.Model):
+    # Ảnh gốc đang chờ resize/tạo srcset, xử lý bởi process_images
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    field_name = models.CharField(max_length=50)
+    source_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id", "field_name"],
+                name="decor_image_job_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "updated_at"], name="decor_image_job_due"),
+        ]
+        verbose_name = "Hàng đợi xử lý ảnh"
+        verbose_name_plural = "Hàng đợi xử lý ảnh"
+
+    def __str__(self):
+        return f"{self.source_name} ({self.status})"
+
+
+class ProcessedImage(models.Model):
+    # Chỉ mục hash nội dung: ảnh gốc đã xử lý với cùng cấu hình thì dùng lại kết quả
+    digest = models.CharField(max_length=64)
+    spec = models.CharField(max_length=64)
+    main_name = models.CharField(max_length=255)
+    metadata = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["digest", "spec"], name="decor_processed_image_unique"
+            ),
+        ]
+        verbose_name = "Ảnh đã xử lý"
+        verbose_name_plural = "Ảnh đã xử lý"
+
+    def __str__(self):
+        return self.main_name
@@ -0,0 +1,217 @@
+# pagination.py
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Phân trang keyset: lọc theo (các trường sắp xếp..., id) thay cho OFFSET.
+
+    Thứ tự lấy từ OrderingFilter của view nếu có, sau đó ``ordering`` của lớp,
+    cuối cùng là ``Meta.ordering`` của model; ``id`` luôn được thêm vào cuối để
+    vị trí là duy nhất, nên chi phí mỗi trang không phụ thuộc độ sâu.
+    """
+
+    ordering = None
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if hasattr(backend, "get_ordering"):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = self.ordering or queryset.model._meta.ordering or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        fields = []
+        tie_breaker = None
+        for order in ordering:
+            name = order.lstrip("-")
+            if name in ("pk", "id"):
+                # Giữ chiều id mà ordering yêu cầu ("-id" vẫn là giảm dần)
+                tie_breaker = "-id" if order.startswith("-") else "id"
+                break
+            assert "__" not in name, (
+                "Keyset pagination does not support ordering across relations."
+            )
+            fields.append(order)
+        if tie_breaker is None:
+            tie_breaker = "-id" if fields and fields[-1].startswith("-") else "id"
+        return (*fields, tie_breaker)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        position, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        if not self.page:
+            self.has_previous = self.has_next = False
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _order_by(self, reverse):
+        expressions = []
+        for order in self.ordering:
+            name = order.lstrip("-")
+            descending = order.startswith("-") != reverse
+            field = self._field(name)
+            if field is not None and field.null:
+                # NULL luôn nằm cuối theo chiều xuôi, đầu theo chiều ngược
+                nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+            else:
+                nulls = {}
+            expression = F(name)
+            expressions.append(
+                expression.desc(**nulls) if descending else expression.asc(**nulls)
+            )
+        return expressions
+
+    def _after(self, position, reverse):
+        """Điều kiện "đứng sau ``position``" theo thứ tự từ điển của các trường."""
+        condition = None
+        for order, value in reversed(list(zip(self.ordering, position))):
+            name = order.lstrip("-")
+            descending = order.startswith("-") != reverse
+            field = self._field(name)
+            nullable = field is not None and field.null
+
+            if value is None:
+                equal = Q(**{f"{name}__isnull": True})
+                # Chiều xuôi NULL ở cuối: không có gì đứng sau NULL
+                strictly_after = Q(**{f"{name}__isnull": False}) if reverse else Q(pk__in=[])
+            else:
+                equal = Q(**{name: value})
+                lookup = "lt" if descending else "gt"
+                strictly_after = Q(**{f"{name}__{lookup}": value})
+                if nullable and not reverse:
+                    strictly_after |= Q(**{f"{name}__isnull": True})
+
+            if condition is None:
+                condition = strictly_after
+            else:
+                condition = strictly_after | (equal & condition)
+        return condition
+
+    def _position(self, instance):
+        position = []
+        for order in self.ordering:
+            name = order.lstrip("-")
+            value = getattr(instance, name)
+            if value is not None:
+                field = self._field(name)
+                value = field.value_to_string(instance) if field else str(value)
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            data = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+            position, reverse = data["p"], bool(data.get("r"))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            # Kiểm tra giá trị hợp lệ với kiểu trường trước khi đưa vào truy vấn
+            for order, value in zip(self.ordering, position):
+                field = self._field(order.lstrip("-"))
+                if value is not None and field is not None:
+                    field.to_python(value)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        data = {"p": position}
+        if reverse:
+            data["r"] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(data, separators=(",", ":")).encode("utf-8")
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded.rstrip("=")
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    # Mặc định vẫn là ?page=; client gửi ?cursor= (kể cả rỗng) để dùng keyset
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        # Thứ tự theo biểu thức (xếp hạng BM25 của ?search=) không biểu diễn được
+        # bằng keyset: khi đó vẫn phân trang theo ?page=
+        if self.keyset_class.cursor_query_param in request.query_params and all(
+            isinstance(order, str) for order in queryset.query.order_by
+        ):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class ReviewCursorPagination(KeysetPagination):
+    # Khớp với index (product, -created_at, -id) của ProductReview
+    ordering = ("-created_at", "-id")
+    page_size = 10
+    max_page_size = 50
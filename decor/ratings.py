@@ -0,0 +1,80 @@
+# your_app/ratings.py
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+from .models import Product, ProductReview
+
+HISTOGRAM_FIELDS = {star: f"rating_{star}_count" for star in range(1, 6)}
+
+
+def _rating_avg_expression():
+    return Case(
+        When(review_count=0, then=Value(0)),
+        default=ExpressionWrapper(
+            Cast(F("rating_sum"), FloatField()) / F("review_count"),
+            output_field=FloatField(),
+        ),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def apply_review_delta(product_id, rating, delta):
+    """Cộng (delta=1) hoặc trừ (delta=-1) một đánh giá vào tổng hợp của sản phẩm."""
+    values = {
+        "review_count": F("review_count") + delta,
+        "rating_sum": F("rating_sum") + delta * rating,
+    }
+    field = HISTOGRAM_FIELDS.get(rating)
+    if field:
+        values[field] = F(field) + delta
+
+    products = Product.objects.filter(pk=product_id)
+    with transaction.atomic():
+        products.update(**values)
+        # Tách thành câu lệnh riêng: MySQL tính SET từ trái sang phải
+        products.update(rating_avg=_rating_avg_expression())
+
+
+def rebuild_product_ratings(queryset=None):
+    """Tính lại toàn bộ tổng hợp đánh giá từ bảng ProductReview."""
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    aggregates = {
+        row["product"]: row
+        for row in ProductReview.objects.filter(product__in=queryset)
+        .order_by()
+        .values("product")
+        .annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            **{
+                field: Count("id", filter=Q(rating=star))
+                for star, field in HISTOGRAM_FIELDS.items()
+            },
+        )
+    }
+
+    fields = ["review_count", "rating_sum", *HISTOGRAM_FIELDS.values()]
+    with transaction.atomic():
+        products = list(queryset.only("pk"))
+        for product in products:
+            row = aggregates.get(product.pk, {})
+            for field in fields:
+                setattr(product, field, row.get(field) or 0)
+        Product.objects.bulk_update(products, fields, batch_size=500)
+        queryset.update(rating_avg=_rating_avg_expression())
+    return len(products)
@@ -0,0 +1,443 @@
+# your_app/renditions.py
+
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from .imaging import (
+    FORMAT_OPTIONS,
+    MAX_IMAGE_PIXELS,
+    ImageTooLarge,
+    decode_fit,
+    image_metadata,
+    open_bounded,
+    timed_process_source,
+)
+from .media import content_addressed_name, content_digest, save_content_addressed
+from .metrics import IMAGE_JOBS, IMAGE_PROCESSING
+from .models import ImageProcessingJob, ImageRendition, ProcessedImage
+
+logger = logging.getLogger(__name__)
+
+# Bậc chiều rộng cho từng trường ảnh, có thể ghi đè bằng settings.IMAGE_RENDITIONS
+DEFAULT_RENDITIONS = {
+    "decor.ProductImage.image": [200, 400, 800],
+    "decor.BlogPost.thumbnail": [225, 450],
+    "decor.Slide.image": [480, 768, 1280, 1920],
+    "decor.WebsiteInfomation.thumbnail": [600, 1200],
+}
+DEFAULT_FORMATS = ["avif", "webp", "jpeg"]
+
+# Kích thước tối đa và chất lượng WebP của ảnh chính (trước đây làm trong save())
+MAIN_IMAGE_SIZES = {
+    "decor.ProductImage.image": ((800, 800), 85),
+    "decor.BlogPost.thumbnail": ((450, 450), 80),
+    "decor.Slide.image": ((1920, 742), 85),
+    "decor.WebsiteInfomation.thumbnail": ((1200, 630), 85),
+}
+
+# Giá trị khi chưa có metadata (ảnh chưa xử lý xong hoặc đã bị xóa)
+DEFAULT_METADATA = {"width": None, "height": None, "color": "", "placeholder": ""}
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 3
+# Job "processing" lâu hơn mức này coi như worker đã chết, cho nhận lại
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _key(model, field_name):
+    return f"{model._meta.app_label}.{model.__name__}.{field_name}"
+
+
+def rendition_widths(model, field_name):
+    config = getattr(settings, "IMAGE_RENDITIONS", DEFAULT_RENDITIONS)
+    return config.get(_key(model, field_name), [])
+
+
+def rendition_fields(model):
+    prefix = f"{model._meta.app_label}.{model.__name__}."
+    config = getattr(settings, "IMAGE_RENDITIONS", DEFAULT_RENDITIONS)
+    return [key[len(prefix) :] for key in config if key.startswith(prefix)]
+
+
+def available_formats():
+    # AVIF chỉ có khi Pillow được build kèm plugin AVIF
+    Image.init()
+    formats = getattr(settings, "IMAGE_RENDITION_FORMATS", DEFAULT_FORMATS)
+    return [fmt for fmt in formats if FORMAT_OPTIONS[fmt][0] in Image.SAVE]
+
+
+def _field_filter(instance, field_name):
+    return {
+        "content_type": ContentType.objects.get_for_model(instance),
+        "object_id": instance.pk,
+        "field_name": field_name,
+    }
+
+
+def metadata_fields(field_name, metadata):
+    """{tên cột: giá trị} của metadata ảnh, ví dụ image_width, thumbnail_color."""
+    return {f"{field_name}_{key}": value for key, value in metadata.items()}
+
+
+def enqueue(instance, field_name):
+    """Đánh dấu trường ảnh là "pending" nếu ảnh gốc chưa được xử lý.
+
+    Gọi từ post_save nên chỉ ghi một dòng job; ảnh gốc được phục vụ nguyên trạng
+    cho đến khi worker ``process_images`` thay bằng bản đã xử lý.
+    """
+    fieldfile = getattr(instance, field_name)
+    lookup = _field_filter(instance, field_name)
+    if not fieldfile:
+        ImageRendition.objects.filter(**lookup).delete()
+        ImageProcessingJob.objects.filter(**lookup).delete()
+        _clear_metadata(instance, field_name)
+        return None
+    if ImageRendition.objects.filter(**lookup, source_name=fieldfile.name).exists():
+        return None
+    job = ImageProcessingJob.objects.filter(**lookup).first()
+    if job and job.source_name == fieldfile.name and job.status != "failed":
+        return job
+    # Metadata của ảnh cũ không còn đúng với ảnh gốc đang chờ xử lý
+    _clear_metadata(instance, field_name)
+    job, _ = ImageProcessingJob.objects.update_or_create(
+        **lookup,
+        defaults={
+            "source_name": fieldfile.name,
+            "status": "pending",
+            "attempts": 0,
+            "last_error": "",
+        },
+    )
+    return job
+
+
+def _clear_metadata(instance, field_name):
+    fields = metadata_fields(field_name, DEFAULT_METADATA)
+    if any(getattr(instance, name) != value for name, value in fields.items()):
+        type(instance).objects.filter(pk=instance.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(instance, name, value)
+
+
+def claim_jobs(batch_size=BATCH_SIZE):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ImageProcessingJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="pending")
+                | Q(status="processing", updated_at__lt=now - STALE_AFTER)
+            )
+            .select_related("content_type")
+            .order_by("id")[:batch_size]
+        )
+        for job in jobs:
+            job.status = "processing"
+            job.attempts += 1
+            job.updated_at = now
+        ImageProcessingJob.objects.bulk_update(
+            jobs, ["status", "attempts", "updated_at"]
+        )
+    return jobs
+
+
+def job_arguments(job):
+    """Tham số (picklable) cho imaging.process_source, đọc ảnh gốc từ storage."""
+    model = job.content_type.model_class()
+    storage = model._meta.get_field(job.field_name).storage
+    with storage.open(job.source_name, "rb") as f:
+        data = f.read()
+    size, quality = MAIN_IMAGE_SIZES[_key(model, job.field_name)]
+    return (
+        data,
+        job.source_name,
+        size,
+        quality,
+        rendition_widths(model, job.field_name),
+        available_formats(),
+        getattr(settings, "IMAGE_MAX_PIXELS", MAX_IMAGE_PIXELS),
+    )
+
+
+def processing_key(args):
+    """(hash nội dung ảnh gốc, hash cấu hình xử lý) dùng làm khóa chống trùng."""
+    data, _name, *spec = args
+    return content_digest(data), content_digest(repr(spec).encode())
+
+
+def _base_name(name):
+    return name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+
+def store_result(job, args, result):
+    """Ghi ảnh chính và các bản resize với tên theo hash nội dung.
+
+    Trả về ``(main_name, [(format, width, height, file_name)], metadata)``.
+    """
+    main, rendered, metadata = result
+    model = job.content_type.model_class()
+    field = model._meta.get_field(job.field_name)
+    base = _base_name(job.source_name)
+    if main is None:
+        # Ảnh gốc đã là WebP: giữ nguyên nội dung, chỉ đổi sang tên theo hash
+        main = args[0]
+    main_name = save_content_addressed(
+        field.storage,
+        field.generate_filename(None, content_addressed_name(base, main, "webp")),
+        ContentFile(main),
+    )
+
+    rendition_field = ImageRendition._meta.get_field("file")
+    files = []
+    for fmt, width, height, content, ext in rendered:
+        name = rendition_field.generate_filename(
+            None, content_addressed_name(f"{base}-{width}w", content, ext)
+        )
+        save_content_addressed(rendition_field.storage, name, ContentFile(content))
+        files.append((fmt, width, height, name))
+    return main_name, files, metadata
+
+
+def cached_result(key):
+    """Kết quả đã xử lý của cùng ảnh gốc + cấu hình, nếu file vẫn còn."""
+    digest, spec = key
+    entry = ProcessedImage.objects.filter(digest=digest, spec=spec).first()
+    if entry is None:
+        return None
+    files = {}
+    for rendition in ImageRendition.objects.filter(source_name=entry.main_name):
+        files.setdefault(
+            (rendition.format, rendition.width),
+            (rendition.format, rendition.width, rendition.height, rendition.file.name),
+        )
+    storage = ImageRendition._meta.get_field("file").storage
+    # Bản ghi cũ chưa có metadata cũng coi như chưa xử lý
+    if not files or not entry.metadata or not storage.exists(entry.main_name):
+        entry.delete()
+        return None
+    return entry.main_name, sorted(files.values()), entry.metadata
+
+
+def apply_result(job, main_name, files, metadata, key=None):
+    """Thay ảnh chính và các bản resize trong một transaction.
+
+    Bỏ qua (trả về False) nếu trong lúc xử lý ảnh đã bị thay hoặc bản ghi đã bị xóa.
+    """
+    model = job.content_type.model_class()
+    with transaction.atomic():
+        current = ImageProcessingJob.objects.select_for_update().filter(pk=job.pk).first()
+        instance = model.objects.select_for_update().filter(pk=job.object_id).first()
+        if (
+            current is None
+            or instance is None
+            or current.source_name != job.source_name
+            or getattr(instance, job.field_name).name != job.source_name
+        ):
+            return False
+
+        ImageRendition.objects.filter(**_field_filter(instance, job.field_name)).delete()
+        ImageRendition.objects.bulk_create(
+            ImageRendition(
+                content_type=job.content_type,
+                object_id=job.object_id,
+                field_name=job.field_name,
+                source_name=main_name,
+                format=fmt,
+                width=width,
+                height=height,
+                file=name,
+            )
+            for fmt, width, height, name in files
+        )
+        if key is not None:
+            ProcessedImage.objects.update_or_create(
+                digest=key[0],
+                spec=key[1],
+                defaults={"main_name": main_name, "metadata": metadata},
+            )
+        fields = metadata_fields(job.field_name, metadata)
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        setattr(instance, job.field_name, main_name)
+        # Bản resize đã có nên post_save không xếp job mới
+        instance.save(update_fields=[job.field_name, *fields])
+        if main_name != job.source_name:
+            storage = getattr(instance, job.field_name).storage
+
+            def delete_source_if_unused():
+                # Ảnh gốc theo hash có thể dùng chung (import_catalog): chỉ xóa khi
+                # không còn bản ghi nào chờ xử lý từ file này
+                lookup = {job.field_name: job.source_name}
+                if not model.objects.filter(**lookup).exists():
+                    storage.delete(job.source_name)
+
+            transaction.on_commit(delete_source_if_unused)
+        ImageProcessingJob.objects.filter(pk=job.pk).update(
+            status="done", last_error="", updated_at=timezone.now()
+        )
+    return True
+
+
+def mark_failed(job, error, retry=True):
+    logger.error(f"Không thể xử lý ảnh {job.source_name}: {error}")
+    give_up = not retry or job.attempts >= MAX_ATTEMPTS
+    ImageProcessingJob.objects.filter(pk=job.pk, source_name=job.source_name).update(
+        status="failed" if give_up else "pending",
+        last_error=error,
+        updated_at=timezone.now(),
+    )
+
+
+def _field_label(job):
+    return _key(job.content_type.model_class(), job.field_name)
+
+
+def _processed(job, result):
+    duration, result = result
+    IMAGE_PROCESSING.labels(_field_label(job)).observe(duration)
+    IMAGE_JOBS.labels(_field_label(job), "processed").inc()
+    return result
+
+
+def _reused(job):
+    IMAGE_JOBS.labels(_field_label(job), "reused").inc()
+
+
+def _failed(job, error, retry=True):
+    IMAGE_JOBS.labels(_field_label(job), "failed").inc()
+    mark_failed(job, error, retry=retry)
+
+
+def process_jobs(batch_size=BATCH_SIZE, executor=None):
+    """Xử lý một lô job; ``executor`` (ProcessPoolExecutor) để chạy song song.
+
+    Trả về số job đã nhận.
+    """
+    jobs = claim_jobs(batch_size)
+    pending, duplicates, keys = [], [], set()
+    for job in jobs:
+        try:
+            args = job_arguments(job)
+            key = processing_key(args)
+            if key in keys:
+                # Trùng với ảnh khác trong cùng lô: chờ bản kia xử lý xong
+                duplicates.append((job, args, key))
+                continue
+            cached = cached_result(key)
+            if cached is not None:
+                # Ảnh trùng với ảnh đã xử lý: dùng lại file, không encode lại
+                apply_result(job, *cached)
+                _reused(job)
+                continue
+        except Exception as e:
+            _failed(job, str(e))
+            continue
+        keys.add(key)
+        future = (
+            None if executor is None else executor.submit(timed_process_source, *args)
+        )
+        pending.append((job, args, key, future))
+
+    for job, args, key, future in pending:
+        try:
+            result = timed_process_source(*args) if future is None else future.result()
+            result = _processed(job, result)
+            apply_result(job, *store_result(job, args, result), key=key)
+        except ImageTooLarge as e:
+            # Thử lại cũng không qua được giới hạn
+            _failed(job, str(e), retry=False)
+        except Exception as e:
+            _failed(job, str(e))
+
+    for job, args, key in duplicates:
+        try:
+            cached = cached_result(key)
+            if cached is None:
+                result = _processed(job, timed_process_source(*args))
+                cached = store_result(job, args, result)
+            else:
+                _reused(job)
+            apply_result(job, *cached, key=key)
+        except ImageTooLarge as e:
+            _failed(job, str(e), retry=False)
+        except Exception as e:
+            _failed(job, str(e))
+    return len(jobs)
+
+
+def image_fields():
+    """[(model, tên trường)] của các trường ảnh do worker xử lý."""
+    result = []
+    for key in MAIN_IMAGE_SIZES:
+        label, field_name = key.rsplit(".", 1)
+        result.append((apps.get_model(label), field_name))
+    return result
+
+
+def read_metadata(storage, name):
+    """Metadata của một file ảnh đã lưu; chỉ decode ở kích thước nhỏ."""
+    max_pixels = getattr(settings, "IMAGE_MAX_PIXELS", MAX_IMAGE_PIXELS)
+    with storage.open(name, "rb") as f:
+        img = open_bounded(f.read(), max_pixels)
+    size = img.size
+    return image_metadata(decode_fit(img, (64, 64)), size)
+
+
+def backfill_metadata(model, field_name, force=False, batch_size=200):
+    """Điền metadata cho các bản ghi cũ; trả về (pk đã cập nhật, số lỗi)."""
+    queryset = model.objects.exclude(**{field_name: ""}).exclude(
+        **{f"{field_name}__isnull": True}
+    )
+    if not force:
+        queryset = queryset.filter(**{f"{field_name}_width__isnull": True})
+    storage = model._meta.get_field(field_name).storage
+    columns = list(metadata_fields(field_name, dict.fromkeys(DEFAULT_METADATA)))
+
+    updated, failed, batch = [], 0, []
+    for instance in queryset.only("pk", field_name).iterator(chunk_size=batch_size):
+        try:
+            metadata = read_metadata(storage, getattr(instance, field_name).name)
+        except Exception as e:
+            logger.error(f"Không đọc được ảnh {model.__name__}#{instance.pk}: {e}")
+            failed += 1
+            continue
+        for name, value in metadata_fields(field_name, metadata).items():
+            setattr(instance, name, value)
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, columns)
+            updated.extend(instance.pk for instance in batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, columns)
+        updated.extend(instance.pk for instance in batch)
+    return updated, failed
+
+
+def srcset(instance, field_name, request=None):
+    """Danh sách bản resize dạng [{url, width, height, format}] cho srcset/<picture>."""
+    items = []
+    for rendition in instance.renditions.all():
+        if rendition.field_name != field_name:
+            continue
+        url = rendition.file.url
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        items.append(
+            {
+                "url": url,
+                "width": rendition.width,
+                "height": rendition.height,
+                "format": rendition.format,
+            }
+        )
+    return items
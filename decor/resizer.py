@@ -0,0 +1,245 @@
+# your_app/resizer.py
+# Resize ảnh theo các khung được phép (RESIZE_SIZES): /media/r/<w>x<h>/<path>,
+# cache trên đĩa.
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .imaging import MAX_IMAGE_PIXELS, ImageTooLarge, resize_to_fit
+from .media import is_content_addressed
+from .metrics import RESIZE_CACHE
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ single-flight trong tiến trình
+    fcntl = None
+
+MAX_DIMENSION = 2560
+QUALITY = 82
+# Thời gian cache phía client cho ảnh gốc không đặt tên theo hash
+MAX_AGE = 60 * 60 * 24
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Chỉ cập nhật mtime (thứ tự LRU) khi lần truy cập trước đã cũ hơn mức này
+TOUCH_INTERVAL = 60 * 60
+LOCK_STRIPES = 256
+
+_local_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_written_lock = threading.Lock()
+_written_bytes = 0
+
+
+def cache_dir():
+    return getattr(
+        settings,
+        "RESIZE_CACHE_DIR",
+        os.path.join(settings.BASE_DIR, "cache", "resize"),
+    )
+
+
+def max_cache_bytes():
+    return getattr(settings, "RESIZE_CACHE_MAX_BYTES", 1024**3)
+
+
+def allowed_sizes():
+    """{(w, h)} được phép: RESIZE_SIZES và các bậc IMAGE_RENDITIONS (khung vuông)."""
+    sizes = set()
+    for size in getattr(settings, "RESIZE_SIZES", []):
+        width, _, height = size.partition("x")
+        sizes.add((int(width), int(height)))
+    for widths in getattr(settings, "IMAGE_RENDITIONS", {}).values():
+        sizes.update((width, width) for width in widths)
+    return sizes
+
+
+def cache_key(path, width, height, source_stamp):
+    raw = f"{path}|{source_stamp}|{width}x{height}|{QUALITY}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_path(key):
+    # 2 cấp thư mục (256 x 256) để mỗi thư mục không quá nhiều file
+    return os.path.join(cache_dir(), key[:2], key[2:4], f"{key}.webp")
+
+
+class _KeyLock:
+    """Khóa theo khóa cache: lock trong tiến trình + flock giữa các worker."""
+
+    def __init__(self, key):
+        stripe = int(key[:2], 16) % LOCK_STRIPES
+        self.local = _local_locks[stripe]
+        self.path = os.path.join(cache_dir(), "locks", f"{stripe:02x}.lock")
+        self.handle = None
+
+    def __enter__(self):
+        self.local.acquire()
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.handle = open(self.path, "a+")
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        self.local.release()
+
+
+def _touch(path):
+    try:
+        if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+    except OSError:
+        pass
+
+
+def _write_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def open_cached(path, width, height):
+    """Mở file đã resize trong cache, tạo nếu chưa có (single-flight).
+
+    Nhiều request cùng lúc cho một bản resize chỉ có một request decode/encode,
+    các request còn lại chờ khóa rồi đọc file vừa ghi. Trả về ``(key, file)``.
+    """
+    try:
+        modified = default_storage.get_modified_time(path).timestamp()
+        stamp = f"{modified}:{default_storage.size(path)}"
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("Không tìm thấy ảnh")
+
+    key = cache_key(path, width, height, stamp)
+    target = cache_path(key)
+    try:
+        handle = open(target, "rb")
+        _touch(target)
+        RESIZE_CACHE.labels("hit").inc()
+        return key, handle
+    except FileNotFoundError:
+        pass
+
+    with _KeyLock(key):
+        exists = os.path.exists(target)
+        # Request khác vừa tạo xong trong lúc chờ khóa vẫn tính là hit
+        RESIZE_CACHE.labels("hit" if exists else "miss").inc()
+        if not exists:
+            with default_storage.open(path, "rb") as f:
+                data = f.read()
+            max_pixels = getattr(settings, "IMAGE_MAX_PIXELS", MAX_IMAGE_PIXELS)
+            try:
+                content = resize_to_fit(data, (width, height), QUALITY, max_pixels)
+            except ImageTooLarge:
+                raise Http404("Ảnh quá lớn")
+            except Exception:
+                raise Http404("Không phải file ảnh hợp lệ")
+            _write_atomic(target, content)
+        handle = open(target, "rb")
+    if not exists:
+        # Dọn sau khi đã mở file: file đang mở vẫn đọc được dù bị xóa
+        _record_write(len(content))
+    return key, handle
+
+
+def _record_write(size):
+    global _written_bytes
+    with _written_lock:
+        _written_bytes += size
+        # Quét lại thư mục sau khi đã ghi thêm ~5% dung lượng cho phép
+        if _written_bytes < max_cache_bytes() * 0.05:
+            return
+        _written_bytes = 0
+    evict()
+
+
+def evict(max_bytes=None, low_water=0.9):
+    """Xóa file ít được dùng nhất (mtime cũ nhất) tới khi còn ``low_water`` giới hạn.
+
+    Trả về số byte đã xóa. Chỉ một tiến trình dọn cache tại một thời điểm.
+    """
+    max_bytes = max_cache_bytes() if max_bytes is None else max_bytes
+    root = cache_dir()
+    lock_path = os.path.join(root, "locks", "evict.lock")
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a+") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+
+        entries, total = [], 0
+        for shard in os.scandir(root):
+            if not shard.is_dir() or shard.name == "locks":
+                continue
+            for sub in os.scandir(shard.path):
+                for entry in os.scandir(sub.path):
+                    # Bỏ qua file *.tmp mà _write_atomic đang ghi dở
+                    if not entry.name.endswith(".webp"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Tiến trình khác vừa thay/xóa file
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= max_bytes:
+            return 0
+
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            if total - removed <= max_bytes * low_water:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            removed += size
+        return removed
+
+
+@require_safe
+def resize(request, width, height, path):
+    if not (
+        0 < width <= MAX_DIMENSION
+        and 0 < height <= MAX_DIMENSION
+        and (width, height) in allowed_sizes()
+    ):
+        raise Http404("Kích thước không hợp lệ")
+    key, handle = open_cached(path, width, height)
+
+    etag = f'"{key[:32]}"'
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        handle.close()
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(handle, content_type="image/webp")
+    response["ETag"] = etag
+    # Ảnh gốc đặt tên theo hash không bao giờ đổi nội dung nên bản resize cũng vậy
+    if is_content_addressed(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
@@ -0,0 +1,74 @@
+# your_app/routers.py
+# Đọc từ bản sao (replica) cho request GET/HEAD/OPTIONS ngoài admin; ghi, admin
+# và mọi thứ ngoài request (worker, lệnh quản trị) dùng "default".
+#
+# Replica trễ hơn primary một chút, nên ngay sau khi ghi thì đọc lại từ primary:
+# - trong cùng request: từ lần ghi đầu tiên trở đi;
+# - client vừa ghi: có cookie REPLICA_COOKIE trong REPLICA_LAG_SECONDS giây
+#   (đặt bởi decor.middleware.ReplicaRoutingMiddleware);
+# - model vừa đổi (cache.model_changed_at), với mọi client: để response cache và
+#   ETag theo phiên bản mới không được dựng từ dữ liệu cũ của replica.
+
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import cache
+
+REPLICA_COOKIE = "decor_primary"
+
+# RoutingState của request đang chạy; None ngoài request
+current = ContextVar("decor_replica_routing", default=None)
+
+
+class RoutingState:
+    __slots__ = ("alias", "wrote")
+
+    def __init__(self):
+        # Replica được chọn cho request này, None = đọc từ primary
+        self.alias = None
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def lag_seconds():
+    return getattr(settings, "REPLICA_LAG_SECONDS", 5)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or state.alias is None:
+            return DEFAULT_DB_ALIAS
+        # Đọc trong transaction phải thấy những gì transaction đó vừa ghi
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        changed_at = cache.model_changed_at(model)
+        if changed_at and time.time() - changed_at < lag_seconds():
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.alias = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của default: quan hệ giữa chúng luôn hợp lệ
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema của replica đến từ replication, không migrate trực tiếp
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,294 @@
+# your_app/search.py
+
+import heapq
+import html
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, Value, When
+from django.utils.html import strip_tags
+
+from .models import BlogPost, Page, Product, SearchDocument, SearchPosting
+
+# Trường được đánh chỉ mục và trọng số của từng trường (BM25F đơn giản)
+SEARCH_FIELDS = {
+    Product: [("name", 3), ("category.name", 2), ("description", 1)],
+    BlogPost: [("title", 3), ("description", 2), ("author_name", 1), ("content", 1)],
+    Page: [("title", 3), ("content", 1)],
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TERM_LENGTH = 64
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+MAX_RESULTS = 500
+CANDIDATE_CHUNK_SIZE = 900
+STATS_TIMEOUT = 300
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def fold(text):
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường: "Đèn trang trí" -> "den trang tri"."""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return text.lower()
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(fold(text))]
+
+
+def _resolve(instance, path):
+    value = instance
+    for attr in path.split("."):
+        value = getattr(value, attr, None)
+        if value is None:
+            return ""
+    return str(value)
+
+
+def _plain_text(value):
+    # Chèn khoảng trắng trước thẻ để "<p>a</p><p>b</p>" không bị dính thành "ab"
+    return html.unescape(strip_tags(value.replace("<", " <")))
+
+
+def _term_frequencies(instance):
+    frequencies = Counter()
+    for path, weight in SEARCH_FIELDS[type(instance)]:
+        for token in tokenize(_plain_text(_resolve(instance, path))):
+            frequencies[token] += weight
+    return frequencies
+
+
+def _build_rows(instance):
+    label = model_label(type(instance))
+    frequencies = _term_frequencies(instance)
+    length = sum(frequencies.values())
+    document = SearchDocument(model=label, object_id=instance.pk, length=length)
+    postings = [
+        SearchPosting(
+            model=label,
+            object_id=instance.pk,
+            term=term,
+            frequency=frequency,
+            length=length,
+        )
+        for term, frequency in frequencies.items()
+    ]
+    return document, postings
+
+
+def _delete_rows(label, object_ids):
+    SearchPosting.objects.filter(model=label, object_id__in=object_ids).delete()
+    SearchDocument.objects.filter(model=label, object_id__in=object_ids).delete()
+
+
+def is_indexed(model):
+    return model in SEARCH_FIELDS
+
+
+def index_instance(instance):
+    index_objects([instance])
+
+
+def index_objects(objects, batch_size=1000):
+    """Đánh chỉ mục lại danh sách đối tượng (cùng một model)."""
+    objects = list(objects)
+    if not objects:
+        return 0
+    label = model_label(type(objects[0]))
+    documents, postings = [], []
+    for instance in objects:
+        document, rows = _build_rows(instance)
+        documents.append(document)
+        postings.extend(rows)
+    with transaction.atomic():
+        _delete_rows(label, [instance.pk for instance in objects])
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+        SearchPosting.objects.bulk_create(postings, batch_size=batch_size)
+    cache.delete(_stats_key(label))
+    return len(objects)
+
+
+def remove_instance(instance):
+    label = model_label(type(instance))
+    with transaction.atomic():
+        _delete_rows(label, [instance.pk])
+    cache.delete(_stats_key(label))
+
+
+def rebuild(model, chunk_size=1000):
+    queryset = model.objects.order_by("pk")
+    if model is Product:
+        queryset = queryset.select_related("category")
+    label = model_label(model)
+    with transaction.atomic():
+        SearchPosting.objects.filter(model=label).delete()
+        SearchDocument.objects.filter(model=label).delete()
+    total = 0
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) >= chunk_size:
+            total += index_objects(chunk)
+            chunk = []
+    total += index_objects(chunk)
+    return total
+
+
+def _stats_key(label):
+    return f"decor:search:stats:{label}"
+
+
+def _collection_stats(label):
+    key = _stats_key(label)
+    stats = cache.get(key)
+    if stats is None:
+        row = SearchDocument.objects.filter(model=label).aggregate(
+            count=Count("id"), avg_length=Avg("length")
+        )
+        stats = (row["count"], row["avg_length"] or 0.0)
+        cache.set(key, stats, STATS_TIMEOUT)
+    return stats
+
+
+def _expand(label, tokens):
+    """Mỗi token -> danh sách term khớp. Token cuối được khớp theo tiền tố."""
+    groups = [[token] for token in tokens]
+    last = tokens[-1]
+    if len(last) >= MIN_PREFIX_LENGTH:
+        # Khoảng [last, last+1) thay cho LIKE 'last%' để luôn dùng được index
+        upper = last[:-1] + chr(ord(last[-1]) + 1)
+        prefixed = (
+            SearchPosting.objects.filter(model=label, term__gte=last, term__lt=upper)
+            .order_by("term")
+            .values_list("term", flat=True)
+            .distinct()[:MAX_PREFIX_EXPANSIONS]
+        )
+        groups[-1] = list(dict.fromkeys([last, *prefixed]))
+    return groups
+
+
+def max_results():
+    """Số kết quả tối đa API trả về cho một truy vấn; None là không giới hạn."""
+    return getattr(settings, "SEARCH_MAX_RESULTS", MAX_RESULTS)
+
+
+def search(model, query, limit=None, queryset=None):
+    """Trả về danh sách (object_id, score) xếp theo BM25, mọi token đều phải khớp.
+
+    Nếu truyền ``queryset``, chỉ xếp hạng các đối tượng thuộc queryset đó;
+    ``limit`` là None thì trả về tất cả kết quả khớp.
+    """
+    scores = _scores(model, query, queryset)
+    return _top(scores, limit)
+
+
+def _rank_key(row):
+    object_id, score = row
+    return -score, object_id
+
+
+def _top(scores, limit):
+    if limit is None or limit >= len(scores):
+        return sorted(scores.items(), key=_rank_key)
+    return heapq.nsmallest(limit, scores.items(), key=_rank_key)
+
+
+def _scores(model, query, queryset=None):
+    """{object_id: điểm BM25} của mọi đối tượng khớp tất cả token."""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return {}
+    label = model_label(model)
+    document_count, avg_length = _collection_stats(label)
+    if not document_count:
+        return {}
+
+    groups = _expand(label, tokens)
+    terms = {term for group in groups for term in group}
+    postings = SearchPosting.objects.filter(model=label, term__in=terms)
+    document_frequencies = dict(
+        postings.order_by().values("term").annotate(df=Count("id")).values_list("term", "df")
+    )
+    if not document_frequencies:
+        return {}
+
+    idf = {
+        term: math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+        for term, df in document_frequencies.items()
+    }
+    if queryset is not None and queryset.query.where:
+        postings = postings.filter(object_id__in=queryset.order_by().values("pk"))
+
+    # AND: duyệt nhóm term từ hiếm đến phổ biến, nhóm sau chỉ đọc posting của
+    # các ứng viên còn lại (tra cứu trên index phủ model, term, object_id)
+    groups.sort(key=lambda group: sum(document_frequencies.get(term, 0) for term in group))
+    length_norm = BM25_K1 * BM25_B / max(avg_length, 1.0)
+    saturation_base = BM25_K1 * (1 - BM25_B)
+    scores = None
+    for group in groups:
+        group_scores = defaultdict(float)
+        group_df = sum(document_frequencies.get(term, 0) for term in group)
+        # Ít ứng viên: tra theo object_id; nhiều ứng viên: đọc cả danh sách posting
+        candidates = scores if scores is not None and len(scores) * 4 < group_df else None
+        for object_id, term, frequency, length in _group_postings(
+            postings, group, candidates
+        ):
+            group_scores[object_id] += (
+                idf[term]
+                * frequency
+                * (BM25_K1 + 1)
+                / (frequency + saturation_base + length_norm * length)
+            )
+        if scores is None:
+            scores = group_scores
+        else:
+            scores = {
+                object_id: score + group_scores[object_id]
+                for object_id, score in scores.items()
+                if object_id in group_scores
+            }
+        if not scores:
+            return {}
+
+    return scores
+
+
+def _group_postings(postings, group, candidates, chunk_size=CANDIDATE_CHUNK_SIZE):
+    rows = postings.filter(term__in=group).order_by()
+    fields = ("object_id", "term", "frequency", "length")
+    if candidates is None:
+        yield from rows.values_list(*fields).iterator(chunk_size=5000)
+        return
+    object_ids = list(candidates)
+    for start in range(0, len(object_ids), chunk_size):
+        chunk = object_ids[start : start + chunk_size]
+        yield from rows.filter(object_id__in=chunk).values_list(*fields)
+
+
+def rank_queryset(queryset, query, limit=None):
+    """Lọc queryset theo kết quả tìm kiếm và sắp xếp theo điểm BM25.
+
+    Chỉ giữ ``limit`` kết quả điểm cao nhất (mặc định max_results()). Trả về
+    (queryset, total) với total là số đối tượng khớp trước khi cắt.
+    """
+    scores = _scores(queryset.model, query, queryset)
+    if not scores:
+        return queryset.none(), 0
+    ranked = _top(scores, max_results() if limit is None else limit)
+    ids = [object_id for object_id, _ in ranked]
+    rank = Case(*[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)])
+    return queryset.filter(pk__in=ids).order_by(rank), len(scores)
@@ -0,0 +1,256 @@
+# your_app/seed.py
+# Sinh bộ dữ liệu giả lập (danh mục, sản phẩm, blog...) cho benchmark.
+# Cùng seed cho ra cùng dữ liệu; ghi bằng bulk_create nên không chạy signals,
+# các bảng tổng hợp (đánh giá, chỉ mục tìm kiếm) được dựng lại ở cuối.
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import documents, search
+from .models import (
+    FAQ,
+    BlogCategory,
+    BlogComment,
+    BlogPost,
+    Category,
+    ContactInfo,
+    ContactMessage,
+    Page,
+    Product,
+    ProductImage,
+    ProductReview,
+    ProductVariant,
+    Slide,
+    TrackingCode,
+    WebsiteInfomation,
+)
+from .ratings import rebuild_product_ratings
+
+WORDS = [
+    "đèn", "trang", "trí", "bàn", "ghế", "gỗ", "sồi", "tủ", "kệ", "sách",
+    "gương", "thảm", "rèm", "cửa", "phòng", "khách", "ngủ", "bếp", "tranh",
+    "treo", "tường", "bình", "hoa", "gốm", "sứ", "nến", "thơm", "gối", "tựa",
+    "chăn", "mây", "tre", "đá", "cẩm", "thạch", "đồng", "hồ", "chùm", "pha",
+    "lê", "vintage", "bắc", "âu", "hiện", "đại", "tối", "giản", "cao", "cấp",
+]
+NAMES = ["An", "Bình", "Chi", "Dũng", "Giang", "Hà", "Khánh", "Lan", "Minh", "Nga"]
+VARIANTS = ["Trắng", "Đen", "Gỗ tự nhiên", "Nhỏ", "Vừa", "Lớn"]
+# Metadata ảnh giả (không ghi file thật, API chỉ trả về URL)
+IMAGE_METADATA = {"width": 800, "height": 800, "color": "#a08060", "placeholder": ""}
+
+DEFAULT_SIZES = {
+    "categories": 20,
+    "products": 1000,
+    "images": 3,
+    "variants": 3,
+    "reviews": 5,
+    "blog_categories": 10,
+    "posts": 200,
+    "comments": 5,
+}
+BATCH_SIZE = 1000
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _paragraphs(rng, count, words=60):
+    return "".join(f"<p>{_text(rng, words)}</p>" for _ in range(count))
+
+
+def _bulk_create(model, objects):
+    objects = model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    if objects and objects[0].pk is None:
+        # MySQL không trả về id sau bulk_create: đọc lại theo slug
+        slugs = [obj.slug for obj in objects]
+        by_slug = model.objects.in_bulk(slugs, field_name="slug")
+        objects = [by_slug[obj.slug] for obj in objects]
+    return objects
+
+
+def seed_catalog(rng, **sizes):
+    """Ghi bộ dữ liệu vào database hiện tại, trả về {tên model: số bản ghi}.
+
+    ``sizes`` ghi đè :data:`DEFAULT_SIZES`; images/variants/reviews là số bản ghi
+    mỗi sản phẩm, comments là số bình luận mỗi bài viết.
+    """
+    sizes = {**DEFAULT_SIZES, **sizes}
+    now = timezone.now()
+    with transaction.atomic():
+        categories = _bulk_create(
+            Category,
+            [
+                Category(name=f"{_text(rng, 2).capitalize()} {i}", slug=f"danh-muc-{i}")
+                for i in range(sizes["categories"])
+            ],
+        )
+
+        products = []
+        for i in range(sizes["products"]):
+            name = f"{_text(rng, 4).capitalize()} {i}"
+            products.append(
+                Product(
+                    name=name,
+                    slug=slugify(name, allow_unicode=True),
+                    category=categories[i % len(categories)] if categories else None,
+                    description=_paragraphs(rng, 2),
+                    price=Decimal(rng.randrange(50, 50_000)) * 1000,
+                )
+            )
+        products = _bulk_create(Product, products)
+
+        images, variants, reviews = [], [], []
+        for product in products:
+            for order in range(sizes["images"]):
+                images.append(
+                    ProductImage(
+                        product=product,
+                        image=f"products/{product.slug}-{order}.webp",
+                        image_width=IMAGE_METADATA["width"],
+                        image_height=IMAGE_METADATA["height"],
+                        image_color=IMAGE_METADATA["color"],
+                        image_placeholder=IMAGE_METADATA["placeholder"],
+                        alt_text=product.name,
+                        sort_order=order,
+                    )
+                )
+            for name in rng.sample(VARIANTS, min(sizes["variants"], len(VARIANTS))):
+                variants.append(
+                    ProductVariant(
+                        product=product,
+                        variant_name=name,
+                        extra_price=Decimal(rng.randrange(0, 500)) * 1000,
+                        stock=rng.randrange(0, 100),
+                    )
+                )
+            for _ in range(sizes["reviews"]):
+                reviews.append(
+                    ProductReview(
+                        product=product,
+                        user_name=rng.choice(NAMES),
+                        rating=rng.choice([3, 4, 4, 5, 5, 5]),
+                        comment=_text(rng, 15),
+                    )
+                )
+        ProductImage.objects.bulk_create(images, batch_size=BATCH_SIZE)
+        ProductVariant.objects.bulk_create(variants, batch_size=BATCH_SIZE)
+        ProductReview.objects.bulk_create(reviews, batch_size=BATCH_SIZE)
+
+        blog_categories = _bulk_create(
+            BlogCategory,
+            [
+                BlogCategory(name=_text(rng, 2).capitalize(), slug=f"chuyen-muc-{i}")
+                for i in range(sizes["blog_categories"])
+            ],
+        )
+        posts = []
+        for i in range(sizes["posts"]):
+            title = f"{_text(rng, 6).capitalize()} {i}"
+            posts.append(
+                BlogPost(
+                    title=title,
+                    slug=slugify(title, allow_unicode=True),
+                    description=_text(rng, 30),
+                    thumbnail=f"blog/bai-viet-{i}.webp",
+                    thumbnail_width=450,
+                    thumbnail_height=450,
+                    content=_paragraphs(rng, 8),
+                    author_name=rng.choice(NAMES),
+                    # 1/10 bài còn là bản nháp, không hiện ra API
+                    status="draft" if i % 10 == 9 else "published",
+                    published_at=now - timedelta(hours=i),
+                )
+            )
+        posts = _bulk_create(BlogPost, posts)
+        post_categories = []
+        for post in posts:
+            if not blog_categories:
+                break
+            for category in rng.sample(blog_categories, min(2, len(blog_categories))):
+                post_categories.append(
+                    BlogPost.categories.through(
+                        blogpost_id=post.pk, blogcategory_id=category.pk
+                    )
+                )
+        BlogPost.categories.through.objects.bulk_create(
+            post_categories, batch_size=BATCH_SIZE
+        )
+        BlogComment.objects.bulk_create(
+            (
+                BlogComment(
+                    post=post,
+                    user_name=name,
+                    user_email=f"{slugify(name)}@example.com",
+                    comment=_text(rng, 20),
+                )
+                for post in posts
+                for name in (rng.choice(NAMES) for _ in range(sizes["comments"]))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        # Dữ liệu cho header/footer của site: cỡ cố định như trên production
+        Page.objects.bulk_create(
+            Page(slug=slug, title=slug.capitalize(), content=_paragraphs(rng, 10))
+            for slug in [
+                "gioi-thieu", "chinh-sach", "van-chuyen", "doi-tra", "bao-hanh"
+            ]
+        )
+        FAQ.objects.bulk_create(
+            FAQ(question=f"{_text(rng, 8)}?", answer=_text(rng, 40), sort_order=i)
+            for i in range(20)
+        )
+        ContactInfo.objects.bulk_create(
+            ContactInfo(type=kind, name=kind.capitalize(), value=_text(rng, 3))
+            for kind, _label in ContactInfo.STATUS_CHOICES
+        )
+        Slide.objects.bulk_create(
+            Slide(
+                title=_text(rng, 4),
+                image=f"slides/slide-{i}.webp",
+                image_width=1920,
+                image_height=742,
+                sort_order=i,
+            )
+            for i in range(5)
+        )
+        TrackingCode.objects.bulk_create(
+            TrackingCode(name=name, code=f"<script>/* {name} */</script>")
+            for name in ["Google Analytics", "Facebook Pixel", "TikTok Pixel"]
+        )
+        WebsiteInfomation.objects.create(
+            title="Decor",
+            description=_text(rng, 20),
+            thumbnail="website/og.webp",
+            url="https://example.com",
+            siteName="Decor",
+        )
+        ContactMessage.objects.bulk_create(
+            ContactMessage(
+                name=rng.choice(NAMES),
+                phone_number=f"09{rng.randrange(10**8):08d}",
+                message=_text(rng, 20),
+            )
+            for _ in range(100)
+        )
+
+        rebuild_product_ratings()
+    for model in search.SEARCH_FIELDS:
+        search.rebuild(model)
+    documents.rebuild()
+
+    return {
+        "categories": len(categories),
+        "products": len(products),
+        "product_images": len(images),
+        "product_variants": len(variants),
+        "product_reviews": len(reviews),
+        "blog_categories": len(blog_categories),
+        "blog_posts": len(posts),
+        "blog_comments": len(posts) * sizes["comments"],
+    }
@@ -1,6 +1,18 @@
 # serializers.py
 from rest_framework import serializers
 from .models import *
+from .renditions import srcset
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    # Các bản resize của một trường ảnh; cần prefetch_related("renditions")
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return srcset(instance, self.image_field, self.context.get("request"))
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -10,9 +22,21 @@ class CategorySerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField("image")
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "alt_text", "sort_order"]
+        fields = [
+            "id",
+            "image",
+            "srcset",
+            "image_width",
+            "image_height",
+            "image_color",
+            "image_placeholder",
+            "alt_text",
+            "sort_order",
+        ]
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
@@ -27,11 +51,49 @@ class ProductReviewSerializer(serializers.ModelSerializer):
         fields = ["id", "user_name", "rating", "comment", "created_at"]
 
 
+class ProductListSerializer(serializers.ModelSerializer):
+    # Dùng cho trang danh sách: queryset phải được annotate/prefetch sẵn
+    # trong ProductViewSet.get_queryset()
+
+    category = CategorySerializer(read_only=True)
+    image = serializers.SerializerMethodField()
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "price",
+            "min_price",
+            "max_price",
+            "category",
+            "image",
+            "review_count",
+            "rating_avg",
+            "created_at",
+            "updated_at",
+        ]
+
+    def get_image(self, obj):
+        # Dùng ảnh đã prefetch, không query thêm
+        images = obj.images.all()
+        if not images:
+            return None
+        return ProductImageSerializer(images[0], context=self.context).data
+
+
 class ProductSerializer(serializers.ModelSerializer):
 
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
-    reviews = ProductReviewSerializer(many=True, read_only=True)
+    # Chỉ N đánh giá mới nhất, phần còn lại lấy qua /products/{slug}/reviews/
+    reviews = ProductReviewSerializer(
+        source="recent_reviews", many=True, read_only=True
+    )
+    rating_histogram = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
 
     class Meta:
@@ -47,9 +109,15 @@ class ProductSerializer(serializers.ModelSerializer):
             "updated_at",
             "images",
             "variants",
+            "review_count",
+            "rating_avg",
+            "rating_histogram",
             "reviews",
         ]
 
+    def get_rating_histogram(self, obj):
+        return {str(star): getattr(obj, f"rating_{star}_count") for star in range(1, 6)}
+
 
 class PageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -81,9 +149,32 @@ class BlogCommentSerializer(serializers.ModelSerializer):
         fields = ["id", "post", "user_name", "user_email", "comment", "created_at"]
 
 
+class BlogPostListSerializer(serializers.ModelSerializer):
+    categories = BlogCategorySerializer(many=True, read_only=True)
+    thumbnail_srcset = SrcsetField("thumbnail")
+
+    class Meta:
+        model = BlogPost
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "thumbnail",
+            "thumbnail_srcset",
+            "thumbnail_width",
+            "thumbnail_height",
+            "thumbnail_color",
+            "thumbnail_placeholder",
+            "description",
+            "published_at",
+            "categories",
+        ]
+
+
 class BlogPostSerializer(serializers.ModelSerializer):
     categories = BlogCategorySerializer(many=True, read_only=True)
     comments = BlogCommentSerializer(many=True, read_only=True)
+    thumbnail_srcset = SrcsetField("thumbnail")
 
     class Meta:
         model = BlogPost
@@ -92,6 +183,11 @@ class BlogPostSerializer(serializers.ModelSerializer):
             "title",
             "slug",
             "thumbnail",
+            "thumbnail_srcset",
+            "thumbnail_width",
+            "thumbnail_height",
+            "thumbnail_color",
+            "thumbnail_placeholder",
             "description",
             "content",
             "author_name",
@@ -117,12 +213,39 @@ class ContactInfoSerializer(serializers.ModelSerializer):
 
 
 class SlideSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField("image")
+
     class Meta:
         model = Slide
-        fields = ["id", "title", "link", "image", "sort_order"]
+        fields = [
+            "id",
+            "title",
+            "link",
+            "image",
+            "srcset",
+            "image_width",
+            "image_height",
+            "image_color",
+            "image_placeholder",
+            "sort_order",
+        ]
 
 
 class WebsiteInfomationSerializer(serializers.ModelSerializer):
+    thumbnail_srcset = SrcsetField("thumbnail")
+
     class Meta:
         model = WebsiteInfomation
-        fields = ["id", "title", "description", "thumbnail", "url", "siteName"]
+        fields = [
+            "id",
+            "title",
+            "description",
+            "thumbnail",
+            "thumbnail_srcset",
+            "thumbnail_width",
+            "thumbnail_height",
+            "thumbnail_color",
+            "thumbnail_placeholder",
+            "url",
+            "siteName",
+        ]
@@ -0,0 +1,183 @@
+# your_app/sheets.py
+
+import json
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import GoogleServiceAccount, GoogleSheetOutbox
+
+logger = logging.getLogger(__name__)
+
+SCOPE = ["https://www.googleapis.com/auth/spreadsheets"]
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 10
+BACKOFF_BASE = 30  # giây
+BACKOFF_MAX = 60 * 60
+# Dòng "sending" quá thời hạn này (worker chết khi đang gửi) được nhận lại
+SEND_TIMEOUT = timedelta(minutes=5)
+
+# Client gspread đã xác thực, dùng lại giữa các lần gọi trong cùng tiến trình
+_client_lock = threading.Lock()
+_client_cache = {}
+
+
+def get_google_config():
+    try:
+        cfg = GoogleServiceAccount.objects.first()
+        if not cfg or not cfg.credentials_file or not cfg.spreadsheet_id:
+            raise Exception(
+                "Chưa cấu hình GoogleServiceAccount (file JSON hoặc spreadsheet_id)."
+            )
+        with cfg.credentials_file.open("r") as f:
+            info = json.load(f)
+        return info, cfg.spreadsheet_id
+    except Exception as e:
+        logger.error(f"Lỗi load Google config từ DB: {e}")
+        return None, None
+
+
+def _config_identity():
+    # Định danh cấu hình: đổi file JSON hoặc spreadsheet_id trong admin sẽ đổi khóa
+    return (
+        GoogleServiceAccount.objects.order_by("pk")
+        .values_list("pk", "credentials_file", "spreadsheet_id")
+        .first()
+    )
+
+
+def reset_client():
+    with _client_lock:
+        _client_cache.clear()
+
+
+def open_worksheet():
+    """Worksheet thật qua gspread; trả về None nếu chưa cấu hình.
+
+    Client và worksheet được cache theo định danh cấu hình. Credentials là của
+    google-auth: AuthorizedSession tự làm mới token trước request khi hết hạn.
+    """
+    import gspread
+
+    identity = _config_identity()
+    if not identity:
+        return None
+
+    with _client_lock:
+        cached = _client_cache.get("worksheet")
+        if cached and cached["identity"] == identity:
+            return cached["worksheet"]
+
+        info, spreadsheet_id = get_google_config()
+        if not info or not spreadsheet_id:
+            return None
+        client = gspread.service_account_from_dict(info, scopes=SCOPE)
+        worksheet = client.open_by_key(spreadsheet_id).sheet1
+        _client_cache.clear()
+        _client_cache["worksheet"] = {"identity": identity, "worksheet": worksheet}
+        return worksheet
+
+
+def get_worksheet():
+    # Cho phép thay client (ví dụ client giả trong test) qua settings
+    factory = getattr(settings, "GOOGLE_SHEETS_WORKSHEET_FACTORY", None)
+    if factory:
+        return import_string(factory)()
+    return open_worksheet()
+
+
+def contact_row(contact):
+    local_dt = timezone.localtime(contact.created_at)
+    return [
+        local_dt.strftime("%Y-%m-%d"),
+        local_dt.strftime("%H:%M"),
+        contact.name,
+        contact.phone_number,
+        contact.message.replace("\n", " "),
+    ]
+
+
+def enqueue_contact(contact):
+    return GoogleSheetOutbox.objects.create(contact=contact, row=contact_row(contact))
+
+
+def backoff_delay(attempts):
+    # Exponential backoff có jitter: 30s, 60s, 120s... tối đa 1 giờ
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_entries(batch_size=BATCH_SIZE):
+    """Nhận một lô dòng đến hạn: đánh dấu "sending" rồi commit ngay.
+
+    Dòng "sending" quá SEND_TIMEOUT được nhận lại, nên worker chết giữa chừng
+    chỉ có thể làm một dòng bị gửi hai lần, không làm mất dòng.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            GoogleSheetOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["pending", "sending"], next_attempt_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        for entry in entries:
+            entry.status = "sending"
+            entry.attempts += 1
+            entry.next_attempt_at = now + SEND_TIMEOUT
+        GoogleSheetOutbox.objects.bulk_update(
+            entries, ["status", "attempts", "next_attempt_at"]
+        )
+    return entries
+
+
+def drain_outbox(batch_size=BATCH_SIZE, worksheet=None):
+    """Gửi một lô dòng đến hạn bằng một lần append_rows.
+
+    Lời gọi Google Sheets chạy ngoài transaction: API chậm hay treo không giữ
+    khóa các dòng outbox. Trả về số dòng đã gửi thành công (0 nếu không có gì
+    để gửi hoặc lỗi).
+    """
+    entries = claim_entries(batch_size)
+    if not entries:
+        return 0
+
+    try:
+        if worksheet is None:
+            worksheet = get_worksheet()
+        if worksheet is None:
+            raise Exception("Chưa cấu hình GoogleServiceAccount.")
+        worksheet.append_rows(
+            [entry.row for entry in entries], value_input_option="USER_ENTERED"
+        )
+    except Exception as e:
+        logger.error(f"Không thể ghi {len(entries)} dòng vào Google Sheet: {e}")
+        # Client có thể đã hỏng (token bị thu hồi...), lần sau tạo lại
+        reset_client()
+        _mark_failed(entries, str(e))
+        return 0
+
+    GoogleSheetOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+        status="sent", sent_at=timezone.now(), last_error=""
+    )
+    return len(entries)
+
+
+def _mark_failed(entries, error):
+    now = timezone.now()
+    for entry in entries:
+        # attempts đã được tăng khi nhận dòng (claim_entries)
+        entry.last_error = error
+        if entry.attempts >= MAX_ATTEMPTS:
+            entry.status = "failed"
+        else:
+            entry.status = "pending"
+            entry.next_attempt_at = now + backoff_delay(entry.attempts)
+    GoogleSheetOutbox.objects.bulk_update(
+        entries, ["attempts", "last_error", "status", "next_attempt_at"]
+    )
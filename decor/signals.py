@@ -1,58 +1,204 @@
 # your_app/signals.py
 
 import logging
-import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
-from .models import ContactMessage, GoogleServiceAccount
-from django.utils import timezone
+from .models import (
+    FAQ,
+    BlogCategory,
+    BlogComment,
+    BlogPost,
+    Category,
+    ContactInfo,
+    ContactMessage,
+    GoogleServiceAccount,
+    ImageRendition,
+    Page,
+    Product,
+    ProductImage,
+    ProductReview,
+    ProductVariant,
+    Slide,
+    TrackingCode,
+    WebsiteInfomation,
+)
+from . import cache, documents, renditions, search, sheets, timing
+from .ratings import apply_review_delta
 
 logger = logging.getLogger(__name__)
-# Đường dẫn tới JSON key
 
 
-def get_google_config():
-    try:
-        cfg = GoogleServiceAccount.objects.first()
-        if not cfg or not cfg.credentials_file or not cfg.spreadsheet_id:
-            raise Exception(
-                "Chưa cấu hình GoogleServiceAccount (file JSON hoặc spreadsheet_id)."
-            )
-        with cfg.credentials_file.open("r") as f:
-            info = json.load(f)
-        return info, cfg.spreadsheet_id
-    except Exception as e:
-        logger.error(f"Lỗi load Google config từ DB: {e}")
-        return None, None
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Cộng thời gian truy vấn vào request hiện tại (RequestTimingMiddleware)
+    if timing.query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timing.query_timer)
 
 
 @receiver(post_save, sender=ContactMessage)
-def append_contact_to_sheet(sender, instance, created, **kwargs):
-    if not created:
+def enqueue_contact_for_sheet(sender, instance, created, raw=False, **kwargs):
+    # Chỉ ghi vào outbox (cùng transaction); drain_sheet_outbox gửi lên Google Sheet
+    if not created or raw:
         return
+    sheets.enqueue_contact(instance)
+
+
+@receiver([post_save, post_delete], sender=GoogleServiceAccount)
+def reset_google_client(sender, **kwargs):
+    sheets.reset_client()
 
-    info, spreadsheet_id = get_google_config()
-    if not info or not spreadsheet_id:
-        return
 
-    try:
-        scope = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(info, scope)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(spreadsheet_id).sheet1
-
-        local_dt = timezone.localtime(instance.created_at)
-        row = [
-            local_dt.strftime("%Y-%m-%d"),
-            local_dt.strftime("%H:%M"),
-            instance.name,
-            instance.phone_number,
-            instance.message.replace("\n", " "),
-        ]
-        sheet.append_row(row, value_input_option="USER_ENTERED")
-    except Exception as e:
-        logger.error(
-            f"Không thể append ContactMessage#{instance.id} vào Google Sheet: {e}"
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    # Lưu lại rating cũ để trừ khỏi tổng hợp khi đánh giá bị sửa
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("product_id", "rating")
+            .first()
         )
+
+
+@receiver(post_save, sender=ProductReview)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+    if not created and previous == (instance.product_id, instance.rating):
+        return
+    if previous:
+        apply_review_delta(previous[0], previous[1], -1)
+    apply_review_delta(instance.product_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=ProductReview)
+def update_rating_on_delete(sender, instance, **kwargs):
+    apply_review_delta(instance.product_id, instance.rating, -1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Page)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_instance(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Page)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    # Tên danh mục nằm trong chỉ mục của sản phẩm
+    if created or raw:
+        return
+    search.index_objects(instance.products.select_related("category"))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=ProductReview)
+def rebuild_product_document(sender, instance, raw=False, **kwargs):
+    # Ảnh (kể cả srcset do worker ghi), biến thể, đánh giá đều nằm trong JSON
+    if raw:
+        return
+    documents.schedule([instance.pk if sender is Product else instance.product_id])
+
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_delete, sender=ProductReview)
+def rebuild_product_document_on_delete(sender, instance, **kwargs):
+    # Xóa theo cascade cùng sản phẩm: rebuild() bỏ qua id không còn tồn tại
+    documents.schedule([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def rebuild_category_documents(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    documents.schedule(instance.products.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def rebuild_documents_before_category_delete(sender, instance, **kwargs):
+    # Sau khi xóa, category của sản phẩm thành NULL: lấy id trước
+    documents.schedule(instance.products.values_list("pk", flat=True))
+
+
+VERSIONED_MODELS = [
+    WebsiteInfomation,
+    ContactInfo,
+    Slide,
+    FAQ,
+    TrackingCode,
+    Product,
+    ProductImage,
+    ProductVariant,
+    ProductReview,
+    Category,
+    Page,
+    BlogPost,
+    BlogCategory,
+    BlogComment,
+]
+
+
+def bump_model_version(sender, **kwargs):
+    # Vô hiệu hóa response cache và ETag/Last-Modified của model
+    cache.bump_version(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(
+        bump_model_version,
+        sender=model,
+        dispatch_uid=f"version-save-{model._meta.label_lower}",
+    )
+    post_delete.connect(
+        bump_model_version,
+        sender=model,
+        dispatch_uid=f"version-delete-{model._meta.label_lower}",
+    )
+
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def bump_blog_post_version(sender, action, **kwargs):
+    if action.startswith("post_"):
+        cache.bump_version(BlogPost)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Slide)
+@receiver(post_save, sender=WebsiteInfomation)
+def enqueue_image_processing(sender, instance, raw=False, **kwargs):
+    # Chỉ xếp job; worker process_images resize và tạo các bản srcset
+    if raw:
+        return
+    for field_name in renditions.rendition_fields(sender):
+        renditions.enqueue(instance, field_name)
+
+
+@receiver(post_delete, sender=ImageRendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    # Xóa file sau commit để rollback không làm mất file còn được tham chiếu;
+    # file theo hash có thể dùng chung giữa các ảnh trùng nội dung
+    def delete_if_unused():
+        if not ImageRendition.objects.filter(file=instance.file.name).exists():
+            instance.file.delete(save=False)
+
+    transaction.on_commit(delete_if_unused)
@@ -1,3 +1,1668 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.request import Request
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+from prometheus_client.parser import text_string_to_metric_families
+
+from . import (
+    cache,
+    documents,
+    export,
+    log,
+    media,
+    renditions,
+    resizer,
+    routers,
+    search,
+    sheets,
+)
+from .imaging import ImageTooLarge, decode_fit, open_bounded
+from .middleware import ReplicaRoutingMiddleware
+from .pagination import KeysetPagination
+from .views import FAQViewSet
+from .models import (
+    FAQ,
+    BlogCategory,
+    BlogComment,
+    BlogPost,
+    Category,
+    ContactMessage,
+    GoogleServiceAccount,
+    GoogleSheetOutbox,
+    Product,
+    ProductDocument,
+    ProductDocumentJob,
+    ProductImage,
+    ProductReview,
+    ProductVariant,
+)
+
+
+def png_bytes(size=(40, 30), color=(200, 40, 40), fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class TempMediaMixin:
+    # File upload/resize của test ghi vào thư mục tạm, không vào media/ thật
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp(prefix="decor-test-media-")
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=os.path.join(root, "media"),
+            RESIZE_CACHE_DIR=os.path.join(root, "resize"),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class FakeWorksheet:
+    calls = []
+    fail = False
+    # (trong transaction?, trạng thái các dòng outbox) lúc gọi API
+    seen = []
+
+    def append_rows(self, rows, value_input_option=None):
+        FakeWorksheet.seen.append(
+            (
+                connections["default"].in_atomic_block,
+                sorted(GoogleSheetOutbox.objects.values_list("status", flat=True)),
+            )
+        )
+        if FakeWorksheet.fail:
+            raise Exception("quota exceeded")
+        FakeWorksheet.calls.append(list(rows))
+
+
+def fake_worksheet():
+    return FakeWorksheet()
+
+
+@override_settings(GOOGLE_SHEETS_WORKSHEET_FACTORY="decor.tests.fake_worksheet")
+class GoogleSheetOutboxTests(TestCase):
+    def setUp(self):
+        FakeWorksheet.calls = []
+        FakeWorksheet.fail = False
+        FakeWorksheet.seen = []
+
+    def test_contact_form_only_enqueues(self):
+        response = self.client.post(
+            "/api/contacts/", {"name": "An", "phone_number": "0901", "message": "a\nb"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FakeWorksheet.calls, [])
+        entry = GoogleSheetOutbox.objects.get()
+        self.assertEqual(entry.status, "pending")
+        self.assertEqual(entry.row[2:], ["An", "0901", "a b"])
+
+    def test_burst_is_sent_in_batches(self):
+        for i in range(1000):
+            ContactMessage.objects.create(name=f"Khách {i}")
+
+        while sheets.drain_outbox(batch_size=500):
+            pass
+
+        self.assertEqual([len(rows) for rows in FakeWorksheet.calls], [500, 500])
+        self.assertFalse(GoogleSheetOutbox.objects.exclude(status="sent").exists())
+
+    def test_failure_backs_off(self):
+        ContactMessage.objects.create(name="An")
+        FakeWorksheet.fail = True
+
+        self.assertEqual(sheets.drain_outbox(), 0)
+
+        entry = GoogleSheetOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ("pending", 1))
+        self.assertGreater(entry.next_attempt_at, timezone.now())
+        self.assertEqual(entry.last_error, "quota exceeded")
+        # Chưa đến hạn thử lại thì không gửi
+        FakeWorksheet.fail = False
+        self.assertEqual(sheets.drain_outbox(), 0)
+        self.assertEqual(FakeWorksheet.calls, [])
+
+    def test_gives_up_after_max_attempts(self):
+        ContactMessage.objects.create(name="An")
+        FakeWorksheet.fail = True
+
+        for _ in range(sheets.MAX_ATTEMPTS):
+            GoogleSheetOutbox.objects.update(next_attempt_at=timezone.now())
+            sheets.drain_outbox()
+
+        self.assertEqual(GoogleSheetOutbox.objects.get().status, "failed")
+
+    def test_rows_are_claimed_before_calling_api(self):
+        ContactMessage.objects.create(name="An")
+        ContactMessage.objects.create(name="Bình")
+
+        self.assertEqual(sheets.drain_outbox(), 2)
+
+        self.assertEqual(FakeWorksheet.seen[0][1], ["sending", "sending"])
+        # Dòng đang gửi không bị worker khác nhận lại
+        self.assertEqual(sheets.claim_entries(), [])
+
+    def test_stale_claim_is_retried(self):
+        ContactMessage.objects.create(name="An")
+        self.assertEqual(len(sheets.claim_entries()), 1)
+        # Worker chết sau khi nhận dòng: hết SEND_TIMEOUT thì dòng được gửi lại
+        GoogleSheetOutbox.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(sheets.drain_outbox(), 1)
+
+        entry = GoogleSheetOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ("sent", 2))
+
+
+@override_settings(GOOGLE_SHEETS_WORKSHEET_FACTORY="decor.tests.fake_worksheet")
+class GoogleSheetOutboxLockTests(TransactionTestCase):
+    def setUp(self):
+        FakeWorksheet.calls = []
+        FakeWorksheet.fail = False
+        FakeWorksheet.seen = []
+
+    def test_api_call_runs_outside_transaction(self):
+        ContactMessage.objects.create(name="An")
+
+        self.assertEqual(sheets.drain_outbox(), 1)
+
+        self.assertEqual(FakeWorksheet.seen, [(False, ["sending"])])
+        self.assertEqual(GoogleSheetOutbox.objects.get().status, "sent")
+
+
+def service_account_info():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return {
+        "type": "service_account",
+        "project_id": "decor",
+        "private_key_id": "1",
+        "private_key": key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode(),
+        "client_email": "sheets@decor.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+class GoogleSheetsAPI:
+    """Thay tầng HTTP của requests: ghi lại các request gửi tới Sheets API."""
+
+    metadata = {
+        "spreadsheetId": "sheet",
+        "properties": {"title": "Liên hệ"},
+        "sheets": [
+            {
+                "properties": {
+                    "sheetId": 0,
+                    "title": "Sheet1",
+                    "index": 0,
+                    "gridProperties": {"rowCount": 1000, "columnCount": 26},
+                }
+            }
+        ],
+    }
+
+    def __init__(self):
+        self.requests = []
+
+    def send(self, adapter, request, **kwargs):
+        import requests
+
+        self.requests.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        if ":append" in request.url:
+            body = {"updates": {}}
+        elif request.url.endswith("/allowedLocations"):
+            # google-auth tra cứu vùng của service account sau khi có token
+            body = {"encodedLocations": "", "locations": []}
+        else:
+            body = self.metadata
+        response._content = json.dumps(body).encode()
+        response.url, response.request = request.url, request
+        return response
+
+
+class GoogleSheetClientTests(TestCase):
+    def setUp(self):
+        sheets.reset_client()
+        self.addCleanup(sheets.reset_client)
+        GoogleServiceAccount.objects.create(
+            credentials_file="credentials/decor.json", spreadsheet_id="sheet"
+        )
+        self.api = GoogleSheetsAPI()
+        self.tokens = 0
+
+        def refresh(credentials, request):
+            # Thay lần gọi tới token_uri của Google
+            self.tokens += 1
+            credentials.token = f"token-{self.tokens}"
+            credentials.expiry = timezone.now().replace(tzinfo=None) + timedelta(
+                hours=1
+            )
+
+        info = service_account_info()
+        for patcher in (
+            mock.patch.object(
+                sheets, "get_google_config", return_value=(info, "sheet")
+            ),
+            mock.patch(
+                "google.oauth2.service_account.Credentials.refresh",
+                autospec=True,
+                side_effect=refresh,
+            ),
+            mock.patch(
+                "requests.adapters.HTTPAdapter.send",
+                autospec=True,
+                side_effect=self.api.send,
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_expired_token_is_refreshed_on_cached_client(self):
+        ContactMessage.objects.create(name="An")
+        self.assertEqual(sheets.drain_outbox(), 1)
+        worksheet = sheets.open_worksheet()
+        worksheet.client.auth.expiry = timezone.now().replace(
+            tzinfo=None
+        ) - timedelta(minutes=1)
+
+        ContactMessage.objects.create(name="Bình")
+        self.assertEqual(sheets.drain_outbox(), 1)
+
+        # Cùng client/worksheet, token được làm mới trước lần append thứ hai
+        self.assertIs(sheets.open_worksheet(), worksheet)
+        self.assertEqual(self.tokens, 2)
+        appends = [r for r in self.api.requests if ":append" in r.url]
+        self.assertEqual(
+            [r.headers["Authorization"] for r in appends],
+            ["Bearer token-1", "Bearer token-2"],
+        )
+        self.assertFalse(GoogleSheetOutbox.objects.exclude(status="sent").exists())
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        ContactMessage.objects.bulk_create(
+            ContactMessage(name=f"Khách {i}") for i in range(25)
+        )
+        # Cùng created_at: thứ tự chỉ còn dựa vào id (tie-breaker)
+        ContactMessage.objects.update(created_at=timezone.now() - timedelta(days=1))
+
+    def test_page_number_is_default(self):
+        response = self.client.get("/api/contacts/?page=3")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_cursor_walks_every_row_once_despite_inserts(self):
+        expected = list(
+            ContactMessage.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        seen, url = [], "/api/contacts/?cursor="
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+            # Tin mới đứng đầu danh sách, không đẩy lệch các trang phía sau
+            ContactMessage.objects.create(name="Khách mới")
+
+        self.assertEqual(seen, expected)
+
+    def test_cursor_keeps_descending_id_ordering(self):
+        pagination = KeysetPagination()
+        pagination.ordering, pagination.page_size = ("-id",), 10
+        request = Request(RequestFactory().get("/", {"cursor": ""}))
+        queryset = ContactMessage.objects.all()
+        expected = list(queryset.order_by("-id").values_list("id", flat=True))
+
+        seen = [row.pk for row in pagination.paginate_queryset(queryset, request)]
+        next_request = Request(RequestFactory().get(pagination.get_next_link()))
+        seen += [row.pk for row in pagination.paginate_queryset(queryset, next_request)]
+
+        self.assertEqual(pagination.ordering, ("-id",))
+        self.assertEqual(seen, expected[:20])
+
+    def test_search_with_cursor_keeps_ranking(self):
+        Product.objects.create(name="Bình", slug="binh", price=1, description="đèn")
+        Product.objects.create(name="Đèn gốm", slug="den-gom", price=1)
+
+        response = self.client.get("/api/products/?search=den&cursor=")
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [row["slug"] for row in response.data["results"]], ["den-gom", "binh"]
+        )
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get("/api/contacts/?cursor=xyz").status_code, 404)
+
+
+@override_settings(PRODUCT_DOCUMENT_BASE_URL="")
+class ProductQueryCountTests(TestCase):
+    def add_products(self, count, extras):
+        category = Category.objects.get_or_create(name="Đèn", slug="den")[0]
+        for _ in range(count):
+            n = self.created = getattr(self, "created", 0) + 1
+            product = Product.objects.create(
+                name=f"Đèn {n}", slug=f"den-{n}", price=100, category=category
+            )
+            if extras:
+                for order in range(2):
+                    ProductImage.objects.create(
+                        product=product, image=f"products/{n}-{order}.webp"
+                    )
+                ProductVariant.objects.create(product=product, variant_name="Trắng")
+                ProductReview.objects.create(
+                    product=product, user_name="Khách", rating=5
+                )
+        return product
+
+    # Validator ETag, COUNT, trang sản phẩm, ảnh, renditions của ảnh. Django bỏ
+    # qua truy vấn prefetch lồng khi không có ảnh nào nên trang không ảnh ít hơn 1.
+    LIST_QUERIES = 5
+    # Validator ETag, sản phẩm + danh mục, ảnh, renditions, biến thể, đánh giá
+    DETAIL_QUERIES = 6
+
+    def test_list_query_count_is_constant(self):
+        self.add_products(1, extras=True)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            self.client.get("/api/products/")
+
+        self.add_products(10, extras=False)
+        self.add_products(9, extras=True)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get("/api/products/")
+        self.assertEqual(response.data["count"], 20)
+        self.assertEqual(len(response.data["results"]), 10)
+
+        Product.objects.filter(images__isnull=False).delete()
+        self.add_products(20, extras=False)
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            self.client.get("/api/products/")
+
+    def test_detail_query_count_does_not_depend_on_relations(self):
+        plain = self.add_products(1, extras=False)
+        rich = self.add_products(1, extras=True)
+        for _ in range(20):
+            ProductReview.objects.create(product=rich, user_name="Khách", rating=4)
+
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.client.get(f"/api/products/{rich.slug}/")
+        self.assertEqual(len(response.data["images"]), 2)
+        # Không có ảnh: bỏ qua truy vấn renditions
+        with self.assertNumQueries(self.DETAIL_QUERIES - 1):
+            self.client.get(f"/api/products/{plain.slug}/")
+
+
+@override_settings(PRODUCT_DOCUMENT_BASE_URL="", PRODUCT_DETAIL_REVIEW_LIMIT=3)
+class ProductReviewsTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Đèn", slug="den", price=100)
+        for i in range(25):
+            ProductReview.objects.create(
+                product=self.product, user_name=f"Khách {i}", rating=5
+            )
+        # Cùng created_at: thứ tự chỉ còn dựa vào id giảm dần
+        ProductReview.objects.update(created_at=timezone.now() - timedelta(days=1))
+        newest = ProductReview.objects.create(
+            product=self.product, user_name="Mới nhất", rating=4
+        )
+        self.expected = [newest.pk] + list(
+            ProductReview.objects.exclude(pk=newest.pk)
+            .order_by("-id")
+            .values_list("pk", flat=True)
+        )
+
+    def test_cursor_walk_in_created_at_then_id_order(self):
+        seen, url = [], "/api/products/den/reviews/"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 10)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, self.expected)
+
+    def test_page_size_param(self):
+        response = self.client.get("/api/products/den/reviews/?page_size=5")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], self.expected[:5]
+        )
+
+    def test_detail_embeds_only_most_recent_reviews(self):
+        response = self.client.get("/api/products/den/")
+
+        self.assertEqual(
+            [row["id"] for row in response.data["reviews"]], self.expected[:3]
+        )
+        self.assertEqual(response.data["review_count"], 26)
+
+    def test_unknown_product_is_404(self):
+        response = self.client.get("/api/products/khong/reviews/")
+        self.assertEqual(response.status_code, 404)
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.lamp = Product.objects.create(name="Đèn", slug="den", price=100)
+        self.vase = Product.objects.create(name="Bình", slug="binh", price=100)
+
+    def aggregates(self, product):
+        product.refresh_from_db()
+        return (
+            product.review_count,
+            product.rating_sum,
+            product.rating_avg,
+            [getattr(product, f"rating_{star}_count") for star in range(1, 6)],
+        )
+
+    def review(self, product, rating):
+        return ProductReview.objects.create(
+            product=product, user_name="Khách", rating=rating
+        )
+
+    def test_signals_follow_create_edit_and_delete(self):
+        self.review(self.lamp, 5)
+        review = self.review(self.lamp, 3)
+        self.assertEqual(self.aggregates(self.lamp), (2, 8, 4, [0, 0, 1, 0, 1]))
+
+        review.rating = 4
+        review.save()
+        self.assertEqual(self.aggregates(self.lamp), (2, 9, 4.5, [0, 0, 0, 1, 1]))
+
+        # Chuyển đánh giá sang sản phẩm khác
+        review.product = self.vase
+        review.save()
+        self.assertEqual(self.aggregates(self.lamp), (1, 5, 5, [0, 0, 0, 0, 1]))
+        self.assertEqual(self.aggregates(self.vase), (1, 4, 4, [0, 0, 0, 1, 0]))
+
+        review.delete()
+        self.assertEqual(self.aggregates(self.vase), (0, 0, 0, [0, 0, 0, 0, 0]))
+
+    def test_rebuild_command_recomputes_from_reviews(self):
+        self.review(self.lamp, 2)
+        self.review(self.lamp, 4)
+        Product.objects.update(review_count=7, rating_sum=1, rating_avg=1)
+
+        call_command("rebuild_product_ratings", stdout=io.StringIO())
+
+        self.assertEqual(self.aggregates(self.lamp), (2, 6, 3, [0, 1, 0, 1, 0]))
+        self.assertEqual(self.aggregates(self.vase), (0, 0, 0, [0, 0, 0, 0, 0]))
+
+    def test_api_filters_and_sorts_on_stored_columns(self):
+        self.review(self.lamp, 3)
+        self.review(self.vase, 5)
+
+        response = self.client.get("/api/products/?ordering=-rating_avg")
+        self.assertEqual(
+            [row["slug"] for row in response.data["results"]], ["binh", "den"]
+        )
+        response = self.client.get("/api/products/?min_rating=4")
+        self.assertEqual([row["slug"] for row in response.data["results"]], ["binh"])
+
+
+class BlogPostListTests(TestCase):
+    def setUp(self):
+        self.decor = BlogCategory.objects.create(name="Trang trí", slug="trang-tri")
+        self.tips = BlogCategory.objects.create(name="Mẹo", slug="meo")
+        BlogPost.objects.create(title="Nháp", content="x", author_name="A")
+
+    def publish(self, count):
+        for i in range(count):
+            post = BlogPost.objects.create(
+                title=f"Bài {BlogPost.objects.count()}",
+                content="<p>Nội dung dài</p>",
+                author_name="A",
+                status="published",
+                published_at=timezone.now(),
+            )
+            post.categories.set([self.decor, self.tips])
+            BlogComment.objects.create(
+                post=post, user_name="B", user_email="b@example.com", comment="Hay"
+            )
+        return post
+
+    def test_list_omits_content_and_comments(self):
+        self.publish(1)
+
+        response = self.client.get("/api/blog/posts/")
+
+        (row,) = response.data["results"]
+        self.assertNotIn("content", row)
+        self.assertNotIn("comments", row)
+        self.assertEqual(
+            [category["slug"] for category in row["categories"]], ["trang-tri", "meo"]
+        )
+
+    def test_list_query_count_does_not_grow_with_posts(self):
+        self.publish(2)
+        with CaptureQueriesContext(connections["default"]) as few:
+            self.client.get("/api/blog/posts/")
+        self.publish(6)
+        with CaptureQueriesContext(connections["default"]) as many:
+            response = self.client.get("/api/blog/posts/")
+
+        self.assertEqual(len(response.data["results"]), 8)
+        self.assertEqual(len(many), len(few))
+
+    def test_category_filter_returns_each_post_once(self):
+        self.publish(2)
+
+        response = self.client.get("/api/blog/posts/?categories=trang-tri,meo")
+
+        self.assertEqual(response.data["count"], 2)
+
+    def test_detail_includes_content_and_comments(self):
+        post = self.publish(1)
+
+        response = self.client.get(f"/api/blog/posts/{post.slug}/")
+
+        self.assertEqual(response.data["content"], "<p>Nội dung dài</p>")
+        self.assertEqual(len(response.data["comments"]), 1)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Phòng khách", slug="phong-khach")
+        self.lamp = Product.objects.create(
+            name="Đèn gốm", slug="den-gom", price=100, category=self.category
+        )
+        self.vase = Product.objects.create(
+            name="Bình hoa", slug="binh-hoa", price=100, description="Đặt cạnh đèn"
+        )
+        self.rug = Product.objects.create(name="Thảm len", slug="tham-len", price=100)
+
+    def ids(self, query):
+        return [object_id for object_id, _score in search.search(Product, query)]
+
+    def test_ranks_by_field_weight_without_accents(self):
+        # "den" khớp cả "Đèn"/"đèn"; tên nặng hơn mô tả
+        self.assertEqual(self.ids("den"), [self.lamp.pk, self.vase.pk])
+        self.assertEqual(self.ids("DEN GO"), [self.lamp.pk])  # tiền tố ở token cuối
+
+    def test_index_follows_saves_deletes_and_category_rename(self):
+        self.rug.name = "Thảm đèn"
+        self.rug.save()
+        self.assertIn(self.rug.pk, self.ids("den"))
+
+        self.category.name = "Sân vườn"
+        self.category.save()
+        self.assertEqual(self.ids("san vuon"), [self.lamp.pk])
+        self.assertEqual(self.ids("phong khach"), [])
+
+        self.lamp.delete()
+        self.assertEqual(self.ids("san vuon"), [])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_truncated_results_report_total(self):
+        response = self.client.get("/api/products/?search=den")
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["slug"], "den-gom")
+        self.assertEqual(response["X-Search-Total"], "2")
+        self.assertEqual(response["X-Search-Limit"], "1")
+
+    @override_settings(SEARCH_MAX_RESULTS=None)
+    def test_no_limit_paginates_every_match(self):
+        response = self.client.get("/api/products/?search=den")
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertNotIn("X-Search-Total", response)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(user)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = Category.objects.count()
+            category = Category.objects.create(name=f"Danh mục {n}", slug=f"dm-{n}")
+            for i in range(n % 3):
+                Product.objects.create(
+                    name=f"Đèn {n}-{i}", slug=f"den-{n}-{i}", price=1, category=category
+                )
+            blog_category = BlogCategory.objects.create(
+                name=f"Chuyên mục {n}", slug=f"cm-{n}"
+            )
+            post = BlogPost.objects.create(
+                title=f"Bài {n}", content="Đèn gốm", author_name="A"
+            )
+            post.categories.add(blog_category)
+            BlogComment.objects.create(
+                post=post, user_name="B", user_email="b@example.com", comment="Hay"
+            )
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_use_constant_queries(self):
+        urls = [
+            "/admin/decor/category/",
+            "/admin/decor/product/",
+            "/admin/decor/blogcategory/",
+            "/admin/decor/blogpost/",
+        ]
+        self.add_rows(2)
+        few = [self.query_count(url) for url in urls]
+        self.add_rows(10)
+        many = [self.query_count(url) for url in urls]
+
+        self.assertEqual(many, few)
+
+    def test_category_sorts_by_annotated_count(self):
+        self.add_rows(3)
+
+        response = self.client.get("/admin/decor/category/?o=-3")
+
+        names = [category.name for category in response.context["cl"].result_list]
+        self.assertEqual(names, ["Danh mục 2", "Danh mục 1", "Danh mục 0"])
+
+    def test_blog_search_uses_folded_index(self):
+        self.add_rows(2)
+        BlogPost.objects.create(title="Khác", content="Thảm", author_name="A")
+
+        response = self.client.get("/admin/decor/blogpost/?q=den+gom")
+
+        self.assertEqual(response.context["cl"].result_count, 2)
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.root = root
+
+    def run_import(self, name, text, *args):
+        path = os.path.join(self.root, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("import_catalog", path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def jsonl(self, *rows):
+        return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    def test_jsonl_reimport_updates_in_place(self):
+        row = {
+            "category": "Đèn",
+            "name": "Đèn bàn gỗ",
+            "price": "450000",
+            "variants": [{"name": "Trắng", "extra_price": 0, "stock": 10}],
+        }
+        self.run_import("a.jsonl", self.jsonl(row))
+        row["price"] = "400000"
+        row["variants"] = [
+            {"name": "Trắng", "extra_price": 0, "stock": 3},
+            {"name": "Đen", "extra_price": 50000, "stock": 5},
+        ]
+        out, _err = self.run_import("a.jsonl", self.jsonl(row))
+
+        self.assertIn("0 sản phẩm mới, 1 cập nhật, 2 biến thể", out)
+        product = Product.objects.get()
+        self.assertEqual((product.slug, product.price), ("đèn-bàn-gỗ", 400000))
+        self.assertEqual(product.category.name, "Đèn")
+        self.assertEqual(
+            dict(product.variants.values_list("variant_name", "stock")),
+            {"Trắng": 3, "Đen": 5},
+        )
+
+    def test_csv_unchanged_rows_are_not_rewritten(self):
+        text = (
+            "name,slug,category,price,variants\n"
+            "Bình gốm,binh-gom,Gốm,120000,Trắng:0:10|Xanh:20000:4\n"
+        )
+        out, _err = self.run_import("a.csv", text)
+        self.assertIn("1 sản phẩm mới, 0 cập nhật, 2 biến thể", out)
+
+        out, _err = self.run_import("a.csv", text)
+        self.assertIn("0 sản phẩm mới, 0 cập nhật, 0 biến thể", out)
+        self.assertEqual(Product.objects.get().variants.count(), 2)
+
+    def test_duplicate_derived_slug_is_a_row_error(self):
+        text = self.jsonl(
+            {"name": "Đèn bàn", "price": "1"},
+            {"name": "Đèn Bàn!", "price": "2"},
+            {"name": "Thảm", "slug": "đèn-bàn", "price": "3"},
+            {"name": "!!!", "price": "4"},
+        )
+        # Lô 1 dòng: phát hiện trùng cả giữa các lô
+        out, err = self.run_import("a.jsonl", text, "--chunk-size", "1")
+
+        self.assertIn("dòng 2: slug đèn-bàn trùng với dòng 1", err)
+        self.assertIn("dòng 3: slug đèn-bàn trùng với dòng 1", err)
+        self.assertIn("dòng 4: không tạo được slug", err)
+        self.assertIn("3 lỗi", out)
+        self.assertEqual(Product.objects.get().price, 1)
+
+    def test_explicit_duplicate_slug_keeps_last_row(self):
+        text = self.jsonl(
+            {"name": "Thảm len", "slug": "tham", "price": "1"},
+            {"name": "Thảm len", "slug": "tham", "price": "2"},
+        )
+        out, err = self.run_import("a.jsonl", text)
+
+        self.assertEqual(err, "")
+        self.assertEqual(Product.objects.get(slug="tham").price, 2)
+
+
+class CatalogExportTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Đèn", slug="den")
+        self.lamp = Product.objects.create(
+            name="Đèn gốm", slug="den-gom", price=100, category=category
+        )
+        ProductVariant.objects.create(
+            product=self.lamp, variant_name="Trắng", extra_price=0, stock=10
+        )
+        ProductVariant.objects.create(
+            product=self.lamp, variant_name="Đen", extra_price=20, stock=5
+        )
+        ProductImage.objects.create(
+            product=self.lamp, image="products/b.webp", sort_order=1
+        )
+        ProductImage.objects.create(product=self.lamp, image="products/a.webp")
+        for i in range(4):
+            Product.objects.create(name=f"Thảm {i}", slug=f"tham-{i}", price=50)
+
+    def test_jsonl_streams_every_product(self):
+        response = self.client.get("/api/exports/products/")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], export.CONTENT_TYPES["jsonl"])
+        rows = [json.loads(line) for line in response.getvalue().decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+        lamp = rows[0]
+        self.assertEqual((lamp["min_price"], lamp["max_price"]), ("100.00", "120.00"))
+        self.assertEqual(lamp["stock"], 15)
+        self.assertEqual(lamp["image"], "http://testserver/media/products/a.webp")
+        self.assertEqual(
+            [variant["name"] for variant in lamp["variants"]], ["Trắng", "Đen"]
+        )
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        with mock.patch.object(export, "CHUNK_SIZE", 2):
+            response = await self.async_client.get("/api/exports/products/")
+            # Async iterator: Django không gom cả catalog vào list trước khi gửi
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b"".join(chunks).count(b"\n"), 5)
+
+    def test_export_does_not_shadow_product_slug(self):
+        Product.objects.create(name="Export", slug="export", price=1)
+
+        response = self.client.get("/api/products/export/")
+
+        self.assertEqual(response.data["slug"], "export")
+
+    def test_csv_round_trips_through_import(self):
+        response = self.client.get("/api/exports/products/?output=csv")
+        text = response.getvalue().decode()
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["variants"], "Trắng:0.00:10|Đen:20.00:5")
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, "products.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        stdout = io.StringIO()
+        call_command("import_catalog", path, stdout=stdout, stderr=io.StringIO())
+        self.assertIn("0 sản phẩm mới, 0 cập nhật, 0 biến thể", stdout.getvalue())
+
+    def test_queries_per_chunk_not_per_product(self):
+        request = RequestFactory().get("/")
+        # 3 lô x (sản phẩm + biến thể) + lô rỗng cuối
+        with self.assertNumQueries(7):
+            rows = list(export.product_rows(Product.objects.all(), request, 2))
+        self.assertEqual(len(rows), 5)
+
+    def test_conditional_and_invalid_output(self):
+        response = self.client.get("/api/exports/products/")
+        response.getvalue()
+        not_modified = self.client.get(
+            "/api/exports/products/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.assertEqual(
+            self.client.get("/api/exports/products/?output=xml").status_code, 400
+        )
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        FAQ.objects.create(question="Giao hàng?", answer="2 ngày", sort_order=1)
+
+    def test_cached_hit_and_304_skip_database(self):
+        first = self.client.get("/api/faqs/")
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            hit = self.client.get("/api/faqs/")
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                "/api/faqs/", HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        with self.assertNumQueries(0):
+            not_modified_since = self.client.get(
+                "/api/faqs/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+            )
+
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.content, first.content)
+        self.assertEqual(hit["ETag"], first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified_since.status_code, 304)
+
+    def test_malformed_lookup_is_not_found(self):
+        response = self.client.get("/api/faqs/khong-co/")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response)
+
+    def test_save_and_delete_invalidate_cached_response(self):
+        self.client.get("/api/faqs/")
+        faq = FAQ.objects.get()
+        faq.answer = "1 ngày"
+        faq.save()
+
+        changed = self.client.get("/api/faqs/")
+        self.assertEqual(changed["X-Cache"], "MISS")
+        self.assertEqual(changed.data["results"][0]["answer"], "1 ngày")
+        self.assertEqual(self.client.get("/api/faqs/")["X-Cache"], "HIT")
+
+        faq.delete()
+        deleted = self.client.get("/api/faqs/")
+        self.assertEqual(deleted["X-Cache"], "MISS")
+        self.assertEqual(deleted.data["results"], [])
+
+    def test_local_versions_expire_so_other_workers_catch_up(self):
+        first = self.client.get("/api/faqs/")
+        # Ghi ở worker khác: signal không tăng phiên bản trong tiến trình này
+        FAQ.objects.update(answer="1 ngày")
+        self.assertEqual(self.client.get("/api/faqs/")["X-Cache"], "HIT")
+
+        later = time.time() + settings.RESPONSE_CACHE_LOCAL_VERSION_TIMEOUT + 1
+        with mock.patch("time.time", return_value=later):
+            fresh = self.client.get("/api/faqs/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual((fresh.status_code, fresh["X-Cache"]), (200, "MISS"))
+        self.assertEqual(fresh.data["results"][0]["answer"], "1 ngày")
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+
+    def test_shared_backend_versions_do_not_expire(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        shared = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": root,
+        }
+        with override_settings(CACHES={"default": shared}):
+            self.assertIsNone(cache._version_timeout())
+        self.assertEqual(
+            cache._version_timeout(), settings.RESPONSE_CACHE_LOCAL_VERSION_TIMEOUT
+        )
+
+    def test_other_models_keep_their_cache(self):
+        self.client.get("/api/faqs/")
+        Product.objects.create(name="Đèn", slug="den", price=100)
+
+        self.assertEqual(self.client.get("/api/faqs/")["X-Cache"], "HIT")
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "responses": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "responses",
+            },
+        },
+        RESPONSE_CACHE_ALIAS="responses",
+    )
+    def test_cache_alias_and_counters(self):
+        before = cache.stats().get("decor.faq", {"hit": 0, "miss": 0})
+        self.client.get("/api/faqs/")
+        caches["default"].clear()
+
+        self.assertEqual(self.client.get("/api/faqs/")["X-Cache"], "HIT")
+        after = cache.stats()["decor.faq"]
+        self.assertEqual(after["miss"] - before["miss"], 1)
+        self.assertEqual(after["hit"] - before["hit"], 1)
+
+
+@override_settings(ASYNC_READ_PATH=True)
+class AsyncReadPathTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        FAQ.objects.create(question="Giao hàng?", answer="2 ngày", sort_order=1)
+
+    def test_cached_view_answers_hits_on_event_loop(self):
+        view = FAQViewSet.as_view({"get": "list"})
+        self.assertTrue(iscoroutinefunction(view))
+        factory = AsyncRequestFactory()
+
+        miss = async_to_sync(view)(factory.get("/api/faqs/"))
+        miss.render()
+        with self.assertNumQueries(0):
+            hit = async_to_sync(view)(factory.get("/api/faqs/"))
+            not_modified = async_to_sync(view)(
+                factory.get("/api/faqs/", headers={"if-none-match": miss["ETag"]})
+            )
+
+        self.assertEqual(miss["X-Cache"], "MISS")
+        self.assertEqual((hit["X-Cache"], hit.content), ("HIT", miss.content))
+        self.assertEqual(hit["Allow"], miss["Allow"])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class AsgiStackTests(TestCase):
+    # Toàn bộ MIDDLEWARE (timing, replica, session, CSRF, messages) dưới ASGI
+    def setUp(self):
+        User.objects.create_superuser("admin", "admin@example.com", "mat-khau-1")
+
+    async def test_api_read_has_server_timing(self):
+        response = await self.async_client.get("/api/faqs/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    async def test_admin_login_with_csrf_and_messages(self):
+        client = self.async_client.__class__(enforce_csrf_checks=True)
+        response = await client.get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        token = response.cookies["csrftoken"].value
+
+        response = await client.post(
+            "/admin/login/",
+            {"username": "admin", "password": "sai"},
+            headers={"x-csrftoken": token},
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await client.post(
+            "/admin/login/",
+            {"username": "admin", "password": "mat-khau-1", "next": "/admin/"},
+            headers={"x-csrftoken": token},
+        )
+        self.assertEqual(response.status_code, 302)
+
+        # Xóa một FAQ qua admin: session, CSRF và message "đã xóa" dưới ASGI
+        faq = await FAQ.objects.acreate(question="Đổi trả?", answer="7 ngày")
+        response = await client.get(f"/admin/decor/faq/{faq.pk}/delete/")
+        token = response.cookies.get("csrftoken", client.cookies["csrftoken"]).value
+        response = await client.post(
+            f"/admin/decor/faq/{faq.pk}/delete/",
+            {"post": "yes"},
+            headers={"x-csrftoken": token},
+        )
+        self.assertEqual(response.status_code, 302)
+        response = await client.get(response["Location"])
+        self.assertContains(response, "Đổi trả?")
+        self.assertFalse(await FAQ.objects.filter(pk=faq.pk).aexists())
+
+
+@override_settings(PRODUCT_DOCUMENT_BASE_URL="http://testserver")
+class ProductDocumentTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name="Đèn", slug="den")
+        self.product = Product.objects.create(
+            name="Đèn bàn gỗ", category=self.category, price=450000
+        )
+        documents.process_jobs()
+
+    def get(self, path, **extra):
+        return self.client.get(
+            f"/api/products/{path}", HTTP_ACCEPT="application/json", **extra
+        )
+
+    def document(self):
+        return json.loads(
+            bytes(ProductDocument.objects.get(product=self.product).content)
+        )
+
+    def test_detail_is_one_lookup_with_serializer_bytes(self):
+        with self.assertNumQueries(1):
+            stored = self.get(f"{self.product.slug}/")
+        with self.assertNumQueries(1):
+            not_modified = self.get(
+                f"{self.product.slug}/", HTTP_IF_NONE_MATCH=stored["ETag"]
+            )
+        serialized = self.get(f"{self.product.slug}/?nocache=1")
+
+        self.assertEqual(stored.status_code, 200)
+        self.assertEqual(stored["Content-Type"], "application/json")
+        self.assertEqual(stored.content, serialized.content)
+        self.assertFalse(stored["ETag"].startswith("W/"))
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_falls_back_to_serializer(self):
+        # Có query, origin khác, renderer khác: ETag yếu của ConditionalGetMixin
+        for response in (
+            self.get(f"{self.product.slug}/?nocache=1"),
+            self.get(f"{self.product.slug}/", secure=True),
+            self.client.get(f"/api/products/{self.product.slug}/?format=api"),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response["ETag"].startswith("W/"))
+
+    def test_review_added_rebuilds_document(self):
+        ProductReview.objects.create(
+            product=self.product, user_name="An", rating=4, comment="Đẹp"
+        )
+        documents.process_jobs()
+
+        document = self.document()
+        self.assertEqual(document["review_count"], 1)
+        self.assertEqual([r["comment"] for r in document["reviews"]], ["Đẹp"])
+        response = self.get(f"{self.product.slug}/")
+        self.assertEqual(json.loads(response.content), document)
+
+    def test_category_rename_rebuilds_document(self):
+        self.category.name = "Đèn trang trí"
+        self.category.save()
+        documents.process_jobs()
+
+        self.assertEqual(self.document()["category"]["name"], "Đèn trang trí")
+
+    def test_slug_change_moves_document(self):
+        old_slug = self.product.slug
+        self.product.slug = "den-ban-go-soi"
+        self.product.save()
+        documents.process_jobs()
+
+        self.assertEqual(self.get(f"{old_slug}/").status_code, 404)
+        with self.assertNumQueries(1):
+            response = self.get("den-ban-go-soi/")
+        self.assertEqual(json.loads(response.content)["slug"], "den-ban-go-soi")
+        self.assertEqual(ProductDocument.objects.get().slug, "den-ban-go-soi")
+
+    def test_rebuild_runs_in_worker_not_on_commit(self):
+        rebuild = mock.patch.object(documents, "rebuild", wraps=documents.rebuild)
+        with rebuild as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.price = 500000
+                self.product.save()
+                ProductReview.objects.create(
+                    product=self.product, user_name="An", rating=5
+                )
+            rebuild.assert_not_called()
+            (job,) = ProductDocumentJob.objects.all()
+            self.assertEqual(job.product_id, self.product.pk)
+            # Bản lưu đã cũ: view serialize như thường cho tới khi worker chạy
+            self.assertEqual(self.document()["price"], "450000.00")
+            response = self.get(f"{self.product.slug}/")
+            self.assertTrue(response["ETag"].startswith("W/"))
+            self.assertEqual(json.loads(response.content)["price"], "500000.00")
+
+            call_command("process_product_documents", stdout=io.StringIO())
+
+        rebuild.assert_called_once()
+        self.assertFalse(ProductDocumentJob.objects.exists())
+        self.assertEqual(self.document()["price"], "500000.00")
+
+    def test_change_during_rebuild_keeps_job(self):
+        rebuild = documents.rebuild
+
+        def rebuild_then_change(*args, **kwargs):
+            count = rebuild(*args, **kwargs)
+            # Sản phẩm đổi trong lúc worker đang dựng
+            Product.objects.filter(pk=self.product.pk).update(price=600000)
+            documents.schedule([self.product.pk])
+            return count
+
+        self.product.price = 500000
+        self.product.save()
+        with mock.patch.object(documents, "rebuild", rebuild_then_change):
+            self.assertEqual(documents.process_jobs(), 1)
+        self.assertEqual(ProductDocumentJob.objects.get().status, "pending")
+
+        documents.process_jobs()
+        self.assertEqual(self.document()["price"], "600000.00")
+
+    def test_backfill_image_metadata_rebuilds_document(self):
+        ProductImage.objects.create(
+            product=self.product,
+            image=SimpleUploadedFile("den.png", png_bytes((40, 30))),
+        )
+        documents.process_jobs()
+        self.assertIsNone(self.document()["images"][0]["image_width"])
+
+        call_command(
+            "backfill_image_metadata",
+            model=["decor.productimage"],
+            stdout=io.StringIO(),
+        )
+
+        image = self.document()["images"][0]
+        self.assertEqual((image["image_width"], image["image_height"]), (40, 30))
+        self.assertTrue(image["image"].startswith("http://testserver/media/"))
+
+
+@override_settings(RESIZE_SIZES=["96x96"])
+@override_settings(
+    IMAGE_RENDITIONS={"decor.ProductImage.image": [100, 200, 1000]},
+    IMAGE_RENDITION_FORMATS=["webp", "jpeg"],
+)
+class ImagePipelineTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Đèn", slug="den", price=100)
+
+    def upload(self, name="den.png", data=None, product=None):
+        return ProductImage.objects.create(
+            product=product or self.product,
+            image=SimpleUploadedFile(name, data or png_bytes((400, 300))),
+        )
+
+    def test_renditions_ladder_and_srcset(self):
+        image = self.upload()
+        renditions.process_jobs()
+
+        # Bậc 1000px lớn hơn ảnh gốc: thay bằng đúng 400px, không phóng to
+        self.assertEqual(
+            sorted(image.renditions.values_list("format", "width", "height")),
+            [
+                (fmt, width, height)
+                for fmt in ("jpeg", "webp")
+                for width, height in ((100, 75), (200, 150), (400, 300))
+            ],
+        )
+        response = self.client.get("/api/products/den/")
+        (data,) = response.data["images"]
+        self.assertEqual(len(data["srcset"]), 6)
+        for item in data["srcset"]:
+            self.assertTrue(item["url"].startswith("http://testserver/media/"))
+            rendition = image.renditions.get(width=item["width"], format=item["format"])
+            self.assertTrue(item["url"].endswith(rendition.file.name))
+            self.assertTrue(default_storage.exists(rendition.file.name))
+
+    def test_save_serves_original_until_worker_swaps_it_in(self):
+        image = self.upload()
+        job = image.image_jobs.get()
+        self.assertEqual((job.status, job.source_name), ("pending", image.image.name))
+
+        response = self.client.get("/api/products/den/")
+        (data,) = response.data["images"]
+        self.assertTrue(data["image"].endswith(image.image.name))
+        self.assertEqual(data["srcset"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("process_images", "--workers", "1", stdout=io.StringIO())
+
+        job.refresh_from_db()
+        image.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertTrue(image.image.name.endswith(".webp"))
+        self.assertFalse(default_storage.exists(job.source_name))
+        with default_storage.open(image.image.name) as f:
+            self.assertEqual(Image.open(f).size, (400, 300))
+
+    def test_failed_job_is_retried_then_given_up(self):
+        image = self.upload("hong.png", b"not an image")
+        with self.assertLogs("decor.renditions", "ERROR"):
+            for attempt in range(1, renditions.MAX_ATTEMPTS + 1):
+                self.assertEqual(renditions.process_jobs(), 1)
+                job = image.image_jobs.get()
+                self.assertEqual(job.attempts, attempt)
+        self.assertEqual(job.status, "failed")
+        self.assertTrue(job.last_error)
+        self.assertEqual(renditions.process_jobs(), 0)
+
+        # Upload ảnh mới: job được xếp lại từ đầu
+        image.image = SimpleUploadedFile("den.png", png_bytes((400, 300)))
+        image.save()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("pending", 0))
+
+    def test_stale_processing_job_is_reclaimed(self):
+        image = self.upload()
+        (job,) = renditions.claim_jobs()
+        self.assertEqual(renditions.claim_jobs(), [])
+
+        image.image_jobs.update(updated_at=timezone.now() - renditions.STALE_AFTER * 2)
+        self.assertEqual([job.pk for job in renditions.claim_jobs()], [job.pk])
+
+    def test_oversized_image_is_rejected_before_decode(self):
+        data = png_bytes((400, 300))
+        with self.assertRaisesMessage(ImageTooLarge, "vượt giới hạn"):
+            open_bounded(data, max_pixels=100_000)
+
+        with override_settings(IMAGE_MAX_PIXELS=100_000):
+            image = ProductImage(
+                product=self.product, image=SimpleUploadedFile("den.png", data)
+            )
+            with self.assertRaisesMessage(ValidationError, "quá lớn"):
+                image.full_clean()
+
+            image.save()
+            with self.assertLogs("decor.renditions", "ERROR"):
+                renditions.process_jobs()
+        # Không thử lại: lần sau cũng không qua được giới hạn
+        job = image.image_jobs.get()
+        self.assertEqual((job.status, job.attempts), ("failed", 1))
+
+    def test_jpeg_is_decoded_at_reduced_scale(self):
+        img = open_bounded(png_bytes((1600, 1200), fmt="JPEG"))
+        draft = mock.patch.object(
+            JpegImageFile, "draft", autospec=True, side_effect=JpegImageFile.draft
+        )
+        with draft as spy:
+            img = decode_fit(img, (200, 200))
+
+        # libjpeg decode thẳng ở 1/8, không có bản RGB 1600x1200 trong RAM
+        spy.assert_any_call(mock.ANY, "RGB", (200, 200))
+        self.assertEqual((img.size, img.mode), ((200, 150), "RGB"))
+
+    def files(self, image):
+        image.refresh_from_db()
+        return image.image.name, sorted(image.renditions.values_list("file", flat=True))
+
+    def test_duplicate_uploads_share_files_and_skip_encoding(self):
+        process = mock.patch(
+            "decor.renditions.timed_process_source",
+            wraps=renditions.timed_process_source,
+        )
+        with process as spy, self.captureOnCommitCallbacks(execute=True):
+            first, second = self.upload(), self.upload()
+            renditions.process_jobs()
+            third = self.upload()
+            renditions.process_jobs()
+
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(self.files(first), self.files(second))
+        self.assertEqual(self.files(first), self.files(third))
+        self.assertTrue(media.is_content_addressed(first.image.name))
+
+        request = RequestFactory().get("/")
+        response = media.serve(request, first.image.name, settings.MEDIA_ROOT)
+        self.assertEqual(response["Cache-Control"], media.IMMUTABLE_CACHE_CONTROL)
+
+    def test_shared_files_are_deleted_with_their_last_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self.upload(), self.upload()
+            renditions.process_jobs()
+        _main, files = self.files(first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(default_storage.exists(name) for name in files))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in files))
+
+    def test_metadata_is_stored_and_exposed(self):
+        image = self.upload()
+        renditions.process_jobs()
+
+        data = self.client.get("/api/products/den/").data["images"][0]
+        self.assertEqual((data["image_width"], data["image_height"]), (400, 300))
+        self.assertEqual(data["image_color"], "#c82828")
+        self.assertTrue(data["image_placeholder"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(data["image_placeholder"]), 200)
+
+        # Ảnh mới đang chờ xử lý: metadata cũ bị xóa
+        image.image = SimpleUploadedFile("xanh.png", png_bytes(color=(0, 0, 200)))
+        image.save()
+        image.refresh_from_db()
+        self.assertEqual((image.image_width, image.image_color), (None, ""))
+
+    def test_backfill_fills_missing_metadata(self):
+        image = self.upload()
+        ProductImage.objects.update(image_width=None, image_color="")
+
+        call_command("backfill_image_metadata", stdout=io.StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual((image.image_width, image.image_height), (400, 300))
+        self.assertEqual(image.image_color, "#c82828")
+        self.assertTrue(image.image_placeholder)
+
+
+class ResizeEndpointTests(TempMediaMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save(
+            "products/den.png", ContentFile(png_bytes((400, 300)))
+        )
+
+    def get(self, size, **extra):
+        return self.client.get(f"/media/r/{size}/{self.name}", **extra)
+
+    def cached_files(self):
+        return {
+            os.path.join(path, name)
+            for path, _, names in os.walk(resizer.cache_dir())
+            for name in names
+            if name.endswith(".webp")
+        }
+
+    def test_allowed_size_is_resized_and_cached(self):
+        response = self.get("96x96")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as img:
+            self.assertEqual(img.size, (96, 72))
+        # Lần sau đọc từ cache trên đĩa, 304 theo ETag
+        cached = self.get("96x96", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_sizes_outside_allowlist_are_404(self):
+        # Bậc srcset (khung vuông) được phép; kích thước tùy ý thì không
+        self.assertEqual(self.get("200x200").status_code, 200)
+        for size in ("97x96", "95x95", "0x96", "4000x4000"):
+            self.assertEqual(self.get(size).status_code, 404, size)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_eviction_removes_least_recently_used(self):
+        paths = []
+        for size in ("96x96", "200x200", "400x400"):
+            before = self.cached_files()
+            self.get(size)
+            (path,) = self.cached_files() - before
+            paths.append(path)
+        # mtime là lần dùng gần nhất: 96x96 mới nhất, 200x200 cũ nhất
+        for path, mtime in zip(paths, (300, 100, 200)):
+            os.utime(path, (mtime, mtime))
+
+        removed = resizer.evict(max_bytes=os.path.getsize(paths[0]), low_water=1)
+
+        self.assertGreater(removed, 0)
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, False])
+
+    def test_eviction_skips_files_being_written(self):
+        self.get("96x96")
+        (path,) = self.cached_files()
+        # File tạm của một lần ghi đang diễn ra (_write_atomic) cùng thư mục
+        tmp_path = os.path.join(os.path.dirname(path), "dang-ghi.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b"x" * 4096)
+        for name in (path, tmp_path):
+            os.utime(name, (100, 100))
+
+        removed = resizer.evict(max_bytes=0, low_water=1)
+
+        self.assertGreater(removed, 0)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(tmp_path))
+
+    def test_eviction_tolerates_files_removed_during_scan(self):
+        self.get("96x96")
+        (path,) = self.cached_files()
+        scandir = os.scandir
+
+        def scandir_then_remove(directory):
+            for entry in scandir(directory):
+                if entry.path == path:
+                    # Tiến trình khác xóa file giữa scandir và stat
+                    os.unlink(path)
+                yield entry
+
+        with mock.patch.object(resizer.os, "scandir", scandir_then_remove):
+            self.assertEqual(resizer.evict(max_bytes=0, low_water=1), 0)
+
+
+
+class MetricsTests(TestCase):
+    def test_disabled_by_default(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.0/8"])
+    def test_only_allowlisted_addresses(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        response = self.client.get("/metrics", REMOTE_ADDR="10.1.2.3")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_request_metrics_carry_route_and_status(self):
+        self.client.get("/api/faqs/")
+        self.client.get("/api/faqs/999999/")
+
+        text = self.client.get("/metrics").content.decode()
+        samples = {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(text)
+            for sample in family.samples
+        }
+
+        def value(name, **labels):
+            return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+        requests = "decor_requests_total"
+        self.assertGreaterEqual(
+            value(requests, route="faq-list", method="GET", status="2xx"), 1
+        )
+        self.assertGreaterEqual(
+            value(requests, route="faq-detail", method="GET", status="4xx"), 1
+        )
+        latency = "decor_request_duration_seconds"
+        self.assertGreaterEqual(
+            value(f"{latency}_count", route="faq-list", method="GET"), 1
+        )
+        self.assertGreaterEqual(
+            value(f"{latency}_bucket", route="faq-list", method="GET", le="+Inf"), 1
+        )
+
+
+class RequestLogTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        FAQ.objects.create(question="Giao hàng?", answer="2 ngày", sort_order=1)
+        self.stream = io.StringIO()
+        handler = logging.StreamHandler(self.stream)
+        handler.setFormatter(log.JSONFormatter())
+        # Listener do DecorConfig.ready khởi động, ghi vào stream thay vì file
+        patcher = mock.patch.object(log.listener, "handlers", (handler,))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def records(self):
+        log.listener.queue.join()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_list_request_emits_json_line(self):
+        self.client.get("/api/faqs/", {"page": 1})
+
+        (record,) = self.records()
+        self.assertEqual(record["level"], "INFO")
+        self.assertEqual(record["logger"], "decor.requests")
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["path"], "/api/faqs/?page=1")
+        self.assertEqual(record["status"], 200)
+        self.assertGreaterEqual(record["db_queries"], 1)
+        self.assertGreaterEqual(record["total_ms"], record["db_ms"])
+        self.assertEqual(record["response_message"], "")
+
+    def test_unpaginated_list(self):
+        # response.data là list, không phải dict
+        with mock.patch.object(FAQViewSet, "pagination_class", None):
+            response = self.client.get("/api/faqs/")
+
+        self.assertIsInstance(response.data, list)
+        (record,) = self.records()
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["response_message"], "")
+
+    def test_failed_request_logs_traceback(self):
+        self.client.raise_request_exception = False
+        with (
+            mock.patch.object(FAQViewSet, "list", side_effect=RuntimeError("hỏng")),
+            self.assertLogs("django.request", "ERROR"),
+        ):
+            self.client.get("/api/faqs/")
+
+        error, finished = self.records()
+        self.assertEqual(error["level"], "ERROR")
+        self.assertEqual(error["message"], "request failed: RuntimeError('hỏng')")
+        self.assertIn("RuntimeError: hỏng", error["exc_info"])
+        self.assertEqual(finished["status"], 500)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_LAG_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request, write_first=False):
+        """Alias mà FAQ được đọc từ trong view của ``request``."""
+        aliases = []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            if write_first:
+                self.router.db_for_write(ContactMessage)
+            aliases.append(self.router.db_for_read(FAQ))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request.resolver_match = resolve(request.path)
+        response = middleware(request)
+        return aliases[0], response
+
+    def test_safe_request_reads_from_replica(self):
+        alias, response = self.read_alias(self.factory.get("/api/faqs/"))
+
+        self.assertEqual(alias, "replica")
+        self.assertNotIn(routers.REPLICA_COOKIE, response.cookies)
+
+    def test_writes_and_admin_use_primary(self):
+        alias, _ = self.read_alias(self.factory.post("/api/contacts/"))
+        self.assertEqual(alias, "default")
+        alias, _ = self.read_alias(self.factory.get("/admin/"))
+        self.assertEqual(alias, "default")
+        self.assertEqual(self.router.db_for_write(FAQ), "default")
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(FAQ), "default")
+
+    def test_sticks_to_primary_after_write(self):
+        alias, response = self.read_alias(
+            self.factory.get("/api/faqs/"), write_first=True
+        )
+
+        self.assertEqual(alias, "default")
+        cookie = response.cookies[routers.REPLICA_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        # Request tiếp theo của client đó vẫn đọc từ primary
+        request = self.factory.get("/api/faqs/")
+        request.COOKIES[routers.REPLICA_COOKIE] = cookie.value
+        alias, _ = self.read_alias(request)
+        self.assertEqual(alias, "default")
+
+    def test_recently_changed_model_reads_from_primary(self):
+        cache.bump_version(FAQ)
+
+        alias, _ = self.read_alias(self.factory.get("/api/faqs/"))
+
+        self.assertEqual(alias, "default")
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS,
+    "cần database replica (--settings=decor_be.settings_replica)",
+)
+class ReplicaRoutingRequestTests(TransactionTestCase):
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        FAQ.objects.create(question="Giao hàng?", answer="2 ngày", sort_order=1)
+        # Quên thời điểm vừa ghi ở trên để request sau được đọc từ replica
+        cache.get_cache().clear()
+
+    def get(self, path):
+        """(response, số truy vấn ở primary, số truy vấn ở các replica)."""
+        captured = {
+            alias: CaptureQueriesContext(connections[alias]) for alias in self.databases
+        }
+        with ExitStack() as stack:
+            for context in captured.values():
+                stack.enter_context(context)
+            response = self.client.get(path)
+        primary = len(captured.pop("default"))
+        return response, primary, sum(len(context) for context in captured.values())
+
+    def test_reads_go_to_replica(self):
+        response, primary, replica = self.get("/api/faqs/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_client_reads_from_primary_after_write(self):
+        response = self.client.post(
+            "/api/contacts/", {"name": "An", "phone_number": "0901", "message": "a"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(routers.REPLICA_COOKIE, response.cookies)
+        cache.get_cache().clear()
+
+        response, primary, replica = self.get("/api/faqs/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
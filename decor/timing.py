@@ -0,0 +1,60 @@
+# your_app/timing.py
+# Đo thời gian theo request: DB, serialize (render) và tổng, bằng perf_counter_ns.
+
+from contextvars import ContextVar
+from time import perf_counter_ns
+
+# ContextVar đi theo request cả khi truy vấn chạy trong thread của sync_to_async
+current = ContextVar("decor_request_timing", default=None)
+
+SERVER_TIMING = 'db;dur=%.2f;desc="%d queries", serialize;dur=%.2f, total;dur=%.2f'
+
+
+class RequestTiming:
+    __slots__ = ("start", "end", "db_ns", "db_queries", "render_start", "render_ns")
+
+    def __init__(self):
+        self.start = perf_counter_ns()
+        self.end = 0
+        self.db_ns = 0
+        self.db_queries = 0
+        self.render_start = 0
+        self.render_ns = 0
+
+    def finish(self):
+        self.end = perf_counter_ns()
+
+    @property
+    def total_ns(self):
+        return (self.end or perf_counter_ns()) - self.start
+
+    def server_timing(self):
+        return SERVER_TIMING % (
+            self.db_ns / 1e6,
+            self.db_queries,
+            self.render_ns / 1e6,
+            self.total_ns / 1e6,
+        )
+
+
+def query_timer(execute, sql, params, many, context):
+    """execute_wrapper gắn vào mọi kết nối DB (xem signals.install_query_timer)."""
+    timing = current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_ns += perf_counter_ns() - start
+        timing.db_queries += 1
+
+
+def render_started(timing):
+    timing.render_start = perf_counter_ns()
+
+
+def render_finished(timing):
+    if timing.render_start:
+        timing.render_ns += perf_counter_ns() - timing.render_start
+        timing.render_start = 0
@@ -5,6 +5,7 @@ from .views import *
 
 router = DefaultRouter()
 router.register(r"products", ProductViewSet)
+router.register(r"exports/products", ProductExportViewSet, basename="product-export")
 router.register(r"pages", PageViewSet)
 router.register(r"contacts", ContactMessageViewSet, basename="contactmessage")
 router.register(r"blog/categories", BlogCategoryViewSet)
@@ -1,32 +1,128 @@
-from rest_framework import viewsets, filters
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import exceptions, viewsets, filters
+from rest_framework.decorators import action
 from .models import *
 from .serializers import *
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import BlogPostFilter
+from . import documents
+from .cache import CachedResponseMixin, ConditionalGetMixin
+from .export import CONTENT_TYPES, stream_products
+from .filters import BlogPostFilter, FullTextSearchFilter, ProductFilter
+from .pagination import PageNumberOrKeysetPagination, ReviewCursorPagination
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+def _product_aggregate(model, aggregate, output_field):
+    # Subquery thay vì JOIN để các annotate không nhân bản dòng của nhau
+    rows = (
+        model.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+    return Subquery(rows, output_field=output_field)
+
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = PageNumberOrKeysetPagination
     lookup_field = "slug"
+    conditional_dependencies = [ProductImage, ProductVariant, ProductReview, Category]
     filter_backends = [
-        filters.SearchFilter,
+        DjangoFilterBackend,
+        FullTextSearchFilter,
         filters.OrderingFilter,
     ]
+    filterset_class = ProductFilter
     search_fields = ["name", "category__slug"]
-    ordering_fields = ["price", "created_at"]
-
-
-class PageViewSet(viewsets.ReadOnlyModelViewSet):
+    ordering_fields = ["price", "created_at", "rating_avg", "review_count"]
+
+    def get_queryset(self):
+        if self.action == "reviews":
+            return Product.objects.all()
+        queryset = Product.objects.select_related("category")
+        if self.action == "list":
+            price_field = DecimalField(max_digits=10, decimal_places=2)
+            return queryset.annotate(
+                min_price=F("price")
+                + Coalesce(
+                    _product_aggregate(ProductVariant, Min("extra_price"), price_field),
+                    0,
+                    output_field=price_field,
+                ),
+                max_price=F("price")
+                + Coalesce(
+                    _product_aggregate(ProductVariant, Max("extra_price"), price_field),
+                    0,
+                    output_field=price_field,
+                ),
+            ).prefetch_related("images__renditions")
+        return documents.detail_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        # JSON dựng sẵn: một truy vấn theo slug, không serialize
+        response = documents.serve(request, kwargs[self.lookup_field])
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return response
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ProductListSerializer
+        if self.action == "reviews":
+            return ProductReviewSerializer
+        return ProductSerializer
+
+    @action(
+        detail=True,
+        methods=["get"],
+        filter_backends=[],
+        pagination_class=ReviewCursorPagination,
+    )
+    def reviews(self, request, slug=None):
+        product = self.get_object()
+        queryset = ProductReview.objects.filter(product=product)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ProductExportViewSet(ConditionalGetMixin, viewsets.GenericViewSet):
+    # Toàn bộ catalog trong một response: ?output=jsonl (mặc định) hoặc csv.
+    # Đặt ngoài /products/ để không chiếm slug "export" của route chi tiết.
+    queryset = Product.objects.all()
+    pagination_class = None
+    conditional_dependencies = [ProductImage, ProductVariant, ProductReview, Category]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ProductFilter
+
+    def list(self, request):
+        output = request.query_params.get("output", "jsonl")
+        if output not in CONTENT_TYPES:
+            raise exceptions.ValidationError({"output": f"Chọn một trong {list(CONTENT_TYPES)}"})
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional(
+            lambda request: stream_products(queryset, output, request),
+            queryset,
+            request,
+        )
+
+
+class PageViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Page.objects.all()
     serializer_class = PageSerializer
     lookup_field = "slug"
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ["title", "content"]
 
 
-class TrackingCodeViewSet(viewsets.ReadOnlyModelViewSet):
+class TrackingCodeViewSet(
+    CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = TrackingCode.objects.all()
     serializer_class = TrackingCodeSerializer
 
@@ -34,50 +130,81 @@ class TrackingCodeViewSet(viewsets.ReadOnlyModelViewSet):
 class ContactMessageViewSet(viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
+    pagination_class = PageNumberOrKeysetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ["name", "phone_number", "message"]
 
+    def perform_create(self, serializer):
+        # Tin nhắn và dòng outbox Google Sheet được ghi cùng một transaction
+        with transaction.atomic():
+            serializer.save()
+
 
-class BlogCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogCategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = BlogCategory.objects.all()
     serializer_class = BlogCategorySerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["name"]
 
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = BlogPost.objects.filter(status="published").distinct()
+class BlogPostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = BlogPost.objects.filter(status="published")
     serializer_class = BlogPostSerializer
+    pagination_class = PageNumberOrKeysetPagination
     lookup_field = "slug"
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    conditional_dependencies = [BlogCategory, BlogComment]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_class = BlogPostFilter
     search_fields = ["title", "content", "author_name"]
 
+    def get_queryset(self):
+        queryset = BlogPost.objects.filter(status="published")
+        if self.action == "list":
+            # Không tải content (HTML dài) cho trang danh sách
+            return queryset.defer("content").prefetch_related(
+                "categories", "renditions"
+            )
+        return queryset.prefetch_related("categories", "comments", "renditions")
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return BlogPostListSerializer
+        return BlogPostSerializer
+
 
 class BlogCommentViewSet(viewsets.ModelViewSet):
     queryset = BlogComment.objects.all()
     serializer_class = BlogCommentSerializer
+    pagination_class = PageNumberOrKeysetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ["user_name", "user_email", "comment"]
 
 
-class FAQViewSet(viewsets.ReadOnlyModelViewSet):
+class FAQViewSet(
+    CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["question", "answer"]
 
 
-class ContactInfoViewSet(viewsets.ReadOnlyModelViewSet):
+class ContactInfoViewSet(
+    CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = ContactInfo.objects.all()
     serializer_class = ContactInfoSerializer
 
 
-class SlideViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Slide.objects.all()
+class SlideViewSet(
+    CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
+    queryset = Slide.objects.prefetch_related("renditions")
     serializer_class = SlideSerializer
 
 
-class WebsiteInfomationViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = WebsiteInfomation.objects.all()
+class WebsiteInfomationViewSet(
+    CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
+    queryset = WebsiteInfomation.objects.prefetch_related("renditions")
     serializer_class = WebsiteInfomationSerializer
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'decor_be.settings')
+# Đường đọc async của decor.cache.CachedResponseMixin (xem settings.ASYNC_READ_PATH)
+os.environ.setdefault('ASYNC_READ_PATH', 'True')
 
 application = get_asgi_application()
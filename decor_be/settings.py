@@ -51,7 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
-    "decor.middleware.CustomLoggerMiddleware",
+    "decor.middleware.RequestTimingMiddleware",
+    "decor.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -71,6 +72,9 @@ CORS_ALLOWED_ORIGINS = [
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "decor.log.JSONFormatter"},
+    },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
@@ -79,6 +83,17 @@ LOGGING = {
             "class": "logging.FileHandler",
             "filename": "django.log",
         },
+        # Log request dạng JSON: middleware chỉ đưa bản ghi vào hàng đợi, thread
+        # QueueListener (decor/log.py, khởi động trong DecorConfig.ready) ghi file
+        "requests": {
+            "class": "logging.handlers.QueueHandler",
+            "queue": "ext://decor.log.request_queue",
+        },
+        "requests_file": {
+            "()": "decor.log.listener_file_handler",
+            "filename": "requests.log",
+            "formatter": "json",
+        },
     },
     "loggers": {
         "django": {
@@ -90,6 +105,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": True,
         },
+        "decor.requests": {
+            "handlers": ["requests"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 ROOT_URLCONF = "decor_be.urls"
@@ -128,6 +148,49 @@ DATABASES = {
         "OPTIONS": {"charset": "utf8mb4", "init_command": "SET NAMES 'utf8mb4'"},
     }
 }
+# Bản sao chỉ đọc (MySQL replica): đặt SQL_REPLICA_HOST, các SQL_REPLICA_* khác
+# mặc định giống primary. Thử trên máy với hai SQLite: decor_be/settings_replica.py
+_replica = {
+    "NAME": config("SQL_REPLICA_DATABASE", default=""),
+    "USER": config("SQL_REPLICA_USER", default=""),
+    "PASSWORD": config("SQL_REPLICA_PASSWORD", default=""),
+    "HOST": config("SQL_REPLICA_HOST", default=""),
+    "PORT": config("SQL_REPLICA_PORT", default=""),
+}
+if _replica["HOST"]:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        **{key: value for key, value in _replica.items() if value},
+        # Test chạy trên database test của default
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["decor.routers.ReplicaRouter"]
+# Alias các replica để đọc (decor.routers), mỗi request chọn ngẫu nhiên một
+DATABASE_REPLICAS = config(
+    "DATABASE_REPLICAS",
+    default=",".join(alias for alias in DATABASES if alias != "default"),
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
+# Độ trễ replica tối đa: client vừa ghi / model vừa đổi đọc từ primary chừng này giây
+REPLICA_LAG_SECONDS = config("REPLICA_LAG_SECONDS", default=5, cast=int)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+# Cache response của các viewset chỉ đọc (decor.cache.CachedResponseMixin).
+# Chạy nhiều worker gunicorn thì nên trỏ tới backend dùng chung (Redis, Memcached)
+# để việc vô hiệu hóa qua signals có hiệu lực ở mọi worker.
+# Với LocMemCache (mặc định, riêng từng tiến trình) phiên bản của model chỉ sống
+# RESPONSE_CACHE_LOCAL_VERSION_TIMEOUT giây: worker không nhận được signal của
+# worker khác vẫn trả ETag/response cũ tối đa chừng ấy thời gian.
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+RESPONSE_CACHE_LOCAL_VERSION_TIMEOUT = 60
+# View async cho các viewset có cache response (chạy ASGI: uvicorn decor_be.asgi);
+# decor_be/asgi.py tự bật, WSGI (gunicorn, runserver) giữ view sync
+ASYNC_READ_PATH = config("ASYNC_READ_PATH", default=False, cast=bool)
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
@@ -191,3 +254,51 @@ REST_FRAMEWORK = {
         "rest_framework.filters.OrderingFilter",
     ],
 }
+# Số đánh giá mới nhất nhúng trong chi tiết sản phẩm
+PRODUCT_DETAIL_REVIEW_LIMIT = 5
+# Origin công khai của API (vd. https://api.example.com): JSON chi tiết sản phẩm
+# được dựng sẵn với URL ảnh theo origin này (decor/documents.py). Khi bật cần chạy
+# worker `manage.py process_product_documents --loop`: thay đổi chỉ ghi job, sản
+# phẩm còn job thì view serialize như thường. Để trống thì tắt hẳn: không ghi job,
+# không dựng lại, chi tiết sản phẩm luôn serialize.
+PRODUCT_DOCUMENT_BASE_URL = config("PRODUCT_DOCUMENT_BASE_URL", default="")
+# Địa chỉ/mạng (CIDR) được đọc /metrics, ví dụ "127.0.0.1,10.0.0.0/8"; để trống
+# thì /metrics trả 404. Không đưa địa chỉ của reverse proxy vào danh sách.
+METRICS_ALLOWED_IPS = config(
+    "METRICS_ALLOWED_IPS",
+    default="",
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
+# Số kết quả tìm kiếm (?search=) tối đa được xếp hạng và phân trang; khi vượt quá,
+# response có header X-Search-Total (tổng số khớp) và X-Search-Limit. Để trống
+# thì không giới hạn (mỗi trang sắp xếp theo toàn bộ danh sách id).
+SEARCH_MAX_RESULTS = config(
+    "SEARCH_MAX_RESULTS", default="500", cast=lambda v: int(v) if v else None
+)
+# Các bậc chiều rộng (px) sinh ra cho từng trường ảnh "app.Model.field"
+IMAGE_RENDITIONS = {
+    "decor.ProductImage.image": [200, 400, 800],
+    "decor.BlogPost.thumbnail": [225, 450],
+    "decor.Slide.image": [480, 768, 1280, 1920],
+    "decor.WebsiteInfomation.thumbnail": [600, 1200],
+}
+# AVIF chỉ được sinh khi Pillow hỗ trợ; JPEG làm định dạng dự phòng
+IMAGE_RENDITION_FORMATS = ["avif", "webp", "jpeg"]
+# Giới hạn số điểm ảnh của ảnh upload (chống decompression bomb, ~64 MP)
+IMAGE_MAX_PIXELS = 64_000_000
+# Cache trên đĩa cho ảnh resize theo yêu cầu (/media/r/<w>x<h>/<path>)
+RESIZE_CACHE_DIR = config(
+    "RESIZE_CACHE_DIR", default=os.path.join(BASE_DIR, "cache", "resize")
+)
+RESIZE_CACHE_MAX_BYTES = config(
+    "RESIZE_CACHE_MAX_BYTES", default=1024**3, cast=int
+)  # 1 GB, vượt quá thì xóa file ít dùng nhất
+# Các khung <w>x<h> được phép cho /media/r/ (ngoài các bậc IMAGE_RENDITIONS dạng
+# khung vuông); kích thước khác trả 404 để client không thể bắt server resize và
+# đẩy bản đang dùng ra khỏi cache với số tùy ý. Mặc định: thumbnail giỏ hàng,
+# ảnh OG, ảnh zoom.
+RESIZE_SIZES = config(
+    "RESIZE_SIZES",
+    default="96x96,160x160,1200x630,2048x2048",
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
@@ -0,0 +1,22 @@
+# decor_be/settings_bench.py
+# Settings cho benchmark trên SQLite, không cần MySQL hay file .env:
+#   python manage.py bench_api --settings=decor_be.settings_bench
+import os
+
+os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1")
+os.environ.setdefault("SQL_ENGINE", "django.db.backends.sqlite3")
+# Host của test Client (bench_api): chi tiết sản phẩm đọc JSON dựng sẵn
+os.environ.setdefault("PRODUCT_DOCUMENT_BASE_URL", "http://testserver")
+for name in ("SQL_DATABASE", "SQL_USER", "SQL_PASSWORD", "SQL_HOST", "SQL_PORT"):
+    os.environ.setdefault(name, "")
+
+from .settings import *  # noqa: E402,F401,F403
+
+# bench_api tạo database test mới (SQLite trong bộ nhớ) rồi xóa khi chạy xong;
+# bench_asgi truyền file database đã seed cho các server con qua BENCH_DATABASE
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCH_DATABASE") or BASE_DIR / "bench.sqlite3",
+    }
+}
@@ -0,0 +1,28 @@
+# decor_be/settings_replica.py
+# Thử router replica (decor/routers.py) trên máy với hai database SQLite:
+#   python manage.py migrate --settings=decor_be.settings_replica
+#   cp db.sqlite3 replica.sqlite3    # "replication": chép lại khi muốn đồng bộ
+#   python manage.py runserver --settings=decor_be.settings_replica
+#   python manage.py test decor --settings=decor_be.settings_replica
+import os
+
+os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1")
+os.environ.setdefault("SQL_ENGINE", "django.db.backends.sqlite3")
+for name in ("SQL_DATABASE", "SQL_USER", "SQL_PASSWORD", "SQL_HOST", "SQL_PORT"):
+    os.environ.setdefault(name, "")
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+        # Test dùng chung database test của default
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_REPLICAS = ["replica"]
@@ -21,10 +21,25 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 
+from decor.media import serve as serve_media
+from decor.metrics import metrics
+from decor.resizer import resize as resize_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("decor.url")),
     path("ckeditor/", include("ckeditor_uploader.urls")),
+    # Prometheus scrape, chỉ cho địa chỉ trong METRICS_ALLOWED_IPS
+    path("metrics", metrics, name="metrics"),
+    # Ảnh resize theo yêu cầu; khi có nginx cần proxy /media/r/ về Django
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}r/<int:width>x<int:height>/<path:path>",
+        resize_media,
+        name="media-resize",
+    ),
 ]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # File media đặt tên theo hash được trả kèm Cache-Control: immutable
+    urlpatterns += static(
+        settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
+    )